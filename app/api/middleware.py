@@ -0,0 +1,82 @@
+import json
+
+from app.services.upload_spool import UploadSpooler
+
+# Folga para o envelope multipart (boundaries, cabeçalhos das partes) além do arquivo em si
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Recusa com 413 uploads maiores que MAX_UPLOAD_MB antes que o corpo seja lido.
+
+    O Starlette só entrega o UploadFile à rota depois de ler todo o multipart para um arquivo
+    temporário; sem este limite, um upload gigante ocuparia disco/memória do worker antes de
+    qualquer validação. Um Content-Length declarado acima do limite é recusado de imediato;
+    sem Content-Length (chunked), os bytes são contados conforme chegam e a leitura é
+    interrompida ao passar do limite.
+    """
+
+    def __init__(self, app, path_suffixes=("/upload",)):
+        self.app = app
+        self.path_suffixes = tuple(path_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        limit = UploadSpooler.max_bytes()
+        if (
+            scope["type"] != "http"
+            or scope.get("method") != "POST"
+            or limit is None
+            or not scope.get("path", "").endswith(self.path_suffixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limit += MULTIPART_OVERHEAD_BYTES
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit and not response_started:
+                    # Responde 413 já e faz a aplicação enxergar uma desconexão do cliente
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": UploadSpooler.too_large_message()}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 from app.db.session import get_db
 from app.models.ad_spend import AdSpend
 from app.models.user import User
+from app.services.dashboard_cache import DashboardCache
 
 router = APIRouter(prefix="/ad_spends", tags=["ad_spends"])
 
@@ -64,6 +65,7 @@ def create_ad_spend(
         amount=payload.amount
     )
     db.add(ad_spend)
+    DashboardCache.bump_version(db, user.id)
     db.commit()
     db.refresh(ad_spend)
     return ad_spend
@@ -108,6 +110,7 @@ def update_ad_spend(
     if payload.sub_id is not None:
         ad_spend.sub_id = None if payload.sub_id in ["", "__all__"] else payload.sub_id
 
+    DashboardCache.bump_version(db, user.id)
     db.commit()
     db.refresh(ad_spend)
     return ad_spend
@@ -126,5 +129,6 @@ def delete_ad_spend(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Registro não encontrado")
 
     db.delete(ad_spend)
+    DashboardCache.bump_version(db, user.id)
     db.commit()
     return {"detail": "Deleted"}
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.analytics import (
+    AggregateQuery,
+    AggregateQueryResponse,
+    AnalyticsFilters,
+    DimensionBreakdownResponse,
+    DimensionType,
+    GlobalKPIs,
+    MetricType,
+    TimeSeriesPeriod,
+    TimeSeriesResponse,
+)
+from app.api.deps import get_current_user
+from app.services.analytics_service import AnalyticsService
+from app.services.query_planner import QueryPlanError, QueryPlanner
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def get_filters(
+    start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
+    product_name: Optional[str] = Query(None, description="Filtrar por produto (busca parcial)"),
+    platform: Optional[str] = Query(None, description="Filtrar por plataforma"),
+    min_value: Optional[float] = Query(None, description="Valor bruto mínimo da linha"),
+    max_value: Optional[float] = Query(None, description="Valor bruto máximo da linha"),
+) -> AnalyticsFilters:
+    """Filtros comuns às rotas de analytics (query string)."""
+    return AnalyticsFilters(
+        start_date=start_date,
+        end_date=end_date,
+        product_name=product_name,
+        platform=platform,
+        min_value=min_value,
+        max_value=max_value
+    )
+
+
+@router.get("/kpis", response_model=GlobalKPIs)
+def get_kpis(
+    filters: AnalyticsFilters = Depends(get_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    KPIs globais: total de vendas, comissões, líquido e quantidade, ticket médio,
+    comissão média por venda, taxa de comissão (%) e margem líquida (%).
+    """
+    return AnalyticsService.get_kpis(db, current_user.id, filters)
+
+
+@router.get("/timeseries", response_model=TimeSeriesResponse)
+def get_time_series(
+    period: TimeSeriesPeriod = Query(TimeSeriesPeriod.DAILY, description="daily, weekly ou monthly"),
+    filters: AnalyticsFilters = Depends(get_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Série temporal agregada no banco; cada ponto é o início do dia, da semana ou do mês."""
+    return AnalyticsService.get_time_series(db, current_user.id, filters, period)
+
+
+@router.get("/breakdown", response_model=DimensionBreakdownResponse)
+def get_breakdown(
+    dimension: DimensionType = Query(DimensionType.PRODUCT, description="Dimensão do agrupamento"),
+    metric: MetricType = Query(MetricType.GROSS, description="Métrica da ordenação e do percentual"),
+    limit: int = Query(20, ge=1, le=500, description="Quantidade de itens"),
+    filters: AnalyticsFilters = Depends(get_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Os maiores valores da dimensão (produto, plataforma, data, status, categoria ou sub_id1)
+    pela métrica escolhida, com o percentual de cada um sobre o total filtrado.
+    """
+    return AnalyticsService.get_breakdown(db, current_user.id, filters, dimension, metric, limit)
+
+
+@router.post("/query", response_model=AggregateQueryResponse)
+def run_query(
+    query: AggregateQuery,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Consulta agregada genérica: métricas (gross, commission, net, quantity) agrupadas por
+    até 3 dimensões (product, platform, date, status, category, sub_id1), com os filtros de
+    analytics. Lê do rollup diário quando ele cobre a consulta; senão, de dataset_rows.
+    Com QUERY_DEBUG ativado, explain=true devolve a tabela escolhida, o SQL e o EXPLAIN.
+    """
+    try:
+        return QueryPlanner.execute(db, current_user.id, query)
+    except QueryPlanError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
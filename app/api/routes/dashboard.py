@@ -1,24 +1,58 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas.dashboard import DashboardFilters, DashboardResponse
+from app.schemas.dashboard import DashboardFilters, DashboardResponse, ProductPage, ProductSuggestion
 from app.api.deps import get_current_user
-from app.services.dashboard_service import DashboardService
+from app.services.dashboard_cache import dashboard_cache
+from app.services.dashboard_service import DashboardService, MAX_PRODUCT_PAGE
+from app.services.product_search import MAX_SUGGESTIONS, ProductSearch
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
-@router.get("", response_model=DashboardResponse)
-def get_dashboard(
+def get_filters(
     start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
     product: Optional[str] = Query(None, description="Filtrar por produto (busca parcial)"),
     min_value: Optional[float] = Query(None, description="Valor mínimo"),
     max_value: Optional[float] = Query(None, description="Valor máximo"),
+    revenue_min: Optional[float] = Query(None, description="Receita mínima da linha"),
+    revenue_max: Optional[float] = Query(None, description="Receita máxima da linha"),
+    cost_min: Optional[float] = Query(None, description="Custo mínimo da linha"),
+    cost_max: Optional[float] = Query(None, description="Custo máximo da linha"),
+    commission_min: Optional[float] = Query(None, description="Comissão mínima da linha"),
+    commission_max: Optional[float] = Query(None, description="Comissão máxima da linha"),
+    profit_min: Optional[float] = Query(None, description="Lucro mínimo da linha"),
+    profit_max: Optional[float] = Query(None, description="Lucro máximo da linha"),
+) -> DashboardFilters:
+    """Filtros comuns às rotas do dashboard (query string)."""
+    return DashboardFilters(
+        start_date=start_date,
+        end_date=end_date,
+        product=product,
+        min_value=min_value,
+        max_value=max_value,
+        revenue_min=revenue_min,
+        revenue_max=revenue_max,
+        cost_min=cost_min,
+        cost_max=cost_max,
+        commission_min=commission_min,
+        commission_max=commission_max,
+        profit_min=profit_min,
+        profit_max=profit_max
+    )
+
+
+@router.get("", response_model=DashboardResponse)
+def get_dashboard(
+    filters: DashboardFilters = Depends(get_filters),
+    product_limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PRODUCT_PAGE, description="Produtos listados (top-N por lucro); padrão DASHBOARD_PRODUCT_LIMIT"
+    ),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -31,16 +65,18 @@ def get_dashboard(
     - product: Nome do produto (busca parcial, case-insensitive)
     - min_value: Valor mínimo para filtrar (aplica-se a revenue, cost, commission ou profit)
     - max_value: Valor máximo para filtrar (aplica-se a revenue, cost, commission ou profit)
+    - revenue_min, revenue_max, cost_min, cost_max, commission_min, commission_max,
+      profit_min, profit_max: Faixa de uma métrica específica (usa os índices por métrica;
+      prefira-as a min_value/max_value)
+    - product_limit: Quantos produtos listar; os demais vêm somados em product_others e
+      seguem em GET /dashboard/products?cursor=product_next_cursor
+
+    A resposta é cacheada por usuário e filtros até a próxima mudança nos dados do usuário
+    (upload, refresh ou gasto de anúncio).
     """
-    filters = DashboardFilters(
-        start_date=start_date,
-        end_date=end_date,
-        product=product,
-        min_value=min_value,
-        max_value=max_value
-    )
+    filters.product_limit = product_limit
     
-    dashboard_data = DashboardService.get_dashboard(
+    dashboard_data = dashboard_cache.get_dashboard(
         db=db,
         user_id=current_user.id,
         filters=filters
@@ -48,3 +84,40 @@ def get_dashboard(
     
     return dashboard_data
 
+
+@router.get("/products", response_model=ProductPage)
+def get_dashboard_products(
+    filters: DashboardFilters = Depends(get_filters),
+    limit: int = Query(50, ge=1, le=MAX_PRODUCT_PAGE, description="Produtos por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Agregações por produto, por lucro, paginadas por cursor. Os filtros são os de
+    GET /dashboard; `others` soma os produtos depois desta página.
+    """
+    try:
+        return DashboardService.get_product_page(db, current_user.id, filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/products/autocomplete", response_model=List[ProductSuggestion])
+def autocomplete_products(
+    q: str = Query(..., min_length=1, description="Parte do nome do produto"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS, description="Máximo de sugestões"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugestões para o filtro de produto, lidas do dicionário de produtos do usuário:
+    primeiro os que começam por `q`, depois os com mais linhas.
+    """
+    return ProductSearch.suggest(db, current_user.id, q, limit)
+
+
+@router.get("/cache/stats")
+def get_dashboard_cache_stats():
+    """Contadores do cache do dashboard (hits, misses, evicções, tamanho)."""
+    return dashboard_cache.stats()
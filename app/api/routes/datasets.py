@@ -3,23 +3,31 @@ from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, timedelta
 
+from app.api.deps import get_current_user
 from app.db.session import get_db
 from app.models.user import User
 from app.models.dataset import Dataset
 from app.models.dataset_row import DatasetRow
+from app.models.ingestion_job import IngestionJob
 from app.schemas.dataset import DatasetResponse, DatasetRowResponse
-from app.services.csv_service import CSVService
-import pandas as pd
-import datetime
-import math
-from decimal import Decimal
+from app.schemas.ingestion import IngestionJobResponse
+from app.services.csv_service import CSVService, CSVValidationError
+from app.services.dashboard_cache import DashboardCache
+from app.services.ingestion_service import (
+    IngestionService, ingestion_worker_pool, AD_SPEND_KEY, FINISHED_STATUSES, INGESTION_MODES
+)
+from app.services.parsed_cache import ParsedFrameCache
+from app.services.upload_archive import UploadArchive
+from app.services.upload_spool import UploadSpooler, UploadTooLargeError
+from app.core.config import settings
+from app.utils.serialization import serialize_value, clean_number
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm.attributes import flag_modified
 
 router = APIRouter(prefix="/datasets", tags=["datasets"])
 
-
 def get_any_user(db: Session, user_id: int | None = None) -> User:
     query = db.query(User)
     if user_id is not None:
@@ -30,88 +38,6 @@ def get_any_user(db: Session, user_id: int | None = None) -> User:
     return user
 
 
-def serialize_value(value):
-    if value is None:
-        return None
-    try:
-        if isinstance(value, float) and math.isnan(value):
-            return None
-    except Exception:
-        pass
-    try:
-        if pd.isna(value):
-            return None
-    except Exception:
-        pass
-    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
-        return value.isoformat()
-    if isinstance(value, Decimal):
-        return float(value)
-    return value
-
-
-def _clean_number(value):
-    """
-    Converte strings monetárias/numéricas com vírgula/ponto/R$/% para float.
-    Respeita ponto como separador decimal quando não há vírgula (não zera decimais).
-    """
-    if value is None:
-        return None
-    if isinstance(value, (int, float, Decimal)) and not (isinstance(value, float) and math.isnan(value)):
-        return float(value)
-    if isinstance(value, str):
-        cleaned = (
-            value.replace("R$", "")
-            .replace("%", "")
-            .replace(" ", "")
-            .replace("\u00a0", "")  # nbsp
-        )
-        has_comma = "," in cleaned
-        has_dot = "." in cleaned
-
-        if has_comma and has_dot:
-            # assume dot = thousand, comma = decimal
-            cleaned = cleaned.replace(".", "").replace(",", ".")
-        elif has_comma:
-            # assume comma decimal, strip thousand dots if any
-            cleaned = cleaned.replace(".", "").replace(",", ".")
-        else:
-            # only dot or digits -> keep dot as decimal
-            cleaned = cleaned
-
-        try:
-            num = float(cleaned)
-            if math.isnan(num):
-                return None
-            return num
-        except Exception:
-            return None
-    try:
-        num = float(value)
-        if math.isnan(num):
-            return None
-        return num
-    except Exception:
-        return None
-
-
-def normalize_raw_data(raw: dict) -> dict:
-    """
-    Garante que campos que começam com 'valor' ou 'comiss' sejam numéricos.
-    """
-    if not isinstance(raw, dict):
-        return raw
-    normalized = {}
-    for k, v in raw.items():
-        key_lower = k.lower()
-        if key_lower.startswith("valor") or key_lower.startswith("comiss"):
-            parsed = _clean_number(v)
-            normalized[k] = parsed if parsed is not None else serialize_value(v)
-        else:
-            normalized[k] = serialize_value(v)
-    return normalized
-
-
 def serialize_row(row: DatasetRow, include_raw_data: bool = True) -> dict:
     return {
         "id": row.id,
@@ -139,103 +65,165 @@ def serialize_row(row: DatasetRow, include_raw_data: bool = True) -> dict:
     }
 
 
-@router.post("/upload", response_model=DatasetResponse, status_code=status.HTTP_201_CREATED)
+def _dataset_json(dataset: Dataset, status_code: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content=jsonable_encoder(DatasetResponse.model_validate(dataset)),
+    )
+
+
+@router.post(
+    "/upload",
+    response_model=IngestionJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_200_OK: {"model": DatasetResponse},
+        status.HTTP_201_CREATED: {"model": DatasetResponse},
+    },
+)
 async def upload_csv(
     file: UploadFile = File(...),
     user_id: int | None = Query(None),
+    wait: bool = Query(False, description="Processar na própria requisição e retornar o dataset (201)"),
+    reuse_existing: bool = Query(
+        False, description="Se o usuário já enviou exatamente este arquivo, retorna o dataset existente (200)"
+    ),
+    mode: str | None = Query(
+        None, description="append (padrão) insere tudo; merge faz upsert pela chave natural (MERGE_KEY_COLUMNS)"
+    ),
     db: Session = Depends(get_db)
 ):
-    """Upload e processar arquivo CSV."""
+    """
+    Upload de arquivo CSV, também compactado: .csv.gz ou .zip com um ou mais CSVs
+    (todos vão para o mesmo dataset). A descompressão é feita em stream durante o parse.
+    Planilhas .xlsx são lidas linha a linha (primeira planilha), com os mesmos aliases.
+
+    Por padrão o arquivo é salvo e enfileirado: a resposta é 202 com o job de ingestão,
+    cujo progresso pode ser acompanhado em GET /datasets/jobs/{job_id}.
+    Com wait=true o CSV é processado na requisição e o dataset criado é retornado (201).
+
+    O SHA-256 do arquivo fica em Dataset.content_hash. Com reuse_existing=true, um arquivo
+    idêntico a um já enviado pelo mesmo usuário não é reprocessado: a resposta traz o
+    dataset existente (200) ou o job que ainda está processando esse arquivo (202).
+
+    Com mode=merge, linhas cuja chave natural (ID do pedido/ID do item/Modelo de ID, por
+    padrão) já existe para o usuário são atualizadas só se algum valor mudou, em vez de
+    duplicadas; elas passam a pertencer ao dataset do upload que as alterou.
+
+    Arquivos acima de MAX_UPLOAD_MB são recusados com 413.
+    """
     # Validate file type
-    if not file.filename.endswith('.csv'):
+    if not UploadArchive.is_supported(file.filename):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Apenas arquivos CSV são permitidos"
+            detail="Apenas arquivos CSV (.csv, .csv.gz ou .zip) ou planilhas .xlsx são permitidos"
         )
     
-    # Read file content
-    file_content = await file.read()
-    
-    # Validate and process CSV
-    df, errors = CSVService.validate_csv(file_content, file.filename)
-    
-    if df is None:
+    mode = mode or settings.INGESTION_MODE
+    if mode not in INGESTION_MODES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erro ao processar CSV: {'; '.join(errors)}"
+            detail=f"Modo de ingestão inválido: {mode}. Use {' ou '.join(sorted(INGESTION_MODES))}."
         )
-    
-    # Create dataset record
+
     user = get_any_user(db, user_id)
-    dataset = Dataset(
-        user_id=user.id,
-        filename=file.filename
-    )
-    db.add(dataset)
-    db.flush()  # Get dataset.id
-    
-    # Convert DataFrame to list of dicts
-    rows_data = CSVService.dataframe_to_dict_list(df)
 
-    def _sanitize(value):
-        if value is None:
-            return None
-        try:
-            if isinstance(value, float) and math.isnan(value):
-                return None
-        except Exception:
-            pass
+    # Copia o corpo para o spool em blocos (hash no caminho, limite de MAX_UPLOAD_MB);
+    # o parser lê do arquivo em disco, nunca de uma cópia inteira em memória
+    try:
+        file_path, content_hash, _ = await UploadSpooler.spool(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    if wait:
         try:
-            if pd.isna(value):
-                return None
-        except Exception:
-            pass
-        if isinstance(value, pd.Timestamp):
-            return value.to_pydatetime().isoformat()
-        if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
-            return value.isoformat()
-        if isinstance(value, Decimal):
-            return float(value)
-        if hasattr(value, "item"):
+            if reuse_existing:
+                existing = IngestionService.find_existing_dataset(db, user.id, content_hash)
+                if existing:
+                    return _dataset_json(existing, status.HTTP_200_OK)
+
+            # Create dataset record
+            dataset = Dataset(
+                user_id=user.id,
+                filename=file.filename,
+                content_hash=content_hash,
+                mode=mode,
+            )
+            db.add(dataset)
+            db.flush()  # Get dataset.id
+
+            # Validate, process and insert CSV chunk by chunk
             try:
-                return value.item()
-            except Exception:
-                return value
-        return value
-    
-    # Create dataset rows
-    dataset_rows = []
-    for row_data in rows_data:
-        raw_data = row_data.get("raw_data") if isinstance(row_data, dict) else None
-        raw_data_json = normalize_raw_data(raw_data) if raw_data is not None else raw_data
-        dataset_row = DatasetRow(
-            dataset_id=dataset.id,
-            user_id=user.id,
-            date=row_data['date'],
-            time=row_data.get('time'),
-            product=row_data['product'],
-            revenue=row_data['revenue'],
-            cost=row_data['cost'],
-            commission=row_data['commission'],
-            profit=row_data['profit'],
-            status=row_data.get('status'),
-            category=row_data.get('category'),
-            sub_id1=row_data.get('sub_id1'),
-            mes_ano=row_data.get('mes_ano'),
-            raw_data=raw_data_json,
+                IngestionService.ingest_file(
+                    db, dataset, file_path, file.filename, content_hash=content_hash, mode=mode
+                )
+            except CSVValidationError as e:
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Erro ao processar CSV: {e}"
+                )
+        finally:
+            UploadSpooler.remove(file_path)
+
+        db.commit()
+        db.refresh(dataset)
+        return _dataset_json(dataset, status.HTTP_201_CREATED)
+
+    if reuse_existing:
+        existing = IngestionService.find_existing_dataset(db, user.id, content_hash)
+        pending_job = None if existing else IngestionService.find_pending_job(db, user.id, content_hash)
+        if existing or pending_job:
+            IngestionService.remove_spool_file(file_path)
+            if existing:
+                return _dataset_json(existing, status.HTTP_200_OK)
+            return IngestionService.job_to_response(pending_job)
+
+    job = IngestionService.enqueue(db, user.id, file.filename, file_path, content_hash, mode)
+    ingestion_worker_pool.notify()
+    return IngestionService.job_to_response(job)
+
+
+@router.get("/ingestion/stats")
+def get_ingestion_stats():
+    """Contadores internos da ingestão (cache de resolução de colunas por cabeçalho)."""
+    return {"column_map_cache": CSVService.column_map_cache_stats()}
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+def get_ingestion_job(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """Status e progresso de um job de ingestão (linhas lidas/gravadas, avisos e ETA)."""
+    job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de ingestão não encontrado"
         )
-        dataset_rows.append(dataset_row)
-    
-    db.add_all(dataset_rows)
-    db.commit()
-    db.refresh(dataset)
-    
-    # Return response with warnings if any
-    if errors:
-        # Note: In production, you might want to return warnings differently
-        pass
-    
-    return dataset
+    return IngestionService.job_to_response(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJobResponse)
+def cancel_ingestion_job(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """Cancela um job de ingestão. Nada do que já foi processado é mantido."""
+    job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de ingestão não encontrado"
+        )
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job de ingestão já finalizado"
+        )
+    job = IngestionService.request_cancel(db, job)
+    return IngestionService.job_to_response(job)
 
 
 class AdSpendPayload(BaseModel):
@@ -294,9 +282,9 @@ def set_ad_spend(
         for row in batch:
             raw = dict(row.raw_data) if row.raw_data else {}
             # acumula com valor anterior se existir
-            prev = raw.get("Valor gasto anuncios")
-            prev_val = _clean_number(prev) or 0
-            raw["Valor gasto anuncios"] = prev_val + amount_per_row
+            prev = raw.get(AD_SPEND_KEY)
+            prev_val = clean_number(prev) or 0
+            raw[AD_SPEND_KEY] = prev_val + amount_per_row
             mappings.append({"id": row.id, "raw_data": raw})
             updated += 1
         
@@ -306,6 +294,10 @@ def set_ad_spend(
         
         processed += len(batch)
 
+    # Depois dos lotes: uma resposta cacheada no meio do rateio também fica invalidada
+    DashboardCache.bump_version(db, latest.user_id)
+    db.commit()
+
     return {
         "updated": updated,
         "dataset_id": latest.id,
@@ -487,17 +479,26 @@ def get_dataset(
 
 
 @router.post("/{dataset_id}/refresh", response_model=DatasetResponse)
-async def refresh_dataset(
+def refresh_dataset(
     dataset_id: int,
+    discard_ad_spend: bool = Query(
+        False, description="Regravar mesmo se o dataset tiver rateio de anúncios (o rateio é perdido)"
+    ),
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Reprocessar/atualizar um dataset.
+    Reprocessar/atualizar um dataset do usuário autenticado.
     
+    Se o frame normalizado do arquivo estiver no cache em disco (PARSED_CACHE_DIR), as
+    linhas do dataset são regravadas a partir dele, sem parsear o CSV novamente. Como as
+    linhas voltam ao estado do upload, um dataset com rateio de anúncios (ad_spend) só é
+    regravado com discard_ad_spend=true; sem ele, a resposta é 409.
     Nota: Este endpoint está preparado para integração futura com API externa.
-    Por enquanto, apenas retorna o dataset existente.
     """
-    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    dataset = db.query(Dataset).filter(
+        Dataset.id == dataset_id, Dataset.user_id == current_user.id
+    ).first()
     
     if not dataset:
         raise HTTPException(
@@ -505,8 +506,18 @@ async def refresh_dataset(
             detail="Dataset não encontrado"
         )
     
+    if ParsedFrameCache.exists(dataset.content_hash, dataset.mode):
+        if not discard_ad_spend and IngestionService.has_ad_spend(db, dataset):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="O dataset tem rateio de anúncios, que seria perdido ao regravar as linhas. "
+                       "Use discard_ad_spend=true para regravar mesmo assim."
+            )
+        IngestionService.reload_from_cache(db, dataset)
+        db.commit()
+        db.refresh(dataset)
+
     # TODO: Implementar lógica de atualização via API externa quando necessário
-    # Por enquanto, apenas retorna o dataset existente
     
     return dataset
 
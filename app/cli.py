@@ -0,0 +1,123 @@
+"""
+Linha de comando do backend.
+
+    python -m app.cli import <diretório> --user-id N [--workers 4] [--mode append|merge]
+
+import: carga offline de um diretório de exportações (.csv, .csv.gz, .zip, .xlsx), sem
+passar pela API. Cada arquivo vira um dataset do usuário, gravado via COPY direto em
+dataset_rows, com vários arquivos em paralelo (--workers processos). Os arquivos de um mesmo
+usuário são gravados um de cada vez (os triggers do rollup atualizam as mesmas linhas): em
+paralelo corre só o parse do primeiro bloco de cada arquivo. O andamento fica
+num checkpoint (por padrão <diretório>/.dashads-import.json): rodar o mesmo comando de novo
+retoma do ponto em que parou, pulando arquivos já importados e refazendo os que falharam.
+Arquivos com o mesmo conteúdo de um dataset já existente do usuário são pulados
+(--allow-duplicates desativa). Ao fim, mostra o resumo de vazão.
+
+    python -m app.cli rebuild-rollups [--user-id N]
+
+rebuild-rollups: recalcula o rollup diário do dashboard (dataset_daily_rollups) e o
+dicionário de produtos (user_products) a partir de dataset_rows, de um usuário ou de todos. Os triggers já o mantêm em dia; serve para reparo,
+ex.: depois de escritas feitas com os triggers desativados. Escritas em dataset_rows esperam
+o fim do recálculo.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+from app.core.config import settings
+from app.db.base import init_db
+from app.db.session import SessionLocal, engine
+from app.models.user import User
+from app.services.bulk_import import IMPORT_EXISTING, IMPORT_FAILED, BulkImporter
+from app.services.ingestion_service import INGESTION_MODES
+from app.services.rollup_service import RollupService
+
+
+def _print_result(result: dict) -> None:
+    if result["status"] == IMPORT_FAILED:
+        line = f"FALHOU  {result['relpath']}: {result['error']}"
+    elif result["status"] == IMPORT_EXISTING:
+        line = f"existing {result['relpath']} -> dataset {result['dataset_id']} (mesmo conteúdo, não reimportado)"
+    else:
+        rows_per_sec = round(result["rows"] / result["seconds"]) if result.get("seconds") else 0
+        line = (
+            f"{result['status']:<8} {result['relpath']} -> dataset {result['dataset_id']} "
+            f"({result['rows']} linhas, {result.get('seconds', 0.0)}s, {rows_per_sec} linhas/s)"
+        )
+    print(line, file=sys.stderr, flush=True)
+
+
+def import_command(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.directory):
+        print(f"Diretório não encontrado: {args.directory}", file=sys.stderr)
+        return 2
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.get(User, args.user_id) is None:
+            print(f"Usuário {args.user_id} não encontrado", file=sys.stderr)
+            return 2
+    finally:
+        db.close()
+
+    summary = BulkImporter.run(
+        args.directory,
+        args.user_id,
+        workers=args.workers,
+        mode=args.mode,
+        checkpoint_path=args.checkpoint,
+        skip_existing=not args.allow_duplicates,
+        on_result=_print_result,
+    )
+    print(
+        f"{summary['imported']} importado(s), {summary['existing']} já existente(s), "
+        f"{summary['skipped']} pulado(s), {summary['failed']} com falha de {summary['files']} arquivo(s); "
+        f"{summary['rows']} linhas em {summary['seconds']}s "
+        f"({summary['rows_per_sec']} linhas/s, {summary['mb_per_sec']} MB/s)",
+        file=sys.stderr,
+    )
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if summary["failed"] else 0
+
+
+def rebuild_rollups_command(args: argparse.Namespace) -> int:
+    init_db()
+    with engine.begin() as conn:
+        rows = RollupService.rebuild(conn, args.user_id)
+    target = f"usuário {args.user_id}" if args.user_id is not None else "todos os usuários"
+    print(f"Rollup recalculado para {target}: {rows} linhas de dataset_rows", file=sys.stderr)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Importa um diretório de exportações para um usuário")
+    importer.add_argument("directory", help="Diretório com os arquivos (percorrido recursivamente)")
+    importer.add_argument("--user-id", type=int, required=True, help="Dono dos datasets criados")
+    importer.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                          help="Processos em paralelo (padrão: número de CPUs); os arquivos do usuário "
+                               "são gravados um de cada vez")
+    importer.add_argument("--mode", choices=sorted(INGESTION_MODES), default=settings.INGESTION_MODE,
+                          help="merge grava os arquivos em ordem, num processo só")
+    importer.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: <diretório>/.dashads-import.json)")
+    importer.add_argument("--allow-duplicates", action="store_true",
+                          help="Importa mesmo arquivos com conteúdo idêntico a um dataset já existente")
+    importer.set_defaults(handler=import_command)
+
+    rollups = commands.add_parser("rebuild-rollups", help="Recalcula o rollup diário do dashboard")
+    rollups.add_argument("--user-id", type=int, help="Só este usuário (padrão: todos)")
+    rollups.set_defaults(handler=rebuild_rollups_command)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
+import os
+import tempfile
 
 
 class Settings(BaseSettings):
@@ -21,6 +23,59 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "DashAds Backend"
     ENVIRONMENT: str = "development"
     
+    # Ingestão de CSV (linhas por bloco no upload em streaming)
+    CSV_CHUNK_SIZE: int = 50000
+    # Grava as linhas via COPY (BulkLoader); False volta ao INSERT via ORM
+    CSV_USE_COPY: bool = True
+    # Modo padrão do upload: "append" (sempre insere) ou "merge" (upsert pela chave natural)
+    INGESTION_MODE: str = "append"
+    # Colunas do CSV que identificam uma linha no modo merge
+    MERGE_KEY_COLUMNS: list[str] = ["ID do pedido", "ID do item", "Modelo de ID"]
+    
+    # Jobs de ingestão em background (fila na tabela ingestion_jobs)
+    INGESTION_WORKERS: int = 2  # threads por processo; 0 desativa os workers neste processo
+    INGESTION_POLL_INTERVAL: float = 2.0  # segundos entre consultas à fila quando ociosa
+    INGESTION_JOB_TIMEOUT: int = 600  # segundos sem heartbeat para um job "running" ser retomado
+    INGESTION_SPOOL_DIR: str = os.path.join(tempfile.gettempdir(), "dashads-uploads")
+    # O spool é local: cada job só é processado no host que recebeu o upload. True se
+    # INGESTION_SPOOL_DIR for um diretório compartilhado entre hosts (ex.: NFS)
+    INGESTION_SPOOL_SHARED: bool = False
+    MAX_UPLOAD_MB: int = 200  # tamanho máximo de um upload; 0 desativa o limite
+    
+    # Parse de CSVs grandes em processos paralelos (ParallelParser); 0 ou 1 desativa
+    INGESTION_PARSE_PROCESSES: int = 0
+    INGESTION_PARSE_MIN_MB: int = 64  # arquivos menores são parseados no próprio worker
+    INGESTION_PARSE_PIECE_MB: int = 16  # tamanho de cada pedaço enviado a um processo
+    INGESTION_PARSE_MEMORY_MB: int = 0  # limite de memória (RLIMIT_AS) por processo; 0 = sem limite
+    
+    # Otimização de tipos do frame normalizado (category para texto repetitivo, números
+    # compactos) e relatório de memória por ingestão (log e status do job)
+    INGESTION_OPTIMIZE_DTYPES: bool = True
+    INGESTION_CATEGORY_MAX_RATIO: float = 0.5  # máx. de valores distintos / linhas para virar category
+    INGESTION_MEMORY_STATS: bool = True
+    
+    # Cache em disco do frame já normalizado (Parquet, por SHA-256 do arquivo e modo), usado por
+    # POST /datasets/{id}/refresh. Vazio desativa; requer pyarrow instalado.
+    PARSED_CACHE_DIR: str = ""
+    
+    # Dashboard lê do rollup diário (dataset_daily_rollups) quando os filtros permitem;
+    # False força a leitura de dataset_rows. O rollup é mantido pelos triggers de qualquer forma.
+    DASHBOARD_USE_ROLLUP: bool = True
+    # GET /dashboard numa única consulta (GROUPING SETS); False volta às três consultas separadas
+    DASHBOARD_SINGLE_QUERY: bool = True
+    # Produtos listados em GET /dashboard (top-N por lucro; o resto vem somado em "Outros" e
+    # segue paginado em /dashboard/products); 0 lista todos
+    DASHBOARD_PRODUCT_LIMIT: int = 50
+    # Cache das respostas do dashboard (DashboardCache): "memory" (LRU por processo),
+    # "redis" (compartilhado; requer o pacote redis e DASHBOARD_CACHE_URL) ou "none"
+    DASHBOARD_CACHE_BACKEND: str = "memory"
+    DASHBOARD_CACHE_URL: str = ""  # ex.: redis://localhost:6379/0
+    DASHBOARD_CACHE_TTL: int = 300  # segundos
+    DASHBOARD_CACHE_MAX_ENTRIES: int = 1000  # só no backend em memória
+    DASHBOARD_CACHE_MAX_MB: int = 64  # só no backend em memória
+    # Modo debug das consultas analíticas: POST /analytics/query aceita explain=true
+    QUERY_DEBUG: bool = False
+    
     # CORS (for production)
     CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
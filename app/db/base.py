@@ -10,13 +10,15 @@ def init_db():
     """Initialize database tables."""
     # Import engine here to avoid circular import
     from app.db.session import engine
+    from app.services.rollup_service import RollupService
+    from app.services.product_search import ProductSearch
     from sqlalchemy import text
     import time
     import logging
     
     # Import all models to register them with Base.metadata
     # This must happen before create_all()
-    from app.models import User, Dataset, DatasetRow, Subscription, AdSpend  # noqa: F401
+    from app.models import User, Dataset, DatasetRow, Subscription, AdSpend, IngestionJob, DailyRollup, UserProduct  # noqa: F401
     
     logger = logging.getLogger(__name__)
     
@@ -33,6 +35,7 @@ def init_db():
                 conn.execute(text("ALTER TABLE IF EXISTS users ADD COLUMN IF NOT EXISTS name VARCHAR(255)"))
                 conn.execute(text("ALTER TABLE IF EXISTS users ADD COLUMN IF NOT EXISTS cpf_cnpj VARCHAR(32)"))
                 conn.execute(text("ALTER TABLE IF EXISTS users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ"))
+                conn.execute(text("ALTER TABLE IF EXISTS users ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0"))
                 conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS users_cpf_cnpj_key ON users (cpf_cnpj) WHERE cpf_cnpj IS NOT NULL"))
                 # Dataset rows new columns
                 conn.execute(text("ALTER TABLE IF EXISTS dataset_rows ADD COLUMN IF NOT EXISTS time TIME"))
@@ -41,8 +44,34 @@ def init_db():
                 conn.execute(text("ALTER TABLE IF EXISTS dataset_rows ADD COLUMN IF NOT EXISTS sub_id1 VARCHAR(255)"))
                 conn.execute(text("ALTER TABLE IF EXISTS dataset_rows ADD COLUMN IF NOT EXISTS mes_ano VARCHAR(20)"))
                 conn.execute(text("ALTER TABLE IF EXISTS dataset_rows ADD COLUMN IF NOT EXISTS raw_data JSONB"))
+                # Fingerprint dos uploads
+                conn.execute(text("ALTER TABLE IF EXISTS datasets ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+                conn.execute(text("ALTER TABLE IF EXISTS ingestion_jobs ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+                # Ingestão em modo merge
+                conn.execute(text("ALTER TABLE IF EXISTS dataset_rows ADD COLUMN IF NOT EXISTS row_key VARCHAR"))
+                conn.execute(text("ALTER TABLE IF EXISTS ingestion_jobs ADD COLUMN IF NOT EXISTS mode VARCHAR NOT NULL DEFAULT 'append'"))
+                conn.execute(text("ALTER TABLE IF EXISTS datasets ADD COLUMN IF NOT EXISTS mode VARCHAR NOT NULL DEFAULT 'append'"))
+                # Relatório de memória dos jobs
+                conn.execute(text("ALTER TABLE IF EXISTS ingestion_jobs ADD COLUMN IF NOT EXISTS memory_stats JSON"))
+                # Host do spool de cada job
+                conn.execute(text("ALTER TABLE IF EXISTS ingestion_jobs ADD COLUMN IF NOT EXISTS spool_host VARCHAR"))
             # If connection successful, create tables (no-op for existing)
             Base.metadata.create_all(bind=engine)
+            # Índices de colunas novas em tabelas já existentes (create_all não os cria)
+            with engine.begin() as conn:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS idx_datasets_user_content_hash ON datasets (user_id, content_hash)"))
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_dataset_rows_user_row_key "
+                    "ON dataset_rows (user_id, row_key) WHERE row_key IS NOT NULL"
+                ))
+                for metric in ["revenue", "cost", "commission", "profit"]:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_user_{metric} ON dataset_rows (user_id, {metric})"))
+            # Rollup diário do dashboard e dicionário de produtos: triggers em dataset_rows (e preenchimento inicial)
+            with engine.begin() as conn:
+                RollupService.install(conn)
+            # Índices trigram da busca por produto (se o pg_trgm estiver disponível)
+            with engine.begin() as conn:
+                ProductSearch.install(conn)
             logger.info("Database tables created/updated successfully")
             return
         except Exception as e:
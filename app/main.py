@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import auth, datasets, dashboard, ad_spends
+from app.api.routes import auth, datasets, dashboard, ad_spends, analytics
+from app.api.middleware import UploadSizeLimitMiddleware
 from app.db.base import init_db
+from app.services.ingestion_service import ingestion_worker_pool
+from app.services.parallel_parser import parse_process_pool
 import logging
 
 # Configure logging
@@ -30,6 +33,16 @@ async def startup_event():
         logger.error(f"Failed to initialize database: {e}")
         raise
 
+    if settings.INGESTION_WORKERS > 0:
+        ingestion_worker_pool.start(settings.INGESTION_WORKERS)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop background ingestion workers and parse processes."""
+    ingestion_worker_pool.stop()
+    parse_process_pool.shutdown()
+
 # CORS middleware (using settings)
 app.add_middleware(
     CORSMiddleware,
@@ -39,11 +52,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Limite de tamanho dos uploads (MAX_UPLOAD_MB), aplicado antes da leitura do corpo
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(datasets.router, prefix=settings.API_V1_STR)
 app.include_router(dashboard.router, prefix=settings.API_V1_STR)
 app.include_router(ad_spends.router, prefix=settings.API_V1_STR)
+app.include_router(analytics.router, prefix=settings.API_V1_STR)
 
 
 @app.get("/")
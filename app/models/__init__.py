@@ -4,6 +4,9 @@ from app.models.dataset import Dataset
 from app.models.dataset_row import DatasetRow
 from app.models.subscription import Subscription
 from app.models.ad_spend import AdSpend
+from app.models.ingestion_job import IngestionJob
+from app.models.daily_rollup import DailyRollup
+from app.models.user_product import UserProduct
 
-__all__ = ["User", "Dataset", "DatasetRow", "Subscription", "AdSpend"]
+__all__ = ["User", "Dataset", "DatasetRow", "Subscription", "AdSpend", "IngestionJob", "DailyRollup", "UserProduct"]
 
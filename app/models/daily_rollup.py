@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Index, Integer, Numeric, String
+from app.db.base import Base
+
+
+class DailyRollup(Base):
+    """
+    Totais diários de dataset_rows por (usuário, data, produto, sub_id1, status, categoria),
+    mantidos pelos triggers de dataset_rows (ver RollupService). Dimensões ausentes ficam
+    como "" para participarem da chave primária (NULL não conflita no ON CONFLICT).
+    """
+    __tablename__ = "dataset_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    product = Column(String, primary_key=True)
+    sub_id1 = Column(String, primary_key=True, default="")
+    status = Column(String, primary_key=True, default="")
+    category = Column(String, primary_key=True, default="")
+
+    revenue = Column(Numeric(18, 2), nullable=False, default=0)
+    cost = Column(Numeric(18, 2), nullable=False, default=0)
+    commission = Column(Numeric(18, 2), nullable=False, default=0)
+    profit = Column(Numeric(18, 2), nullable=False, default=0)
+    row_count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('idx_rollup_user_product', 'user_id', 'product'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -11,8 +11,13 @@ class Dataset(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     filename = Column(String, nullable=False)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    content_hash = Column(String(64), nullable=True)  # SHA-256 do arquivo enviado
+    mode = Column(String, nullable=False, default="append")  # modo de ingestão: append ou merge
 
     # Relationships
     user = relationship("User", back_populates="datasets")
     rows = relationship("DatasetRow", back_populates="dataset", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('idx_datasets_user_content_hash', 'user_id', 'content_hash'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, Time, ForeignKey, Index, JSON
+from sqlalchemy import Column, Integer, String, Numeric, Date, Time, ForeignKey, Index, JSON, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -24,6 +24,7 @@ class DatasetRow(Base):
     sub_id1 = Column(String, nullable=True, index=True)
     mes_ano = Column(String, nullable=True, index=True)  # formato YYYY-MM
     raw_data = Column(JSON, nullable=True)  # dados completos da linha
+    row_key = Column(String, nullable=True)  # chave natural (ingestão em modo merge)
     
     # Métricas financeiras (campos originais para compatibilidade)
     revenue = Column(Numeric(12, 2), nullable=True)
@@ -50,5 +51,16 @@ class DatasetRow(Base):
         Index('idx_user_transaction_date', 'user_id', 'transaction_date'),
         Index('idx_user_product_platform', 'user_id', 'product', 'platform'),
         Index('idx_date_platform', 'date', 'platform'),
+        # Filtros por faixa de valor (revenue_min, profit_max...); juntos, também atendem o
+        # min_value/max_value legado, um OR das quatro colunas, via BitmapOr
+        Index('idx_user_revenue', 'user_id', 'revenue'),
+        Index('idx_user_cost', 'user_id', 'cost'),
+        Index('idx_user_commission', 'user_id', 'commission'),
+        Index('idx_user_profit', 'user_id', 'profit'),
+        # Upsert do modo merge (INSERT ... ON CONFLICT); linhas sem chave não participam
+        Index(
+            'uq_dataset_rows_user_row_key', 'user_id', 'row_key',
+            unique=True, postgresql_where=text('row_key IS NOT NULL'),
+        ),
     )
 
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id", ondelete="SET NULL"), nullable=True)
+    filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)  # arquivo salvo no spool local até ser processado
+    spool_host = Column(String, nullable=True)  # host cujo spool guarda file_path
+    content_hash = Column(String(64), nullable=True)  # SHA-256 do arquivo, repassado ao Dataset
+    mode = Column(String, nullable=False, default="append")  # append ou merge
+
+    # queued, running, completed, failed, canceled
+    status = Column(String, nullable=False, default="queued", index=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+
+    # Progresso
+    total_bytes = Column(BigInteger, nullable=True)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+    rows_parsed = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    warnings = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    memory_stats = Column(JSON, nullable=True)  # MemoryReport: tamanho dos blocos por etapa e pico de RSS
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    user = relationship("User")
+    dataset = relationship("Dataset")
+
+    __table_args__ = (
+        Index('idx_ingestion_jobs_status_id', 'status', 'id'),
+    )
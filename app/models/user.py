@@ -15,6 +15,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # versão dos dados (cache do dashboard)
 
     # Relationships
     datasets = relationship("Dataset", back_populates="user", cascade="all, delete-orphan")
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String
+from app.db.base import Base
+
+
+class UserProduct(Base):
+    """
+    Dicionário de produtos distintos de cada usuário, com o número de linhas de cada um,
+    mantido pelos mesmos triggers do rollup diário (ver RollupService). Atende o
+    autocomplete sem tocar em dataset_rows.
+    """
+    __tablename__ = "user_products"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    product = Column(String, primary_key=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
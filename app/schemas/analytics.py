@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from pydantic import BaseModel, Field
+from typing import Any, Optional, List, Dict
 from datetime import date
 from enum import Enum
 
@@ -9,6 +9,9 @@ class DimensionType(str, Enum):
     PRODUCT = "product"
     PLATFORM = "platform"
     DATE = "date"
+    STATUS = "status"  # Status do pedido
+    CATEGORY = "category"  # Categoria Global L1
+    SUB_ID1 = "sub_id1"
 
 
 class MetricType(str, Enum):
@@ -19,6 +22,13 @@ class MetricType(str, Enum):
     QUANTITY = "quantity"  # Quantidade
 
 
+class TimeSeriesPeriod(str, Enum):
+    """Granularidade da série temporal (date_trunc no banco)."""
+    DAILY = "daily"
+    WEEKLY = "weekly"  # semanas começando na segunda-feira
+    MONTHLY = "monthly"
+
+
 class AnalyticsFilters(BaseModel):
     """Filtros para análises analíticas."""
     start_date: Optional[date] = None
@@ -58,7 +68,7 @@ class TimeSeriesResponse(BaseModel):
 
 class DimensionBreakdown(BaseModel):
     """Agregação por dimensão (produto ou plataforma)."""
-    dimension_value: str  # Nome do produto ou plataforma
+    dimension_value: str  # Nome do produto, plataforma, status... (ou data, em ISO)
     gross_value: float
     commission_value: float
     net_value: float
@@ -68,8 +78,8 @@ class DimensionBreakdown(BaseModel):
 
 class DimensionBreakdownResponse(BaseModel):
     """Resposta de breakdown por dimensão."""
-    dimension: str  # product ou platform
-    metric: str  # gross, commission, net
+    dimension: str  # product, platform, date, status, category ou sub_id1
+    metric: str  # gross, commission, net ou quantity
     data: List[DimensionBreakdown]
     total: float
 
@@ -108,3 +118,31 @@ class FullDashboardResponse(BaseModel):
     breakdowns: Dict[str, DimensionBreakdownResponse]  # Múltiplos breakdowns
     growth: Optional[List[GrowthMetrics]] = None
 
+
+
+class AggregateQuery(BaseModel):
+    """Consulta genérica: métricas agrupadas por até 3 dimensões (QueryPlanner)."""
+    dimensions: List[DimensionType] = []
+    metrics: List[MetricType] = [MetricType.GROSS]
+    filters: AnalyticsFilters = AnalyticsFilters()
+    period: TimeSeriesPeriod = TimeSeriesPeriod.DAILY  # granularidade da dimensão date
+    order_by: Optional[MetricType] = None  # ordena pela métrica (decrescente); sem ela, pelas dimensões
+    limit: Optional[int] = Field(None, ge=1)
+    explain: bool = False  # plano da consulta na resposta (só com QUERY_DEBUG)
+
+
+class AggregateQueryPlan(BaseModel):
+    """Plano escolhido: tabela lida, motivo, SQL e EXPLAIN do PostgreSQL."""
+    source: str
+    reason: str
+    sql: str
+    explain: List[str]
+
+
+class AggregateQueryResponse(BaseModel):
+    """Linhas da consulta: uma chave por dimensão (date em ISO) e por métrica."""
+    source: str  # rollup ou dataset_rows
+    dimensions: List[str]
+    metrics: List[str]
+    rows: List[Dict[str, Any]]
+    plan: Optional[AggregateQueryPlan] = None
@@ -9,6 +9,17 @@ class DashboardFilters(BaseModel):
     product: Optional[str] = None
     min_value: Optional[float] = None
     max_value: Optional[float] = None
+    # Faixas por métrica, atendidas pelos índices (user_id, métrica) de dataset_rows
+    revenue_min: Optional[float] = None
+    revenue_max: Optional[float] = None
+    cost_min: Optional[float] = None
+    cost_max: Optional[float] = None
+    commission_min: Optional[float] = None
+    commission_max: Optional[float] = None
+    profit_min: Optional[float] = None
+    profit_max: Optional[float] = None
+    # Produtos listados no dashboard (top-N por lucro); None usa DASHBOARD_PRODUCT_LIMIT
+    product_limit: Optional[int] = None
 
 
 class KPIs(BaseModel):
@@ -37,8 +48,28 @@ class ProductAggregation(BaseModel):
     row_count: int
 
 
+class OthersAggregation(ProductAggregation):
+    """Soma dos produtos fora do top-N ("Outros")."""
+    product_count: int
+
+
+class ProductPage(BaseModel):
+    items: List[ProductAggregation]
+    others: Optional[OthersAggregation] = None  # produtos depois desta página
+    next_cursor: Optional[str] = None  # None na última página
+    product_count: int = 0  # produtos distintos com os filtros, sem o cursor: igual em todas as páginas
+
+
+class ProductSuggestion(BaseModel):
+    product: str
+    row_count: int
+
+
 class DashboardResponse(BaseModel):
     kpis: KPIs
     period_aggregations: List[PeriodAggregation]
     product_aggregations: List[ProductAggregation]
+    product_others: Optional[OthersAggregation] = None
+    product_count: int = 0  # produtos distintos com os filtros aplicados
+    product_next_cursor: Optional[str] = None  # continua em GET /dashboard/products
 
@@ -15,6 +15,7 @@ class DatasetResponse(DatasetBase):
     id: int
     user_id: int
     uploaded_at: datetime
+    content_hash: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Optional, List
+
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    user_id: int
+    dataset_id: Optional[int] = None
+    filename: str
+    status: str  # queued, running, completed, failed, canceled
+    mode: str = "append"  # append ou merge
+    cancel_requested: bool = False
+    total_bytes: Optional[int] = None
+    bytes_processed: int = 0
+    rows_parsed: int = 0
+    rows_inserted: int = 0
+    rows_unchanged: Optional[int] = None  # modo merge: linhas lidas que já estavam iguais no banco
+    warnings: List[str] = []
+    error: Optional[str] = None
+    eta_seconds: Optional[float] = None
+    memory: Optional[Dict[str, Any]] = None  # tamanho dos blocos por etapa e pico de RSS (MemoryReport)
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
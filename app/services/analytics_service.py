@@ -0,0 +1,202 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, cast, Date, String
+from typing import List
+
+from app.models.dataset_row import DatasetRow
+from app.schemas.analytics import (
+    AnalyticsFilters,
+    DimensionBreakdown,
+    DimensionBreakdownResponse,
+    DimensionType,
+    GlobalKPIs,
+    MetricType,
+    TimeSeriesPeriod,
+    TimeSeriesPoint,
+    TimeSeriesResponse,
+)
+
+# Métricas analíticas; a ingestão grava só revenue/commission/profit, então os campos do
+# Power BI (gross_value, commission_value, net_value) caem neles quando vazios
+METRIC_EXPRESSIONS = {
+    MetricType.GROSS: func.coalesce(DatasetRow.gross_value, DatasetRow.revenue),
+    MetricType.COMMISSION: func.coalesce(DatasetRow.commission_value, DatasetRow.commission),
+    MetricType.NET: func.coalesce(DatasetRow.net_value, DatasetRow.profit),
+    MetricType.QUANTITY: func.coalesce(DatasetRow.quantity, 1),
+}
+
+# Nome de cada métrica nas respostas (TimeSeriesPoint, DimensionBreakdown)
+METRIC_LABELS = {
+    MetricType.GROSS: "gross_value",
+    MetricType.COMMISSION: "commission_value",
+    MetricType.NET: "net_value",
+    MetricType.QUANTITY: "quantity",
+}
+
+DIMENSION_COLUMNS = {
+    DimensionType.PRODUCT: DatasetRow.product,
+    DimensionType.PLATFORM: DatasetRow.platform,
+    DimensionType.DATE: DatasetRow.date,
+    DimensionType.STATUS: DatasetRow.status,
+    DimensionType.CATEGORY: DatasetRow.category,
+    DimensionType.SUB_ID1: DatasetRow.sub_id1,
+}
+
+# Unidade do date_trunc de cada granularidade
+PERIOD_UNITS = {
+    TimeSeriesPeriod.DAILY: "day",
+    TimeSeriesPeriod.WEEKLY: "week",
+    TimeSeriesPeriod.MONTHLY: "month",
+}
+
+# Rótulo das linhas sem valor na dimensão
+EMPTY_DIMENSION_LABEL = "Não informado"
+
+
+def _ratio(numerator: float, denominator: float, scale: float = 1.0) -> float:
+    return round(numerator / denominator * scale, 2) if denominator else 0.0
+
+
+class AnalyticsService:
+    """
+    Análises do dashboard (schemas de app/schemas/analytics.py) agregadas no banco: KPIs
+    globais, série temporal com date_trunc e breakdown por dimensão. Cada resposta traz só
+    os totais, em vez das linhas de /datasets/all/rows.
+    """
+
+    @staticmethod
+    def build_filters(user_id: int, filters: AnalyticsFilters) -> List:
+        """Condições dos filtros; min_value/max_value valem para o valor bruto (gross) da linha."""
+        conditions = [DatasetRow.user_id == user_id]
+
+        if filters.start_date:
+            conditions.append(DatasetRow.date >= filters.start_date)
+
+        if filters.end_date:
+            conditions.append(DatasetRow.date <= filters.end_date)
+
+        if filters.product_name:
+            conditions.append(DatasetRow.product.ilike(f"%{filters.product_name}%"))
+
+        if filters.platform:
+            conditions.append(DatasetRow.platform == filters.platform)
+
+        if filters.min_value is not None:
+            conditions.append(METRIC_EXPRESSIONS[MetricType.GROSS] >= filters.min_value)
+
+        if filters.max_value is not None:
+            conditions.append(METRIC_EXPRESSIONS[MetricType.GROSS] <= filters.max_value)
+
+        return conditions
+
+    @staticmethod
+    def metric_sums() -> List:
+        """Somas das quatro métricas, rotuladas como nos schemas."""
+        return [func.sum(expression).label(METRIC_LABELS[metric]) for metric, expression in METRIC_EXPRESSIONS.items()]
+
+    @staticmethod
+    def get_kpis(db: Session, user_id: int, filters: AnalyticsFilters) -> GlobalKPIs:
+        """Totais e indicadores: ticket médio, comissão média, taxa de comissão e margem líquida (%)."""
+        conditions = AnalyticsService.build_filters(user_id, filters)
+        result = db.query(*AnalyticsService.metric_sums()).filter(and_(*conditions)).first()
+
+        total_sales = float(result.gross_value or 0)
+        total_commissions = float(result.commission_value or 0)
+        total_net = float(result.net_value or 0)
+        total_quantity = int(result.quantity or 0)
+
+        return GlobalKPIs(
+            total_sales=total_sales,
+            total_commissions=total_commissions,
+            total_net=total_net,
+            total_quantity=total_quantity,
+            average_ticket=_ratio(total_sales, total_quantity),
+            average_commission=_ratio(total_commissions, total_quantity),
+            commission_rate=_ratio(total_commissions, total_sales, 100),
+            net_margin=_ratio(total_net, total_sales, 100),
+        )
+
+    @staticmethod
+    def get_time_series(
+        db: Session,
+        user_id: int,
+        filters: AnalyticsFilters,
+        period: TimeSeriesPeriod = TimeSeriesPeriod.DAILY
+    ) -> TimeSeriesResponse:
+        """Métricas por dia, semana (início na segunda) ou mês; `date` é o início do período."""
+        conditions = AnalyticsService.build_filters(user_id, filters)
+        bucket = cast(func.date_trunc(PERIOD_UNITS[period], DatasetRow.date), Date)
+
+        results = db.query(
+            bucket.label('bucket'),
+            *AnalyticsService.metric_sums()
+        ).filter(
+            and_(*conditions)
+        ).group_by(
+            bucket
+        ).order_by(
+            bucket
+        ).all()
+
+        return TimeSeriesResponse(
+            data=[
+                TimeSeriesPoint(
+                    date=result.bucket.isoformat(),
+                    gross_value=float(result.gross_value or 0),
+                    commission_value=float(result.commission_value or 0),
+                    net_value=float(result.net_value or 0),
+                    quantity=int(result.quantity or 0)
+                )
+                for result in results
+            ],
+            period=period.value,
+        )
+
+    @staticmethod
+    def get_breakdown(
+        db: Session,
+        user_id: int,
+        filters: AnalyticsFilters,
+        dimension: DimensionType = DimensionType.PRODUCT,
+        metric: MetricType = MetricType.GROSS,
+        limit: int = 20
+    ) -> DimensionBreakdownResponse:
+        """
+        Os `limit` maiores valores da dimensão pela métrica escolhida. percentage_of_total e
+        total consideram todas as linhas filtradas, não só as retornadas (sum() OVER ()).
+        """
+        conditions = AnalyticsService.build_filters(user_id, filters)
+        dimension_column = DIMENSION_COLUMNS[dimension]
+        metric_sum = func.sum(METRIC_EXPRESSIONS[metric])
+        total = func.sum(metric_sum).over()
+
+        results = db.query(
+            cast(dimension_column, String).label('dimension_value'),
+            *AnalyticsService.metric_sums(),
+            total.label('total')
+        ).filter(
+            and_(*conditions)
+        ).group_by(
+            dimension_column
+        ).order_by(
+            metric_sum.desc().nullslast(),
+            dimension_column
+        ).limit(limit).all()
+
+        grand_total = float(results[0].total or 0) if results else 0.0
+
+        return DimensionBreakdownResponse(
+            dimension=dimension.value,
+            metric=metric.value,
+            data=[
+                DimensionBreakdown(
+                    dimension_value=result.dimension_value if result.dimension_value is not None else EMPTY_DIMENSION_LABEL,
+                    gross_value=float(result.gross_value or 0),
+                    commission_value=float(result.commission_value or 0),
+                    net_value=float(result.net_value or 0),
+                    quantity=int(result.quantity or 0),
+                    percentage_of_total=_ratio(float(getattr(result, METRIC_LABELS[metric]) or 0), grand_total, 100)
+                )
+                for result in results
+            ],
+            total=grand_total,
+        )
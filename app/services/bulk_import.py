@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.dataset import Dataset
+from app.services.csv_service import CSVValidationError
+from app.services.ingestion_service import MODE_MERGE, IngestionService
+from app.services.upload_archive import UploadArchive
+from app.services.upload_spool import UPLOAD_READ_BLOCK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Arquivo de checkpoint gravado, por padrão, dentro do diretório importado
+CHECKPOINT_FILENAME = ".dashads-import.json"
+
+# Situação de cada arquivo no checkpoint
+IMPORT_IMPORTED = "imported"
+IMPORT_EXISTING = "existing"  # mesmo conteúdo (SHA-256) já importado para o usuário
+IMPORT_FAILED = "failed"
+
+DONE_STATUSES = {IMPORT_IMPORTED, IMPORT_EXISTING}
+
+
+class ImportTask(NamedTuple):
+    """Um arquivo do diretório a importar (caminho relativo é a chave no checkpoint)."""
+    path: str
+    relpath: str
+    size: int
+    sha256: str
+    user_id: int
+    mode: str
+    skip_existing: bool
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 do arquivo, o mesmo guardado em Dataset.content_hash pelo upload."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(UPLOAD_READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImportCheckpoint:
+    """
+    Estado de uma importação em JSON: caminho relativo -> situação, SHA-256, dataset e linhas.
+    Regravado (de forma atômica) após cada arquivo; numa nova execução, arquivos já
+    importados com o mesmo conteúdo são pulados e os que falharam são tentados de novo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                self.files = json.load(handle).get("files", {})
+
+    def is_done(self, relpath: str, sha256: str) -> bool:
+        entry = self.files.get(relpath)
+        return entry is not None and entry.get("status") in DONE_STATUSES and entry.get("sha256") == sha256
+
+    def record(self, result: Dict[str, Any]) -> None:
+        self.files[result["relpath"]] = {
+            key: result[key] for key in ("status", "sha256", "dataset_id", "rows", "bytes", "error")
+        }
+        self.save()
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"files": self.files}, handle, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _init_import_worker() -> None:
+    """Processos de importação gravam via COPY e não abrem um pool de parse próprio."""
+    settings.CSV_USE_COPY = True
+    settings.INGESTION_PARSE_PROCESSES = 0
+
+
+def import_file(task: ImportTask) -> Dict[str, Any]:
+    """
+    Importa um arquivo num dataset novo, numa transação própria: parse em blocos
+    (IngestionService.ingest_file) e COPY direto em dataset_rows. Roda nos processos
+    do pool (ou no próprio processo, com um worker). Nunca levanta: falhas voltam no
+    resultado, com status "failed".
+    """
+    start = time.perf_counter()
+    result: Dict[str, Any] = {
+        "relpath": task.relpath, "sha256": task.sha256, "bytes": task.size,
+        "status": IMPORT_FAILED, "dataset_id": None, "rows": 0, "warnings": [], "error": None,
+    }
+    db = SessionLocal()
+    try:
+        existing = (
+            IngestionService.find_existing_dataset(db, task.user_id, task.sha256) if task.skip_existing else None
+        )
+        if existing is not None:
+            result.update(status=IMPORT_EXISTING, dataset_id=existing.id)
+            return result
+
+        filename = os.path.basename(task.path)
+        dataset = Dataset(user_id=task.user_id, filename=filename, content_hash=task.sha256, mode=task.mode)
+        db.add(dataset)
+        db.flush()
+        rows, warnings = IngestionService.ingest_file(
+            db, dataset, task.path, filename, content_hash=task.sha256, mode=task.mode,
+        )
+        db.commit()
+        result.update(status=IMPORT_IMPORTED, dataset_id=dataset.id, rows=rows, warnings=warnings)
+    except CSVValidationError as e:
+        db.rollback()
+        result["error"] = f"Erro ao processar CSV: {e}"
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Falha ao importar {task.path}")
+        result["error"] = f"Erro ao processar arquivo CSV: {str(e)}"
+    finally:
+        db.close()
+        result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class BulkImporter:
+    """
+    Importação offline de um diretório de exportações (python -m app.cli import): sem HTTP
+    nem ORM por linha, cada arquivo vira um dataset gravado via COPY. Vários arquivos são
+    processados ao mesmo tempo num pool de processos; o checkpoint permite retomar uma
+    importação interrompida sem repetir arquivos já gravados.
+    """
+
+    @staticmethod
+    def discover(directory: str) -> List[Tuple[str, str]]:
+        """(caminho, caminho relativo) dos arquivos suportados, em ordem, ignorando ocultos."""
+        found = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+            for name in sorted(files):
+                if not name.startswith(".") and UploadArchive.is_supported(name):
+                    path = os.path.join(root, name)
+                    found.append((path, os.path.relpath(path, directory)))
+        return found
+
+    @staticmethod
+    def _results(
+        tasks: Iterator[ImportTask], workers: int,
+    ) -> Iterator[Dict[str, Any]]:
+        """Resultados conforme os arquivos terminam; no máximo 2x workers arquivos em voo."""
+        if workers <= 1:
+            for task in tasks:
+                yield import_file(task)
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_import_worker,
+        )
+        pending: Deque = deque()
+        try:
+            for task in tasks:
+                pending.append((task, executor.submit(import_file, task)))
+                while len(pending) >= workers * 2 or (pending and pending[0][1].done()):
+                    yield BulkImporter._collect(*pending.popleft())
+            while pending:
+                yield BulkImporter._collect(*pending.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _collect(task: ImportTask, future) -> Dict[str, Any]:
+        try:
+            return future.result()
+        except Exception as e:  # processo morto (memória, sinal): o arquivo fica como falho
+            return {
+                "relpath": task.relpath, "sha256": task.sha256, "bytes": task.size,
+                "status": IMPORT_FAILED, "dataset_id": None, "rows": 0, "warnings": [],
+                "error": f"Processo de importação encerrado: {e!r}", "seconds": 0.0,
+            }
+
+    @staticmethod
+    def run(
+        directory: str,
+        user_id: int,
+        workers: int = 1,
+        mode: str = "append",
+        checkpoint_path: Optional[str] = None,
+        skip_existing: bool = True,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Importa os arquivos de `directory` para o usuário e devolve o resumo da execução
+        (arquivos por situação, linhas, bytes e vazão). No modo merge os arquivos são
+        gravados em ordem, num processo só: uma exportação mais nova deve prevalecer.
+        """
+        checkpoint = ImportCheckpoint(checkpoint_path or os.path.join(directory, CHECKPOINT_FILENAME))
+        files = BulkImporter.discover(directory)
+        if mode == MODE_MERGE:
+            workers = 1
+        settings.CSV_USE_COPY = True
+
+        summary: Dict[str, Any] = {
+            "files": len(files), "skipped": 0, IMPORT_IMPORTED: 0, IMPORT_EXISTING: 0, IMPORT_FAILED: 0,
+            "rows": 0, "bytes": 0, "failures": [],
+        }
+        seen_hashes = set()
+
+        def tasks() -> Iterator[ImportTask]:
+            for path, relpath in files:
+                sha256 = file_sha256(path)
+                if checkpoint.is_done(relpath, sha256) or (skip_existing and sha256 in seen_hashes):
+                    summary["skipped"] += 1
+                    continue
+                seen_hashes.add(sha256)
+                yield ImportTask(
+                    path=path, relpath=relpath, size=os.path.getsize(path), sha256=sha256,
+                    user_id=user_id, mode=mode, skip_existing=skip_existing,
+                )
+
+        start = time.perf_counter()
+        for result in BulkImporter._results(tasks(), workers):
+            checkpoint.record(result)
+            summary[result["status"]] += 1
+            if result["status"] == IMPORT_IMPORTED:
+                summary["rows"] += result["rows"]
+                summary["bytes"] += result["bytes"]
+            elif result["status"] == IMPORT_FAILED:
+                summary["failures"].append({"file": result["relpath"], "error": result["error"]})
+            if on_result is not None:
+                on_result(result)
+
+        seconds = time.perf_counter() - start
+        summary.update(
+            workers=workers,
+            seconds=round(seconds, 2),
+            rows_per_sec=round(summary["rows"] / seconds) if seconds else 0,
+            mb_per_sec=round(summary["bytes"] / 1024 / 1024 / seconds, 2) if seconds else 0.0,
+            checkpoint=checkpoint.path,
+        )
+        return summary
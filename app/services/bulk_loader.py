@@ -0,0 +1,226 @@
+import logging
+from io import StringIO
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Tabela temporária (por conexão) usada como área de staging do COPY.
+# Não tem índices nem constraints, então o COPY é praticamente só I/O.
+STAGING_TABLE = "dataset_rows_staging"
+
+# Colunas enviadas via COPY, na ordem em que aparecem em cada linha do buffer
+COPY_COLUMNS = [
+    "dataset_id", "user_id", "date", "time", "product",
+    "revenue", "cost", "commission", "profit",
+    "status", "category", "sub_id1", "mes_ano", "raw_data", "row_key",
+]
+
+# Colunas atualizadas quando uma linha do modo merge já existe (tudo menos as chaves)
+MERGE_UPDATE_COLUMNS = [
+    "dataset_id", "date", "time", "product",
+    "revenue", "cost", "commission", "profit",
+    "status", "category", "sub_id1", "mes_ano", "raw_data",
+]
+
+_CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    dataset_id INTEGER,
+    user_id INTEGER,
+    date DATE,
+    time TIME,
+    product VARCHAR,
+    revenue NUMERIC(12, 2),
+    cost NUMERIC(12, 2),
+    commission NUMERIC(12, 2),
+    profit NUMERIC(12, 2),
+    status VARCHAR,
+    category VARCHAR,
+    sub_id1 VARCHAR,
+    mes_ano VARCHAR,
+    raw_data JSON,
+    row_key VARCHAR
+) ON COMMIT DROP
+"""
+
+_COPY_SQL = f"COPY {STAGING_TABLE} ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+
+# quantity tem default=1 no lado Python do modelo; o INSERT via ORM sempre grava 1.
+_INSERT_SQL = f"""
+INSERT INTO dataset_rows ({', '.join(COPY_COLUMNS)}, quantity)
+SELECT {', '.join(COPY_COLUMNS)}, 1 FROM {STAGING_TABLE}
+"""
+
+def _compare_expr(table: str, column: str) -> str:
+    return f"{table}.{column}::text" if column == "raw_data" else f"{table}.{column}"
+
+
+# Modo merge: upsert pela chave natural. Só linhas novas ou com algum valor diferente são
+# gravadas; raw_data é JSON (sem operador de igualdade), então é comparado como texto.
+_UPSERT_SQL = f"""
+INSERT INTO dataset_rows ({', '.join(COPY_COLUMNS)}, quantity)
+SELECT {', '.join(COPY_COLUMNS)}, 1 FROM {STAGING_TABLE} WHERE row_key IS NOT NULL
+ON CONFLICT (user_id, row_key) WHERE row_key IS NOT NULL DO UPDATE SET
+    {', '.join(f"{column} = EXCLUDED.{column}" for column in MERGE_UPDATE_COLUMNS)}
+WHERE ({', '.join(_compare_expr("dataset_rows", column) for column in MERGE_UPDATE_COLUMNS[1:])})
+    IS DISTINCT FROM ({', '.join(_compare_expr("EXCLUDED", column) for column in MERGE_UPDATE_COLUMNS[1:])})
+RETURNING (xmax = 0) AS inserted
+"""
+
+# Linhas sem chave no modo merge são apenas inseridas
+_INSERT_UNKEYED_SQL = _INSERT_SQL + " WHERE row_key IS NULL"
+
+# Restauração a partir do cache: só as chaves que o usuário não tem mais; as que existem
+# pertencem a um upload mais novo (ou foram atualizadas por ele) e ficam como estão
+_INSERT_MISSING_KEYS_SQL = _INSERT_SQL + """ WHERE row_key IS NOT NULL
+ON CONFLICT (user_id, row_key) WHERE row_key IS NOT NULL DO NOTHING
+"""
+
+_NULL = "\\N"
+
+
+def _escape_copy_text(series: pd.Series) -> pd.Series:
+    """Escapa uma série de strings para o formato text do COPY (nulos viram \\N)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # category (ver optimize_dtypes): escapa só os valores distintos e expande pelos códigos
+        categories = _escape_copy_text(pd.Series(series.cat.categories, dtype=object))
+        values = np.append(categories.to_numpy(dtype=object), _NULL)
+        return pd.Series(values[series.cat.codes.to_numpy()], index=series.index, dtype=object)
+    mask = series.isna()
+    escaped = (
+        series.astype(str)
+        .str.replace("\\", "\\\\", regex=False)
+        .str.replace("\t", "\\t", regex=False)
+        .str.replace("\n", "\\n", regex=False)
+        .str.replace("\r", "\\r", regex=False)
+    )
+    return escaped.mask(mask, _NULL)
+
+
+def _format_scalar_column(series: pd.Series) -> pd.Series:
+    """Formata datas, horas e números (sem caracteres especiais) para o COPY."""
+    if series.dtype == np.float32:
+        # float32 (optimize_dtypes) passaria a sair em notação científica ("6.306069e+06")
+        series = series.astype(np.float64)
+    mask = series.isna()
+    return series.astype(str).mask(mask, _NULL)
+
+
+class BulkLoader:
+    """Carga em massa de DatasetRow via COPY ... FROM STDIN + INSERT ... SELECT."""
+
+    @staticmethod
+    def build_copy_buffer(df: pd.DataFrame, dataset_id: int, user_id: int) -> StringIO:
+        """
+        Monta o buffer no formato text do COPY a partir de um frame do CSVService
+        (raw_data já vem como texto JSON normalizado, ver encode_raw_frame).
+        """
+        n_rows = len(df)
+        columns = {
+            "dataset_id": pd.Series([str(dataset_id)] * n_rows, index=df.index),
+            "user_id": pd.Series([str(user_id)] * n_rows, index=df.index),
+        }
+
+        for name in ["date", "time", "revenue", "cost", "commission", "profit"]:
+            if name in df.columns:
+                columns[name] = _format_scalar_column(df[name])
+            else:
+                columns[name] = pd.Series([_NULL] * n_rows, index=df.index)
+
+        for name in ["product", "status", "category", "sub_id1", "mes_ano", "row_key"]:
+            if name in df.columns:
+                columns[name] = _escape_copy_text(df[name])
+            else:
+                columns[name] = pd.Series([_NULL] * n_rows, index=df.index)
+
+        if "raw_data" in df.columns:
+            columns["raw_data"] = _escape_copy_text(df["raw_data"])
+        else:
+            columns["raw_data"] = pd.Series([_NULL] * n_rows, index=df.index)
+
+        ordered = [columns[name] for name in COPY_COLUMNS]
+        lines = ordered[0].str.cat(ordered[1:], sep="\t")
+
+        buffer = StringIO()
+        if n_rows:
+            buffer.write("\n".join(lines.tolist()))
+            buffer.write("\n")
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def copy_rows(db: Session, df: pd.DataFrame, dataset_id: int, user_id: int) -> int:
+        """
+        Grava as linhas do frame em dataset_rows usando a conexão da sessão
+        (mesma transação/savepoint do chamador). Retorna a quantidade de linhas inseridas.
+        """
+        if df.empty:
+            return 0
+
+        buffer = BulkLoader.build_copy_buffer(df, dataset_id, user_id)
+
+        connection = db.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute(_CREATE_STAGING_SQL)
+            cursor.copy_expert(_COPY_SQL, buffer)
+            cursor.execute(_INSERT_SQL)
+            inserted = cursor.rowcount
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+        logger.debug(f"COPY de {inserted} linhas para o dataset {dataset_id}")
+        return inserted
+
+    @staticmethod
+    def merge_rows(db: Session, df: pd.DataFrame, dataset_id: int, user_id: int) -> Tuple[int, int]:
+        """
+        Modo merge: COPY para o staging + INSERT ... ON CONFLICT (user_id, row_key).
+        Linhas existentes só são regravadas (e passam para este dataset) se algum valor
+        mudou, ex.: "Status do Pedido" atualizado. Retorna (inseridas, atualizadas).
+        """
+        if df.empty:
+            return 0, 0
+
+        buffer = BulkLoader.build_copy_buffer(df, dataset_id, user_id)
+
+        connection = db.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute(_CREATE_STAGING_SQL)
+            cursor.copy_expert(_COPY_SQL, buffer)
+            cursor.execute(_UPSERT_SQL)
+            written = cursor.fetchall()
+            cursor.execute(_INSERT_UNKEYED_SQL)
+            unkeyed = cursor.rowcount
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+        keyed_inserted = sum(1 for (is_insert,) in written if is_insert)
+        inserted = keyed_inserted + unkeyed
+        updated = len(written) - keyed_inserted
+        logger.debug(f"Merge no dataset {dataset_id}: {inserted} inseridas, {updated} atualizadas")
+        return inserted, updated
+
+    @staticmethod
+    def insert_missing_rows(db: Session, df: pd.DataFrame, dataset_id: int, user_id: int) -> int:
+        """
+        Como merge_rows, mas sem sobrescrever: linhas com chave só entram se o usuário não
+        tem essa chave (ON CONFLICT DO NOTHING); linhas sem chave entram sempre.
+        Retorna as linhas gravadas.
+        """
+        if df.empty:
+            return 0
+
+        buffer = BulkLoader.build_copy_buffer(df, dataset_id, user_id)
+
+        connection = db.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute(_CREATE_STAGING_SQL)
+            cursor.copy_expert(_COPY_SQL, buffer)
+            cursor.execute(_INSERT_MISSING_KEYS_SQL)
+            keyed = cursor.rowcount
+            cursor.execute(_INSERT_UNKEYED_SQL)
+            unkeyed = cursor.rowcount
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+        return keyed + unkeyed
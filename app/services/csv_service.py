@@ -1,13 +1,49 @@
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Tuple
-from datetime import datetime, date as date_cls
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from typing import List, Dict, Any, NamedTuple, Tuple, Iterator, Optional, Union, BinaryIO
+from datetime import datetime
+from collections import Counter, OrderedDict
+from functools import lru_cache
 from io import BytesIO
+import codecs
+import hashlib
 import logging
+import threading
 import unicodedata
 
+from app.services.frame_memory import MemoryReport, optimize_dtypes
+from app.services.source_adapters import SOURCE_ADAPTERS, SourceAdapter
+from app.services.xlsx_reader import XLSXUnavailableError, iter_xlsx_frames
+from app.utils.serialization import encode_raw_frame
+
 logger = logging.getLogger(__name__)
 
+# Codificações tentadas, em ordem, ao ler o CSV
+CSV_ENCODINGS = ["utf-8", "latin-1", "iso-8859-1"]
+
+# BOMs que decidem a codificação direto (UTF-32 antes de UTF-16: o BOM UTF-32 LE começa
+# com o BOM UTF-16 LE). O BOM UTF-8 não entra: o conteúdo ainda precisa ser UTF-8 válido,
+# e o pandas descarta o BOM sozinho.
+CSV_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Tamanho dos blocos lidos pelo detector de codificação
+ENCODING_SNIFF_BLOCK_SIZE = 1024 * 1024
+
+# Valores não nulos usados para detectar a coluna de data e inferir o formato
+DATE_SAMPLE_SIZE = 200
+
+# Linhas por bloco no modo streaming (iter_csv_chunks)
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Quantos cabeçalhos distintos o resolvedor de colunas mantém em cache
+COLUMN_MAP_CACHE_SIZE = 256
+
 # Colunas alvo
 TARGET_COLUMNS = ["date", "product", "revenue", "cost", "commission"]
 
@@ -54,6 +90,182 @@ def find_column(df_cols: List[str], aliases: set) -> str:
     return ""
 
 
+def _compile_aliases() -> Dict[str, Tuple[str, ...]]:
+    """Alias normalizado -> colunas alvo que ele atende (na ordem de ALIASES)."""
+    compiled: Dict[str, List[str]] = {}
+    for target, alias_set in ALIASES.items():
+        for alias in alias_set:
+            compiled.setdefault(alias, []).append(target)
+    return {alias: tuple(targets) for alias, targets in compiled.items()}
+
+
+# Um único dicionário para todos os grupos de ALIASES
+ALIAS_TARGETS = _compile_aliases()
+
+
+class ResolvedSource(NamedTuple):
+    """Layout reconhecido num cabeçalho, já traduzido para os nomes reais das colunas."""
+    adapter: SourceAdapter
+    col_map: Dict[str, str]
+    dtypes: Dict[str, Any]
+
+
+# Colunas de identificação de cada layout, já normalizadas
+COMPILED_ADAPTERS = [
+    (adapter, frozenset(normalize_name(col) for col in adapter.required)) for adapter in SOURCE_ADAPTERS
+]
+
+
+@lru_cache(maxsize=COLUMN_MAP_CACHE_SIZE)
+def _match_source(columns: Tuple[str, ...]) -> Optional[ResolvedSource]:
+    """Primeiro layout de SOURCE_ADAPTERS cujas colunas obrigatórias estão no cabeçalho."""
+    by_name: Dict[str, str] = {}
+    for col in columns:
+        by_name.setdefault(normalize_name(str(col)), col)
+    for adapter, required in COMPILED_ADAPTERS:
+        if required <= by_name.keys():
+            col_map = {
+                target: by_name[normalize_name(source)]
+                for target, source in adapter.columns.items()
+                if normalize_name(source) in by_name
+            }
+            dtypes = {
+                by_name[normalize_name(col)]: object
+                for col in adapter.text_columns
+                if normalize_name(col) in by_name
+            }
+            return ResolvedSource(adapter, col_map, dtypes)
+    return None
+
+
+@lru_cache(maxsize=None)
+def decodes_any_byte(encoding: str) -> bool:
+    """Codificações de um byte como latin-1 aceitam qualquer sequência e nunca falham."""
+    try:
+        bytes(range(256)).decode(encoding)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+class ColumnMapCache:
+    """
+    LRU de mapas de colunas indexado pela assinatura (hash) da linha de cabeçalho.
+    Uploads repetidos do mesmo layout de marketplace pulam a resolução de aliases.
+    Compartilhado entre os workers de ingestão, por isso protegido por lock.
+    """
+
+    def __init__(self, maxsize: int = COLUMN_MAP_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def signature(columns: List[str]) -> bytes:
+        header = "\x1f".join(str(col) for col in columns)
+        return hashlib.blake2b(header.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, str]]:
+        with self._lock:
+            col_map = self._entries.get(key)
+            if col_map is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(col_map)
+
+    def put(self, key: bytes, col_map: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = dict(col_map)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+column_map_cache = ColumnMapCache()
+
+
+class RowKeyBuilder:
+    """
+    Chave natural de cada linha para a ingestão em modo merge (upsert).
+    Os valores das colunas da chave são unidos por "|" e recebem o número da ocorrência
+    no arquivo ("#0", "#1", ...): a mesma combinação pedido/item/modelo pode aparecer
+    em mais de uma linha da mesma exportação. A contagem segue entre os blocos.
+    Linhas com algum componente vazio ficam sem chave (são apenas inseridas).
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self._seen: Dict[str, int] = {}
+
+    @staticmethod
+    def for_frame(df: pd.DataFrame, key_names: List[str]) -> Tuple[Optional["RowKeyBuilder"], List[str]]:
+        """Localiza as colunas da chave (comparando nomes normalizados); devolve (builder, ausentes)."""
+        by_norm: Dict[str, str] = {}
+        for col in df.columns:
+            by_norm.setdefault(normalize_name(str(col)), col)
+        columns = [by_norm.get(normalize_name(name)) for name in key_names]
+        missing = [name for name, col in zip(key_names, columns) if col is None]
+        if missing or not columns:
+            return None, missing
+        return RowKeyBuilder(columns), []
+
+    @staticmethod
+    def _component(series: pd.Series) -> pd.Series:
+        # IDs numéricos lidos como float (coluna com vazios) não podem virar "2.0199e+10"
+        if pd.api.types.is_float_dtype(series):
+            non_null = series.dropna()
+            if (non_null % 1 == 0).all():
+                return series.astype("Int64").astype(str).where(series.notna())
+        text = series.astype(str).str.strip().where(series.notna())
+        return text.mask(text == "")
+
+    def build(self, df: pd.DataFrame) -> pd.Series:
+        return self.number(self.base_keys(df))
+
+    def base_keys(self, df: pd.DataFrame) -> pd.Series:
+        """Chave sem o número da ocorrência (não depende dos blocos anteriores)."""
+        base = None
+        for col in self.columns:
+            component = RowKeyBuilder._component(df[col])
+            base = component if base is None else base + "|" + component
+        return base
+
+    def number(self, base: pd.Series) -> pd.Series:
+        """Acrescenta "#ocorrência" às chaves de base_keys, contando a partir dos blocos já vistos."""
+        keys = pd.Series(None, index=base.index, dtype=object)
+        valid = base.dropna()
+        if valid.empty:
+            return keys
+
+        occurrence = valid.groupby(valid, sort=False).cumcount()
+        if self._seen:
+            occurrence = occurrence + valid.map(self._seen).fillna(0).astype(int)
+        keys.loc[valid.index] = valid + "#" + occurrence.astype(str)
+
+        for key, count in valid.value_counts(sort=False).items():
+            self._seen[key] = self._seen.get(key, 0) + int(count)
+        return keys
+
+
 class CSVValidationError(Exception):
     """Exception raised for CSV validation errors."""
     pass
@@ -75,24 +287,370 @@ class CSVService:
         )
         return pd.to_numeric(cleaned, errors="coerce")
 
+    @staticmethod
+    def _clean_typed_numeric_series(series: pd.Series) -> pd.Series:
+        """
+        Variante para valores já tipados (células de planilha): números ficam como estão,
+        já que a limpeza de texto removeria o ponto decimal; só textos ("R$ 1.234,56")
+        passam por _clean_numeric_series.
+        """
+        if series.dtype.kind in "iuf":
+            return series.astype(float)
+        is_text = series.map(lambda value: isinstance(value, str)).astype(bool)
+        numbers = pd.to_numeric(series.where(~is_text), errors="coerce")
+        if is_text.any():
+            numbers = numbers.where(~is_text, CSVService._clean_numeric_series(series[is_text]))
+        return numbers
+
+    @staticmethod
+    def _resolve_columns(original_cols: List[str]) -> Dict[str, str]:
+        """
+        Mapeia cada coluna alvo (ALIASES) para a coluna original correspondente.
+        Para cada alvo vale a primeira coluna do cabeçalho que casar, como em find_column.
+        O resultado fica no column_map_cache, indexado pela assinatura do cabeçalho.
+        """
+        key = ColumnMapCache.signature(original_cols)
+        cached = column_map_cache.get(key)
+        if cached is not None:
+            return cached
+
+        found: Dict[str, str] = {}
+        for col in original_cols:
+            for target in ALIAS_TARGETS.get(normalize_name(str(col)), ()):
+                found.setdefault(target, col)
+
+        # Mesma ordem de chaves da resolução por grupo (ordem de ALIASES)
+        col_map = {target: found[target] for target in ALIASES if target in found}
+        column_map_cache.put(key, col_map)
+        return dict(col_map)
+
+    @staticmethod
+    def source_adapter(columns: List[str]) -> Optional[ResolvedSource]:
+        """Layout conhecido (SOURCE_ADAPTERS) do cabeçalho, ou None para a resolução genérica."""
+        return _match_source(tuple(str(col) for col in columns))
+
+    @staticmethod
+    def read_dtypes(columns: List[str]) -> Optional[Dict[str, Any]]:
+        """dtype do read_csv para um cabeçalho: colunas de texto do layout sem inferência."""
+        source = CSVService.source_adapter(columns)
+        return dict(source.dtypes) if source is not None and source.dtypes else None
+
+    @staticmethod
+    def typed_numbers(columns: List[str]) -> bool:
+        """O layout declara valores numéricos já tipados (ver SourceAdapter.typed_numbers)."""
+        source = CSVService.source_adapter(columns)
+        return source is not None and source.adapter.typed_numbers
+
+    @staticmethod
+    def _peek_columns(handle: BinaryIO, encoding: str) -> List[str]:
+        """Cabeçalho do CSV a partir da posição atual, sem consumir o arquivo."""
+        start_position = handle.tell()
+        try:
+            return pd.read_csv(handle, encoding=encoding, nrows=0).columns.tolist()
+        finally:
+            handle.seek(start_position)
+
+    @staticmethod
+    def column_map_cache_stats() -> Dict[str, int]:
+        """Contadores do cache de mapas de colunas (hits, misses, tamanho)."""
+        return column_map_cache.stats()
+
+    @staticmethod
+    def _detect_date_column(df: pd.DataFrame) -> str:
+        """
+        Procura a primeira coluna que contenha alguma data válida (fallback sem alias).
+        Só os primeiros DATE_SAMPLE_SIZE valores não nulos de cada coluna são testados.
+        """
+        for col in df.columns.tolist():
+            sample = df[col].dropna().head(DATE_SAMPLE_SIZE)
+            candidate = pd.to_datetime(sample, errors="coerce", dayfirst=True)
+            if candidate.notna().any():
+                return col
+        return ""
+
+    @staticmethod
+    def _guess_value_format(value: str, dayfirst: bool) -> Optional[str]:
+        """
+        Formato de um único valor. Com dayfirst=True o pandas devolve "%Y-%d-%m" para datas
+        ISO como "2025-03-10 10:20:00" (Horário do pedido da Shopee), trocando dia e mês;
+        valores que começam pelo ano são sempre inferidos como ano-mês-dia.
+        """
+        fmt = guess_datetime_format(value, dayfirst=dayfirst)
+        if dayfirst and fmt and fmt.startswith("%Y"):
+            fmt = guess_datetime_format(value, dayfirst=False) or fmt
+        return fmt
+
+    @staticmethod
+    def _guess_date_format(series: pd.Series, dayfirst: bool) -> Optional[str]:
+        """
+        Formato de data/hora inferido de uma amostra (DATE_SAMPLE_SIZE valores não nulos).
+        Fica com o formato do primeiro valor (como o pandas faria) se ele interpretar a
+        amostra inteira; senão, com o formato mais comum da amostra que a interprete.
+        Sem formato, o parse cai no modo elemento a elemento do pandas.
+
+        No modo streaming ele é fixado no primeiro bloco, para que todos os blocos
+        sejam interpretados como seriam com o arquivo inteiro.
+        """
+        sample = series.dropna().head(DATE_SAMPLE_SIZE)
+        if sample.empty or not isinstance(sample.iloc[0], str):
+            return None
+
+        values = pd.Series([value for value in sample if isinstance(value, str)])
+
+        def parses_sample(fmt: str) -> bool:
+            return pd.to_datetime(values, errors="coerce", format=fmt).notna().all()
+
+        first_format = CSVService._guess_value_format(values.iloc[0], dayfirst)
+        if first_format and parses_sample(first_format):
+            return first_format
+
+        # Amostra com formatos misturados: cada valor distinto é inferido uma vez
+        guesses = Counter(
+            CSVService._guess_value_format(value, dayfirst) for value in values.drop_duplicates()
+        )
+        for fmt, _ in guesses.most_common():
+            if fmt and fmt != first_format and parses_sample(fmt):
+                return fmt
+        return first_format
+
+    @staticmethod
+    def _declared_format(series: pd.Series, fmt: Optional[str]) -> Optional[str]:
+        """Formato declarado pelo layout, se ele interpretar a amostra inteira."""
+        if not fmt:
+            return None
+        sample = series.dropna().head(DATE_SAMPLE_SIZE)
+        if sample.empty or not all(isinstance(value, str) for value in sample):
+            return None
+        return fmt if pd.to_datetime(sample, errors="coerce", format=fmt).notna().all() else None
+
+    @staticmethod
+    def _prepare_columns(df: pd.DataFrame) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+        """
+        Resolve o mapa de colunas e os formatos de "date"/"time" a partir de um frame (o
+        arquivo inteiro ou o primeiro bloco). Num layout conhecido (SOURCE_ADAPTERS) o mapa
+        e os formatos são os declarados; nos demais, aliases + fallback de data e formato
+        inferido. No modo streaming o resultado é reaproveitado nos blocos seguintes.
+        """
+        source = CSVService.source_adapter(df.columns.tolist())
+        if source is not None:
+            col_map = dict(source.col_map)
+            declared = source.adapter.date_formats
+        else:
+            col_map = CSVService._resolve_columns(df.columns.tolist())
+            declared = {}
+            if "date" not in col_map:
+                date_col = CSVService._detect_date_column(df)
+                if date_col:
+                    col_map["date"] = date_col
+
+        date_formats: Dict[str, Optional[str]] = {}
+        for target, dayfirst in (("date", True), ("time", False)):
+            if target in col_map:
+                series = df[col_map[target]]
+                date_formats[target] = (
+                    CSVService._declared_format(series, declared.get(target))
+                    or CSVService._guess_date_format(series, dayfirst=dayfirst)
+                )
+        return col_map, date_formats
+
+    @staticmethod
+    def _parse_datetimes(series: pd.Series, fmt: Optional[str], dayfirst: bool) -> pd.Series:
+        """Parse vetorizado com o formato inferido; sem formato, usa a inferência do pandas."""
+        if fmt:
+            return pd.to_datetime(series, errors="coerce", format=fmt)
+        return pd.to_datetime(series, errors="coerce", dayfirst=dayfirst)
+
+    @staticmethod
+    def _transform_frame(
+        df: pd.DataFrame,
+        col_map: Dict[str, str],
+        errors: List[str],
+        date_formats: Optional[Dict[str, Optional[str]]] = None,
+        typed_numbers: bool = False,
+        memory: Optional[MemoryReport] = None,
+    ) -> pd.DataFrame:
+        """
+        Converte um frame lido do CSV (inteiro ou um chunk) para o formato de DatasetRow.
+        Avisos de colunas ausentes são adicionados em `errors`.
+        `date_formats` fixa o formato de "date"/"time" (usado no modo streaming).
+        `typed_numbers` (planilhas) mantém os valores numéricos já tipados como estão.
+        A saída passa por optimize_dtypes; `memory` recebe o tamanho do frame em cada etapa.
+        """
+        date_formats = date_formats or {}
+        if memory is not None:
+            memory.record("input", df)
+        out = pd.DataFrame(index=df.index)
+
+        # Date e time
+        if "date" in col_map:
+            parsed_date = CSVService._parse_datetimes(df[col_map["date"]], date_formats.get("date"), dayfirst=True)
+            invalid_dates = int(parsed_date.isna().sum())
+            if invalid_dates:
+                raise CSVValidationError(
+                    f"{invalid_dates} linha(s) com data inválida na coluna '{col_map['date']}'."
+                )
+        else:
+            parsed_date = pd.Series(pd.Timestamp("today"), index=df.index)
+            errors.append("Coluna de data ausente; usando data atual.")
+
+        # date e mes_ano saem do mesmo parse, convertendo só os dias distintos
+        day_codes, days = pd.factorize(parsed_date.dt.normalize())
+        out["date"] = np.asarray(days.date, dtype=object)[day_codes]
+        mes_ano = np.array([f"{day.year:04d}-{day.month:02d}" for day in days], dtype=object)[day_codes]
+
+        if "time" in col_map:
+            if (
+                col_map["time"] == col_map.get("date")
+                and date_formats.get("time")
+                and date_formats.get("time") == date_formats.get("date")
+            ):
+                # Mesma coluna e mesmo formato (ex.: "Horário do pedido"): reaproveita o parse
+                parsed_time = parsed_date
+            else:
+                parsed_time = CSVService._parse_datetimes(df[col_map["time"]], date_formats.get("time"), dayfirst=False)
+            out["time"] = parsed_time.dt.time
+        else:
+            out["time"] = None
+
+        # Produto
+        if "product" in col_map:
+            out["product"] = df[col_map["product"]].astype(str).str.strip()
+        else:
+            out["product"] = df.index.astype(str)
+            errors.append("Coluna de produto ausente; usando índice como produto.")
+
+        # Numéricas
+        for target in ["revenue", "cost", "commission"]:
+            if target in col_map:
+                if typed_numbers:
+                    numeric_series = CSVService._clean_typed_numeric_series(df[col_map[target]])
+                else:
+                    numeric_series = CSVService._clean_numeric_series(df[col_map[target]])
+                out[target] = numeric_series.fillna(0)
+            else:
+                out[target] = 0
+                errors.append(f"Coluna '{target}' ausente; preenchendo com 0.")
+
+        # Status, categoria, sub_id1
+        out["status"] = df[col_map["status"]].astype(str).str.strip() if "status" in col_map else None
+        out["category"] = df[col_map["category"]].astype(str).str.strip() if "category" in col_map else None
+        out["sub_id1"] = df[col_map["sub_id1"]].astype(str).str.strip() if "sub_id1" in col_map else None
+        out["mes_ano"] = mes_ano
+
+        # Limpezas
+        if out["time"].isnull().all():
+            out["time"] = None
+        out["product"] = out["product"].replace({"": "Produto"}, regex=False)
+        out["revenue"] = out["revenue"].clip(lower=0)
+        out["cost"] = out["cost"].clip(lower=0)
+        out["commission"] = out["commission"].clip(lower=0)
+
+        # Profit
+        out["profit"] = out["revenue"] - out["cost"] - out["commission"]
+
+        # raw_data preserva colunas originais, já normalizadas e serializadas em JSON
+        # (NaN -> null, colunas 'valor*'/'comiss*' numéricas), coluna a coluna.
+        out["raw_data"] = encode_raw_frame(df.loc[out.index]).to_numpy()
+
+        # Remove linhas vazias de produto
+        keep = out["product"] != ""
+        if not keep.all():
+            out = out[keep].copy()
+        if memory is not None:
+            memory.record("normalized", out)
+        out = optimize_dtypes(out)
+        if memory is not None:
+            memory.record("optimized", out)
+        return out
+
+    @staticmethod
+    def detect_encoding(source: Union[bytes, BinaryIO]) -> Optional[str]:
+        """
+        Decide a codificação do CSV numa única passada, antes do parse:
+        1. BOM UTF-16/32 no início do arquivo;
+        2. senão, decodifica o conteúdo em blocos com decodificadores incrementais estritos
+           para as codificações de CSV_ENCODINGS, na ordem; vence a primeira que aceitar o
+           arquivo inteiro. Assim que a melhor candidata restante for uma codificação que
+           aceita qualquer byte (latin-1), a leitura para.
+
+        O resultado é o mesmo de tentar pd.read_csv com cada codificação, sem parsear o
+        arquivo mais de uma vez. Para arquivos abertos, a posição atual é restaurada.
+        Retorna None se nenhuma codificação servir.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            view = memoryview(source)
+            blocks = (
+                view[offset:offset + ENCODING_SNIFF_BLOCK_SIZE]
+                for offset in range(0, len(view), ENCODING_SNIFF_BLOCK_SIZE)
+            )
+            head = bytes(view[:4])
+            start_position = None
+        else:
+            start_position = source.tell()
+            head = source.read(4)
+            source.seek(start_position)
+            blocks = iter(lambda: source.read(ENCODING_SNIFF_BLOCK_SIZE), b"")
+
+        try:
+            for bom, encoding in CSV_BOMS:
+                if head.startswith(bom):
+                    return encoding
+
+            candidates = [
+                (encoding, codecs.getincrementaldecoder(encoding)("strict"))
+                for encoding in CSV_ENCODINGS
+            ]
+            for block in blocks:
+                if decodes_any_byte(candidates[0][0]):
+                    break
+                alive = []
+                for encoding, decoder in candidates:
+                    if decodes_any_byte(encoding):
+                        # Não precisa decodificar, e as candidatas seguintes nunca seriam escolhidas
+                        alive.append((encoding, decoder))
+                        break
+                    try:
+                        decoder.decode(block)
+                        alive.append((encoding, decoder))
+                    except UnicodeDecodeError:
+                        continue
+                candidates = alive
+                if not candidates:
+                    return None
+
+            for encoding, decoder in candidates:
+                if decodes_any_byte(encoding):
+                    return encoding
+                try:
+                    decoder.decode(b"", final=True)
+                    return encoding
+                except UnicodeDecodeError:
+                    continue
+            return None
+        finally:
+            if start_position is not None:
+                source.seek(start_position)
+
     @staticmethod
     def validate_csv(file_content: bytes, filename: str) -> Tuple[pd.DataFrame, List[str]]:
         """
         Validate and parse CSV file (flexível). Se colunas estiverem ausentes, cria padrões.
         Retorna dataframe sempre com as colunas TARGET_COLUMNS + profit.
+        A coluna raw_data traz a linha original como texto JSON já normalizado.
         """
         errors = []
 
         try:
-            df = None
-            df_orig = None
-            for encoding in ['utf-8', 'latin-1', 'iso-8859-1']:
-                try:
-                    df = pd.read_csv(BytesIO(file_content), encoding=encoding)
-                    df_orig = df.copy()
-                    break
-                except UnicodeDecodeError:
-                    continue
+            encoding = CSVService.detect_encoding(file_content)
+            try:
+                if encoding:
+                    handle = BytesIO(file_content)
+                    dtypes = CSVService.read_dtypes(CSVService._peek_columns(handle, encoding))
+                    df = pd.read_csv(handle, encoding=encoding, dtype=dtypes)
+                else:
+                    df = None
+            except UnicodeDecodeError:
+                df = None
 
             if df is None:
                 errors.append("Não foi possível decodificar o arquivo CSV. Verifique a codificação.")
@@ -102,82 +660,9 @@ class CSVService:
                 errors.append("O arquivo CSV está vazio.")
                 return None, errors
 
-            original_cols = df.columns.tolist()
-            norm_map = {col: normalize_name(col) for col in original_cols}
-
-            col_map = {}
-            for target, alias_set in ALIASES.items():
-                found = find_column(original_cols, alias_set)
-                if found:
-                    col_map[target] = found
-
-            # Criar dataframe final
-            out = pd.DataFrame()
-
-            # Date e time
-            if "date" in col_map:
-                parsed_date = pd.to_datetime(df[col_map["date"]], errors="coerce", dayfirst=True)
-            else:
-                parsed_date = None
-                for col in original_cols:
-                    candidate = pd.to_datetime(df[col], errors="coerce", dayfirst=True)
-                    if candidate.notna().any():
-                        parsed_date = candidate
-                        break
-                if parsed_date is None:
-                    parsed_date = pd.Timestamp("today")
-                    errors.append("Coluna de data ausente; usando data atual.")
-
-            out["date"] = parsed_date.dt.date if hasattr(parsed_date, "dt") else parsed_date
-
-            if "time" in col_map:
-                parsed_time = pd.to_datetime(df[col_map["time"]], errors="coerce")
-                out["time"] = parsed_time.dt.time
-            else:
-                out["time"] = None
-
-            # Produto
-            if "product" in col_map:
-                out["product"] = df[col_map["product"]].astype(str).str.strip()
-            else:
-                out["product"] = df.index.astype(str)
-                errors.append("Coluna de produto ausente; usando índice como produto.")
-
-            # Numéricas
-            for target in ["revenue", "cost", "commission"]:
-                if target in col_map:
-                    numeric_series = CSVService._clean_numeric_series(df[col_map[target]])
-                    out[target] = numeric_series.fillna(0)
-                else:
-                    out[target] = 0
-                    errors.append(f"Coluna '{target}' ausente; preenchendo com 0.")
-
-            # Status, categoria, sub_id1
-            out["status"] = df[col_map["status"]].astype(str).str.strip() if "status" in col_map else None
-            out["category"] = df[col_map["category"]].astype(str).str.strip() if "category" in col_map else None
-            out["sub_id1"] = df[col_map["sub_id1"]].astype(str).str.strip() if "sub_id1" in col_map else None
-            out["mes_ano"] = out["date"].apply(lambda d: f"{d.year:04d}-{d.month:02d}" if isinstance(d, (pd.Timestamp, date_cls)) or hasattr(d, 'year') else None)
-
-            # Limpezas
-            out["date"] = pd.to_datetime(out["date"], errors="coerce").dt.date
-            if out["time"].isnull().all():
-                out["time"] = None
-            out["product"] = out["product"].replace({"": "Produto"}, regex=False)
-            out["revenue"] = out["revenue"].clip(lower=0)
-            out["cost"] = out["cost"].clip(lower=0)
-            out["commission"] = out["commission"].clip(lower=0)
-
-            # Profit
-            out["profit"] = out["revenue"] - out["cost"] - out["commission"]
-
-            # raw_data preserva colunas originais (sanitizando NaN -> None)
-            if df_orig is not None:
-                rows_raw = df_orig.iloc[out.index]
-                rows_raw = rows_raw.replace({np.nan: None})
-                out["raw_data"] = rows_raw.to_dict("records")
-
-            # Remove linhas vazias de produto
-            out = out[out["product"] != ""]
+            col_map, date_formats = CSVService._prepare_columns(df)
+            typed_numbers = CSVService.typed_numbers(df.columns.tolist())
+            out = CSVService._transform_frame(df, col_map, errors, date_formats, typed_numbers)
 
             if out.empty:
                 errors.append("Após processamento, nenhuma linha válida restou.")
@@ -193,6 +678,110 @@ class CSVService:
             errors.append(f"Erro ao processar arquivo CSV: {str(e)}")
             return None, errors
 
+    @staticmethod
+    def iter_csv_chunks(
+        source: Union[bytes, BinaryIO],
+        filename: str,
+        encoding: str = "utf-8",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        key_columns: Optional[List[str]] = None,
+        memory: Optional[MemoryReport] = None,
+    ) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+        """
+        Modo streaming do validate_csv: lê o CSV em blocos de `chunk_size` linhas e
+        devolve cada bloco já validado, junto com os avisos gerados para ele.
+        O pico de memória depende do tamanho do bloco, não do arquivo.
+
+        A resolução de colunas (layout conhecido ou aliases e fallback de data) é feita
+        uma única vez, no primeiro bloco, e reaproveitada nos seguintes. Num layout de
+        SOURCE_ADAPTERS as colunas de texto são lidas sem inferência de tipo.
+
+        `source` pode ser o conteúdo em bytes ou um arquivo binário aberto (lido a
+        partir da posição atual; o chamador pode usar tell() para acompanhar o progresso).
+
+        A codificação deve vir de detect_encoding; se ainda assim o arquivo não decodificar,
+        UnicodeDecodeError é propagado. Demais falhas viram CSVValidationError.
+
+        Com `key_columns` (modo merge), cada bloco ganha a coluna "row_key" (ver RowKeyBuilder).
+        Com `memory`, o tamanho de cada bloco por etapa é acumulado no relatório.
+        """
+        def read_frames() -> Iterator[pd.DataFrame]:
+            handle = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+            dtypes = CSVService.read_dtypes(CSVService._peek_columns(handle, encoding))
+            yield from pd.read_csv(handle, encoding=encoding, chunksize=chunk_size, dtype=dtypes)
+
+        yield from CSVService._iter_validated(read_frames(), "CSV", key_columns, memory=memory)
+
+    @staticmethod
+    def iter_xlsx_chunks(
+        source: BinaryIO,
+        filename: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        key_columns: Optional[List[str]] = None,
+        memory: Optional[MemoryReport] = None,
+    ) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+        """
+        Equivalente do iter_csv_chunks para planilhas .xlsx: as linhas da primeira planilha
+        são lidas em stream (xlsx_reader, openpyxl read-only) e passam pela mesma resolução
+        de aliases e limpeza do CSV. Células numéricas já tipadas não passam pela limpeza
+        de texto. O pico de memória depende do bloco, não do tamanho da planilha.
+        """
+        frames = iter_xlsx_frames(source, chunk_size)
+        yield from CSVService._iter_validated(frames, "XLSX", key_columns, typed_numbers=True, memory=memory)
+
+    @staticmethod
+    def _iter_validated(
+        frames: Iterator[pd.DataFrame],
+        kind: str,
+        key_columns: Optional[List[str]] = None,
+        typed_numbers: bool = False,
+        memory: Optional[MemoryReport] = None,
+    ) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+        """Valida e transforma os blocos lidos (CSV ou XLSX), resolvendo colunas no primeiro."""
+        col_map = None
+        date_formats: Dict[str, Optional[str]] = {}
+        key_builder = None
+        try:
+            for chunk in frames:
+                chunk_errors: List[str] = []
+                if col_map is None:
+                    col_map, date_formats = CSVService._prepare_columns(chunk)
+                    typed_numbers = typed_numbers or CSVService.typed_numbers(chunk.columns.tolist())
+                    if key_columns:
+                        key_builder, missing = RowKeyBuilder.for_frame(chunk, key_columns)
+                        if key_builder is None:
+                            chunk_errors.append(
+                                f"Colunas da chave de merge ausentes ({', '.join(missing)}); "
+                                "linhas adicionadas sem deduplicação."
+                            )
+
+                out = CSVService._transform_frame(
+                    chunk, col_map, chunk_errors, date_formats, typed_numbers, memory
+                )
+                if key_columns:
+                    out["row_key"] = key_builder.build(chunk.loc[out.index]) if key_builder else None
+                yield out, chunk_errors
+        except (UnicodeDecodeError, CSVValidationError):
+            raise
+        except XLSXUnavailableError as e:
+            raise CSVValidationError(str(e))
+        except pd.errors.EmptyDataError:
+            raise CSVValidationError(f"O arquivo {kind} está vazio ou mal formatado.")
+        except Exception as e:
+            logger.error(f"Erro ao processar {kind}: {str(e)}")
+            raise CSVValidationError(f"Erro ao processar arquivo {kind}: {str(e)}")
+
+        if col_map is None:
+            raise CSVValidationError(f"O arquivo {kind} está vazio.")
+
+    @staticmethod
+    def merge_errors(errors: List[str], chunk_errors: List[str]) -> List[str]:
+        """Acrescenta os avisos de um bloco à lista final, sem repetir mensagens."""
+        for message in chunk_errors:
+            if message not in errors:
+                errors.append(message)
+        return errors
+
     @staticmethod
     def dataframe_to_dict_list(df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.schemas.dashboard import DashboardFilters, DashboardResponse
+from app.services.dashboard_service import RANGE_FILTER_FIELDS, DashboardService
+
+try:
+    import redis
+except ImportError:  # redis é opcional: sem ele só o backend em memória fica disponível
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Valores de DASHBOARD_CACHE_BACKEND
+BACKEND_MEMORY = "memory"
+BACKEND_REDIS = "redis"
+BACKEND_NONE = "none"
+
+_MB = 1024 * 1024
+
+
+class MemoryCacheBackend:
+    """
+    LRU em memória do processo, com TTL: entradas vencidas são descartadas na leitura e,
+    ao gravar, as menos usadas saem até caber em `max_entries` e `max_bytes`.
+    Compartilhado entre as threads do servidor, por isso protegido por lock.
+    """
+    name = BACKEND_MEMORY
+
+    def __init__(self, ttl: int, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.expired = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expired += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "mb": round(self._bytes / _MB, 2),
+                "max_mb": round(self.max_bytes / _MB, 2),
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+class RedisCacheBackend:
+    """
+    Cache compartilhado entre processos/instâncias (Redis, SET com expiração). A evicção
+    por memória é a do servidor (maxmemory-policy). Aceita um `client` pronto com get/set,
+    ex.: fakeredis nos testes. Falhas de conexão contam como miss, nunca como erro da API.
+    """
+    name = BACKEND_REDIS
+
+    def __init__(self, ttl: int, url: str = "", client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("DASHBOARD_CACHE_BACKEND=redis requer o pacote redis instalado")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache do dashboard indisponível na leitura: {e}")
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str) -> None:
+        try:
+            self.client.set(key, value, ex=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache do dashboard indisponível na gravação: {e}")
+
+    def clear(self) -> None:
+        pass  # chaves de versões antigas expiram sozinhas (TTL)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"errors": self.errors}
+
+
+def build_backend():
+    """Backend conforme DASHBOARD_CACHE_BACKEND; None desativa o cache."""
+    backend = settings.DASHBOARD_CACHE_BACKEND
+    if backend == BACKEND_MEMORY:
+        return MemoryCacheBackend(
+            ttl=settings.DASHBOARD_CACHE_TTL,
+            max_entries=settings.DASHBOARD_CACHE_MAX_ENTRIES,
+            max_bytes=settings.DASHBOARD_CACHE_MAX_MB * _MB,
+        )
+    if backend == BACKEND_REDIS:
+        return RedisCacheBackend(ttl=settings.DASHBOARD_CACHE_TTL, url=settings.DASHBOARD_CACHE_URL)
+    if backend != BACKEND_NONE:
+        logger.warning(f"DASHBOARD_CACHE_BACKEND desconhecido: {backend}; cache desativado")
+    return None
+
+
+class DashboardCache:
+    """
+    Cache das respostas de GET /dashboard, por (usuário, versão dos dados, filtros
+    normalizados). A versão (users.data_version) é incrementada na mesma transação das
+    escritas que mudam os dados do usuário (ingestão, refresh, anúncios): uma versão nova
+    muda a chave, e as respostas antigas deixam de ser lidas e saem por TTL/LRU.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def configure(self, backend) -> None:
+        """Troca o backend (ex.: RedisCacheBackend com um cliente de teste) e zera os contadores."""
+        self.backend = backend
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def normalize_filters(filters: DashboardFilters) -> str:
+        """
+        Filtros em forma canônica: o produto vai em minúsculas (a busca é ILIKE) e vazio
+        equivale a sem filtro; valores numéricos como float; o top-N de produtos já resolvido
+        (omitido e DASHBOARD_PRODUCT_LIMIT são a mesma chave).
+        """
+        return json.dumps({
+            "start_date": filters.start_date.isoformat() if filters.start_date else None,
+            "end_date": filters.end_date.isoformat() if filters.end_date else None,
+            "product": filters.product.lower() if filters.product else None,
+            "min_value": float(filters.min_value) if filters.min_value is not None else None,
+            "max_value": float(filters.max_value) if filters.max_value is not None else None,
+            "product_limit": DashboardService.product_limit(filters),
+            **{
+                field: float(getattr(filters, field)) if getattr(filters, field) is not None else None
+                for field in RANGE_FILTER_FIELDS
+            },
+        }, sort_keys=True)
+
+    @staticmethod
+    def key(user_id: int, version: int, filters: DashboardFilters) -> str:
+        digest = hashlib.blake2b(DashboardCache.normalize_filters(filters).encode("utf-8"), digest_size=16)
+        return f"dashboard:{user_id}:{version}:{digest.hexdigest()}"
+
+    @staticmethod
+    def data_version(db: Session, user_id: int) -> int:
+        version = db.execute(text("SELECT data_version FROM users WHERE id = :id"), {"id": user_id}).scalar()
+        return version or 0
+
+    @staticmethod
+    def bump_version(db: Session, user_id: int) -> None:
+        """
+        Invalida o dashboard do usuário. Roda na transação do chamador (o commit fica a
+        cargo dele): a versão nova só aparece junto com os dados que a motivaram.
+        """
+        db.execute(text("UPDATE users SET data_version = data_version + 1 WHERE id = :id"), {"id": user_id})
+
+    def get_dashboard(self, db: Session, user_id: int, filters: DashboardFilters) -> DashboardResponse:
+        """DashboardService.get_dashboard, servido do cache quando a versão e os filtros batem."""
+        if self.backend is None:
+            return DashboardService.get_dashboard(db, user_id, filters)
+
+        key = DashboardCache.key(user_id, DashboardCache.data_version(db, user_id), filters)
+        cached = self.backend.get(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return DashboardResponse.model_validate_json(cached)
+
+        with self._lock:
+            self.misses += 1
+        response = DashboardService.get_dashboard(db, user_id, filters)
+        self.backend.set(key, response.model_dump_json())
+        return response
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores (hits, misses, taxa de acerto) e os do backend (tamanho, evicções...)."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        report: Dict[str, Any] = {
+            "backend": self.backend.name if self.backend is not None else BACKEND_NONE,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
+        if self.backend is not None:
+            report.update(self.backend.stats())
+        return report
+
+
+dashboard_cache = DashboardCache(build_backend())
@@ -1,59 +1,192 @@
+import base64
+import json
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, literal, select, tuple_
 from datetime import date, datetime
-from typing import Optional, List
-from decimal import Decimal
+from typing import Optional, List, Tuple
+from decimal import Decimal, InvalidOperation
 
+from app.core.config import settings
+from app.models.daily_rollup import DailyRollup
 from app.models.dataset_row import DatasetRow
 from app.schemas.dashboard import (
     DashboardFilters,
     KPIs,
     PeriodAggregation,
     ProductAggregation,
+    OthersAggregation,
+    ProductPage,
     DashboardResponse
 )
 
+# Valor de grouping(date, product) em cada conjunto do GROUPING SETS (bit 1 = coluna fora do grupo)
+LEVEL_PERIOD = 1  # GROUP BY date
+LEVEL_PRODUCT = 2  # GROUP BY product
+LEVEL_TOTAL = 3  # () - KPIs
+
+# Métricas com filtro de faixa próprio (<métrica>_min / <métrica>_max em DashboardFilters)
+RANGE_METRICS = ["revenue", "cost", "commission", "profit"]
+RANGE_FILTER_FIELDS = [f"{metric}_{bound}" for metric in RANGE_METRICS for bound in ("min", "max")]
+
+# Nome da linha que soma os produtos fora do top-N
+OTHERS_LABEL = "Outros"
+# Maior página de produtos (product_limit do dashboard e limit de /dashboard/products)
+MAX_PRODUCT_PAGE = 500
+
+
+def encode_cursor(profit: Decimal, product: str) -> str:
+    """Cursor opaco da paginação de produtos: o último (lucro, produto) entregue."""
+    payload = json.dumps([str(profit), product]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Decimal, str]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        profit, product = json.loads(payload)
+        return Decimal(profit), str(product)
+    except (ValueError, TypeError, InvalidOperation):
+        raise ValueError("Cursor inválido")
+
 
 class DashboardService:
     """Service for dashboard analytics and aggregations."""
 
+    @staticmethod
+    def has_value_filters(filters: DashboardFilters) -> bool:
+        """Há filtro por valor (min_value/max_value ou faixa de alguma métrica)?"""
+        return any(
+            getattr(filters, field) is not None
+            for field in ["min_value", "max_value"] + RANGE_FILTER_FIELDS
+        )
+
+    @staticmethod
+    def use_rollup(filters: DashboardFilters) -> bool:
+        """
+        O rollup diário atende filtros por data e produto; os filtros por valor
+        (min_value/max_value e as faixas por métrica) valem linha a linha e exigem dataset_rows.
+        """
+        return settings.DASHBOARD_USE_ROLLUP and not DashboardService.has_value_filters(filters)
+
+    @staticmethod
+    def source(filters: DashboardFilters):
+        """Tabela lida pelas agregações: DailyRollup ou DatasetRow."""
+        return DailyRollup if DashboardService.use_rollup(filters) else DatasetRow
+
+    @staticmethod
+    def metric_columns(source) -> List:
+        """Somas das métricas e contagem de linhas, na tabela de origem (ou colunas de uma CTE)."""
+        row_count = func.count(source.id) if source is DatasetRow else func.sum(source.row_count)
+        return [
+            func.sum(source.revenue).label('revenue'),
+            func.sum(source.cost).label('cost'),
+            func.sum(source.commission).label('commission'),
+            func.sum(source.profit).label('profit'),
+            row_count.label('row_count'),
+        ]
+
+    @staticmethod
+    def metric_values(result) -> dict:
+        """Métricas de uma linha de resultado, nos tipos dos schemas."""
+        return dict(
+            revenue=float(result.revenue or 0),
+            cost=float(result.cost or 0),
+            commission=float(result.commission or 0),
+            profit=float(result.profit or 0),
+            row_count=int(result.row_count or 0)
+        )
+
+    @staticmethod
+    def product_limit(filters: DashboardFilters) -> Optional[int]:
+        """Tamanho do top-N de produtos; None (DASHBOARD_PRODUCT_LIMIT = 0) lista todos."""
+        if filters.product_limit is not None:
+            return filters.product_limit
+        return settings.DASHBOARD_PRODUCT_LIMIT or None
+
+    @staticmethod
+    def top_n_bucket(rank, limit: Optional[int], condition=None):
+        """
+        Posição da linha no resultado: o próprio rank até `limit`; acima dele (e se
+        `condition`), todas caem no balde limit + 1, o "Outros", somado pelo GROUP BY de fora.
+        """
+        if not limit:
+            return rank
+        overflow = rank > limit if condition is None else and_(condition, rank > limit)
+        return case((overflow, limit + 1), else_=rank)
+
+    @staticmethod
+    def product_page(results, limit: Optional[int], product_count: Optional[int] = None) -> ProductPage:
+        """
+        Página a partir das linhas por balde (top_n_bucket), em ordem de rank. Sem
+        `product_count`, o total é o da página mais os do "Outros" (página sem cursor).
+        """
+        items = []
+        others = None
+        last = None
+        for result in results:
+            if limit and result.bucket > limit:
+                others = OthersAggregation(
+                    product=OTHERS_LABEL,
+                    product_count=result.product_count,
+                    **DashboardService.metric_values(result)
+                )
+            else:
+                items.append(ProductAggregation(product=result.product, **DashboardService.metric_values(result)))
+                last = result
+
+        next_cursor = encode_cursor(last.profit or 0, last.product) if others is not None and last is not None else None
+        if product_count is None:
+            product_count = len(items) + (others.product_count if others is not None else 0)
+        return ProductPage(items=items, others=others, next_cursor=next_cursor, product_count=product_count)
+
     @staticmethod
     def build_filters(
         db: Session,
         user_id: int,
-        filters: DashboardFilters
+        filters: DashboardFilters,
+        source=DatasetRow
     ) -> List:
         """Build SQLAlchemy filter conditions based on dashboard filters."""
-        conditions = [DatasetRow.user_id == user_id]
+        conditions = [source.user_id == user_id]
         
         if filters.start_date:
-            conditions.append(DatasetRow.date >= filters.start_date)
+            conditions.append(source.date >= filters.start_date)
         
         if filters.end_date:
-            conditions.append(DatasetRow.date <= filters.end_date)
+            conditions.append(source.date <= filters.end_date)
         
         if filters.product:
-            conditions.append(DatasetRow.product.ilike(f"%{filters.product}%"))
+            conditions.append(source.product.ilike(f"%{filters.product}%"))
         
         if filters.min_value is not None:
             conditions.append(
                 or_(
-                    DatasetRow.revenue >= filters.min_value,
-                    DatasetRow.cost >= filters.min_value,
-                    DatasetRow.commission >= filters.min_value,
-                    DatasetRow.profit >= filters.min_value
+                    source.revenue >= filters.min_value,
+                    source.cost >= filters.min_value,
+                    source.commission >= filters.min_value,
+                    source.profit >= filters.min_value
                 )
             )
         
         if filters.max_value is not None:
             conditions.append(
                 or_(
-                    DatasetRow.revenue <= filters.max_value,
-                    DatasetRow.cost <= filters.max_value,
-                    DatasetRow.commission <= filters.max_value,
-                    DatasetRow.profit <= filters.max_value
+                    source.revenue <= filters.max_value,
+                    source.cost <= filters.max_value,
+                    source.commission <= filters.max_value,
+                    source.profit <= filters.max_value
                 )
             )
+
+        # Faixas por métrica: um intervalo numa coluna só, que o índice (user_id, métrica) atende
+        for metric in RANGE_METRICS:
+            column = getattr(source, metric)
+            low = getattr(filters, f"{metric}_min")
+            high = getattr(filters, f"{metric}_max")
+            if low is not None:
+                conditions.append(column >= low)
+            if high is not None:
+                conditions.append(column <= high)
         
         return conditions
 
@@ -64,22 +197,19 @@ class DashboardService:
         filters: DashboardFilters
     ) -> KPIs:
         """Calculate KPIs for the dashboard."""
-        conditions = DashboardService.build_filters(db, user_id, filters)
+        source = DashboardService.source(filters)
+        conditions = DashboardService.build_filters(db, user_id, filters, source)
         
         result = db.query(
-            func.sum(DatasetRow.revenue).label('total_revenue'),
-            func.sum(DatasetRow.cost).label('total_cost'),
-            func.sum(DatasetRow.commission).label('total_commission'),
-            func.sum(DatasetRow.profit).label('total_profit'),
-            func.count(DatasetRow.id).label('total_rows')
+            *DashboardService.metric_columns(source)
         ).filter(and_(*conditions)).first()
         
         return KPIs(
-            total_revenue=float(result.total_revenue or 0),
-            total_cost=float(result.total_cost or 0),
-            total_commission=float(result.total_commission or 0),
-            total_profit=float(result.total_profit or 0),
-            total_rows=int(result.total_rows or 0)
+            total_revenue=float(result.revenue or 0),
+            total_cost=float(result.cost or 0),
+            total_commission=float(result.commission or 0),
+            total_profit=float(result.profit or 0),
+            total_rows=int(result.row_count or 0)
         )
 
     @staticmethod
@@ -89,21 +219,18 @@ class DashboardService:
         filters: DashboardFilters
     ) -> List[PeriodAggregation]:
         """Get aggregations grouped by date."""
-        conditions = DashboardService.build_filters(db, user_id, filters)
+        source = DashboardService.source(filters)
+        conditions = DashboardService.build_filters(db, user_id, filters, source)
         
         results = db.query(
-            DatasetRow.date.label('period'),
-            func.sum(DatasetRow.revenue).label('revenue'),
-            func.sum(DatasetRow.cost).label('cost'),
-            func.sum(DatasetRow.commission).label('commission'),
-            func.sum(DatasetRow.profit).label('profit'),
-            func.count(DatasetRow.id).label('row_count')
+            source.date.label('period'),
+            *DashboardService.metric_columns(source)
         ).filter(
             and_(*conditions)
         ).group_by(
-            DatasetRow.date
+            source.date
         ).order_by(
-            DatasetRow.date
+            source.date
         ).all()
         
         return [
@@ -124,35 +251,162 @@ class DashboardService:
         user_id: int,
         filters: DashboardFilters
     ) -> List[ProductAggregation]:
-        """Get aggregations grouped by product."""
-        conditions = DashboardService.build_filters(db, user_id, filters)
-        
-        results = db.query(
-            DatasetRow.product.label('product'),
-            func.sum(DatasetRow.revenue).label('revenue'),
-            func.sum(DatasetRow.cost).label('cost'),
-            func.sum(DatasetRow.commission).label('commission'),
-            func.sum(DatasetRow.profit).label('profit'),
-            func.count(DatasetRow.id).label('row_count')
-        ).filter(
+        """Get aggregations grouped by product (all of them, by profit)."""
+        return DashboardService.get_product_page(db, user_id, filters, limit=None).items
+
+    @staticmethod
+    def get_product_page(
+        db: Session,
+        user_id: int,
+        filters: DashboardFilters,
+        limit: Optional[int],
+        cursor: Optional[str] = None
+    ) -> ProductPage:
+        """
+        Os `limit` produtos de maior lucro depois do `cursor`, e os demais somados em
+        "Outros". O rank (row_number() OVER) e a soma do resto saem do banco numa consulta;
+        o cursor é keyset sobre (lucro, produto), a mesma ordem do rank. `product_count` é
+        o total de produtos dos filtros (count() OVER antes do cursor), o mesmo em todas as
+        páginas.
+        """
+        source = DashboardService.source(filters)
+        conditions = DashboardService.build_filters(db, user_id, filters, source)
+
+        products = select(
+            source.product.label('product'),
+            *DashboardService.metric_columns(source),
+            func.count().over().label('total_products')
+        ).where(
             and_(*conditions)
         ).group_by(
-            DatasetRow.product
-        ).order_by(
-            func.sum(DatasetRow.profit).desc()
+            source.product
+        ).subquery('products')
+
+        profit = func.coalesce(products.c.profit, 0)
+        page = select(
+            products,
+            func.row_number().over(order_by=(profit.desc(), products.c.product)).label('rank')
+        )
+        if cursor:
+            after_profit, after_product = decode_cursor(cursor)
+            page = page.where(
+                or_(profit < after_profit, and_(profit == after_profit, products.c.product > after_product))
+            )
+
+        ranked = page.subquery('ranked')
+        bucket = DashboardService.top_n_bucket(ranked.c.rank, limit)
+        results = db.execute(
+            select(
+                bucket.label('bucket'),
+                func.min(ranked.c.product).label('product'),
+                *DashboardService.metric_columns(ranked.c),
+                func.count().label('product_count'),
+                func.max(ranked.c.total_products).label('total_products')
+            ).group_by(bucket).order_by(bucket)
         ).all()
-        
-        return [
-            ProductAggregation(
-                product=result.product,
-                revenue=float(result.revenue or 0),
-                cost=float(result.cost or 0),
-                commission=float(result.commission or 0),
-                profit=float(result.profit or 0),
-                row_count=int(result.row_count or 0)
+
+        if results:
+            product_count = results[0].total_products
+        else:
+            # Cursor depois do último produto: a página vem vazia, mas o total continua o mesmo
+            product_count = db.execute(select(func.count()).select_from(products)).scalar()
+        return DashboardService.product_page(results, limit, product_count)
+
+    @staticmethod
+    def get_dashboard_single_query(
+        db: Session,
+        user_id: int,
+        filters: DashboardFilters
+    ) -> DashboardResponse:
+        """
+        KPIs, agregações por período e por produto numa única consulta: as linhas filtradas
+        ficam numa CTE e um GROUPING SETS ((), (date), (product)) calcula os três níveis numa
+        só passada. O rank dos produtos (row_number() OVER por nível) e o balde "Outros" do
+        top-N também saem dela. O resultado (e a ordem de cada lista) é o mesmo das três
+        consultas separadas.
+        """
+        limit = DashboardService.product_limit(filters)
+        source = DashboardService.source(filters)
+        conditions = DashboardService.build_filters(db, user_id, filters, source)
+        row_count = source.row_count if source is DailyRollup else literal(1)
+
+        filtered = select(
+            source.date,
+            source.product,
+            source.revenue,
+            source.cost,
+            source.commission,
+            source.profit,
+            row_count.label('row_count')
+        ).where(and_(*conditions)).cte('filtered')
+
+        level = func.grouping(filtered.c.date, filtered.c.product)
+        profit = func.coalesce(func.sum(filtered.c.profit), 0)
+        grouped = select(
+            level.label('level'),
+            filtered.c.date.label('period'),
+            filtered.c.product,
+            *DashboardService.metric_columns(filtered.c),
+            func.row_number().over(partition_by=level, order_by=(profit.desc(), filtered.c.product)).label('rank')
+        ).group_by(
+            func.grouping_sets(tuple_(), filtered.c.date, filtered.c.product)
+        ).subquery('grouped')
+
+        bucket = DashboardService.top_n_bucket(grouped.c.rank, limit, grouped.c.level == LEVEL_PRODUCT)
+        results = db.execute(
+            select(
+                grouped.c.level,
+                bucket.label('bucket'),
+                func.min(grouped.c.period).label('period'),
+                func.min(grouped.c.product).label('product'),
+                *DashboardService.metric_columns(grouped.c),
+                func.count().label('product_count')
+            ).group_by(
+                grouped.c.level,
+                bucket
+            ).order_by(
+                grouped.c.level,
+                func.min(grouped.c.period),
+                bucket
             )
-            for result in results
-        ]
+        ).all()
+
+        kpis = KPIs(total_revenue=0, total_cost=0, total_commission=0, total_profit=0, total_rows=0)
+        period_aggregations = []
+        product_results = []
+        for result in results:
+            values = DashboardService.metric_values(result)
+            if result.level == LEVEL_PERIOD:
+                period_aggregations.append(PeriodAggregation(period=str(result.period), **values))
+            elif result.level == LEVEL_PRODUCT:
+                product_results.append(result)
+            else:
+                kpis = KPIs(
+                    total_revenue=values['revenue'],
+                    total_cost=values['cost'],
+                    total_commission=values['commission'],
+                    total_profit=values['profit'],
+                    total_rows=values['row_count']
+                )
+
+        return DashboardService.dashboard_response(
+            kpis, period_aggregations, DashboardService.product_page(product_results, limit)
+        )
+
+    @staticmethod
+    def dashboard_response(
+        kpis: KPIs,
+        period_aggregations: List[PeriodAggregation],
+        products: ProductPage
+    ) -> DashboardResponse:
+        return DashboardResponse(
+            kpis=kpis,
+            period_aggregations=period_aggregations,
+            product_aggregations=products.items,
+            product_others=products.others,
+            product_count=products.product_count,
+            product_next_cursor=products.next_cursor
+        )
 
     @staticmethod
     def get_dashboard(
@@ -161,13 +415,14 @@ class DashboardService:
         filters: DashboardFilters
     ) -> DashboardResponse:
         """Get complete dashboard data with KPIs and aggregations."""
+        if settings.DASHBOARD_SINGLE_QUERY:
+            return DashboardService.get_dashboard_single_query(db, user_id, filters)
+        
         kpis = DashboardService.get_kpis(db, user_id, filters)
         period_aggregations = DashboardService.get_period_aggregations(db, user_id, filters)
-        product_aggregations = DashboardService.get_product_aggregations(db, user_id, filters)
-        
-        return DashboardResponse(
-            kpis=kpis,
-            period_aggregations=period_aggregations,
-            product_aggregations=product_aggregations
+        products = DashboardService.get_product_page(
+            db, user_id, filters, DashboardService.product_limit(filters)
         )
+        
+        return DashboardService.dashboard_response(kpis, period_aggregations, products)
 
@@ -0,0 +1,163 @@
+import os
+import sys
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage
+    resource = None
+
+# Colunas de texto do frame normalizado candidatas a category (status, loja, canal...)
+CATEGORY_COLUMNS = ["product", "status", "category", "sub_id1", "mes_ano"]
+
+# Colunas numéricas do frame normalizado candidatas a tipos menores
+NUMERIC_COLUMNS = ["revenue", "cost", "commission", "profit"]
+
+# Linhas amostradas para estimar o tamanho (deep) das colunas de texto de um bloco
+MEMORY_SAMPLE_ROWS = 2000
+
+# Etapas medidas em cada bloco: como lido, normalizado e após a otimização de tipos
+MEMORY_STEPS = ["input", "normalized", "optimized"]
+
+_MB = 1024 * 1024
+
+
+def current_rss_bytes() -> int:
+    """RSS atual (Linux: /proc/self/statm); fora do Linux cai no pico do processo."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_bytes(df: pd.DataFrame, sample_rows: int = MEMORY_SAMPLE_ROWS) -> int:
+    """
+    Tamanho do frame em memória, incluindo as strings (memory_usage deep). Em blocos
+    grandes as colunas de texto são estimadas por uma amostra espaçada de linhas: o deep
+    exato percorre todos os objetos e custaria quase meio segundo por bloco de 50 mil.
+    """
+    if len(df) <= sample_rows:
+        return int(df.memory_usage(deep=True, index=False).sum())
+    step = len(df) // sample_rows
+    sample = df.iloc[::step]
+    total = 0
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            total += int(sample[column].memory_usage(deep=True, index=False) * len(df) / len(sample))
+        else:
+            total += int(series.memory_usage(deep=True, index=False))
+    return total
+
+
+def _downcast_numeric(series: pd.Series) -> pd.Series:
+    """Inteiros vão para o menor tipo inteiro; floats para float32 só se nenhum valor mudar."""
+    if series.dtype.kind in "iu":
+        return pd.to_numeric(series, downcast="integer")
+    if series.dtype == np.float64:
+        compact = series.astype(np.float32)
+        if np.array_equal(compact.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+            return compact
+    return series
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compacta o frame normalizado: colunas de texto com poucos valores distintos
+    (até INGESTION_CATEGORY_MAX_RATIO das linhas) viram category, e as numéricas usam o
+    menor tipo que representa os mesmos valores. Os valores gravados não mudam.
+    """
+    if not settings.INGESTION_OPTIMIZE_DTYPES or df.empty:
+        return df
+    max_distinct = len(df) * settings.INGESTION_CATEGORY_MAX_RATIO
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and df[column].dtype == object:
+            series = df[column]
+            if series.notna().any() and series.nunique(dropna=True) <= max_distinct:
+                df[column] = series.astype("category")
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = _downcast_numeric(df[column])
+    return df
+
+
+class MemoryReport:
+    """
+    Memória de uma ingestão, acumulada bloco a bloco: tamanho dos frames em cada etapa
+    (MEMORY_STEPS; maior bloco e soma) e pico de RSS amostrado ao fim de cada etapa.
+    Vai para o log ao fim da ingestão e para o status do job (memory).
+    """
+
+    def __init__(self):
+        self.chunks = 0
+        self.max_bytes: Dict[str, int] = {step: 0 for step in MEMORY_STEPS}
+        self.total_bytes: Dict[str, int] = {step: 0 for step in MEMORY_STEPS}
+        self.peak_rss_bytes = 0
+        self.worker_peak_rss_bytes = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.INGESTION_MEMORY_STATS
+
+    def record(self, step: str, df: pd.DataFrame) -> None:
+        size = frame_bytes(df)
+        if step == MEMORY_STEPS[0]:
+            self.chunks += 1
+        self.max_bytes[step] = max(self.max_bytes[step], size)
+        self.total_bytes[step] += size
+        self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes())
+
+    def merge(self, other: "MemoryReport") -> None:
+        """Soma o relatório de um processo de parse (ParallelParser); o RSS dele fica à parte."""
+        self.chunks += other.chunks
+        for step in MEMORY_STEPS:
+            self.max_bytes[step] = max(self.max_bytes[step], other.max_bytes[step])
+            self.total_bytes[step] += other.total_bytes[step]
+        self.worker_peak_rss_bytes = max(self.worker_peak_rss_bytes, other.peak_rss_bytes)
+
+    def sample_rss(self) -> None:
+        self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes())
+
+    def to_dict(self) -> Dict[str, Any]:
+        normalized = self.total_bytes["normalized"]
+        saved = normalized - self.total_bytes["optimized"]
+        report: Dict[str, Any] = {
+            "chunks": self.chunks,
+            "steps": {
+                step: {
+                    "max_chunk_mb": round(self.max_bytes[step] / _MB, 1),
+                    "total_mb": round(self.total_bytes[step] / _MB, 1),
+                }
+                for step in MEMORY_STEPS
+            },
+            "optimized_saved_pct": round(100 * saved / normalized, 1) if normalized else 0.0,
+            "peak_rss_mb": round(self.peak_rss_bytes / _MB, 1),
+        }
+        if self.worker_peak_rss_bytes:
+            report["worker_peak_rss_mb"] = round(self.worker_peak_rss_bytes / _MB, 1)
+        return report
+
+    def summary(self) -> str:
+        """Linha de log: maior bloco em cada etapa, economia da otimização e pico de RSS."""
+        report = self.to_dict()
+        steps = ", ".join(
+            f"{step} {values['max_chunk_mb']} MB" for step, values in report["steps"].items()
+        )
+        return (
+            f"{report['chunks']} bloco(s); maior bloco: {steps}; "
+            f"otimização de tipos -{report['optimized_saved_pct']}%; pico de RSS {report['peak_rss_mb']} MB"
+        )
+
+
+def new_report() -> Optional[MemoryReport]:
+    """Relatório novo, ou None com INGESTION_MEMORY_STATS desligado."""
+    return MemoryReport() if MemoryReport.enabled() else None
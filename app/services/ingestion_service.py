@@ -0,0 +1,642 @@
+import json
+import logging
+import socket
+import threading
+from datetime import timedelta
+from io import BytesIO
+from typing import BinaryIO, Callable, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.dataset import Dataset
+from app.models.dataset_row import DatasetRow
+from app.models.ingestion_job import IngestionJob
+from app.schemas.ingestion import IngestionJobResponse
+from app.services.bulk_loader import BulkLoader
+from app.services.csv_service import CSVService, CSVValidationError
+from app.services.dashboard_cache import DashboardCache
+from app.services.frame_memory import MemoryReport, new_report
+from app.services.parallel_parser import ParallelParser
+from app.services.parsed_cache import ParsedFrameCache, ParsedFrameWriter
+from app.services.rollup_service import RollupService
+from app.services.upload_archive import DECOMPRESSION_ERRORS, KIND_XLSX, UploadArchive
+from app.services.upload_spool import UploadSpooler
+
+logger = logging.getLogger(__name__)
+
+# Estados de um IngestionJob
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELED = "canceled"
+
+FINISHED_STATUSES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELED}
+
+# Modos de ingestão: append sempre insere; merge faz upsert pela chave natural
+# (settings.MERGE_KEY_COLUMNS), gravando só linhas novas ou alteradas
+MODE_APPEND = "append"
+MODE_MERGE = "merge"
+INGESTION_MODES = {MODE_APPEND, MODE_MERGE}
+
+UNDECODABLE_MESSAGE = "Não foi possível decodificar o arquivo CSV. Verifique a codificação."
+
+# Chave de raw_data com o rateio de anúncios (POST /datasets/latest/ad_spend)
+AD_SPEND_KEY = "Valor gasto anuncios"
+
+# Callback chamado após cada bloco gravado: (rows_parsed, rows_inserted, errors, bytes_processed)
+ProgressCallback = Callable[[int, int, List[str], int], None]
+
+
+class IngestionCanceled(Exception):
+    """Raised from a progress callback to abort an ingestion in progress."""
+    pass
+
+
+class IngestionService:
+    """Service for loading CSV files into dataset_rows, inline or through background jobs."""
+
+    @staticmethod
+    def build_dataset_rows(df: pd.DataFrame, dataset_id: int, user_id: int) -> List[DatasetRow]:
+        """Converte um frame validado pelo CSVService em objetos DatasetRow."""
+        rows_data = CSVService.dataframe_to_dict_list(df)
+
+        dataset_rows = []
+        for row_data in rows_data:
+            raw_data = row_data.get("raw_data") if isinstance(row_data, dict) else None
+            raw_data_json = json.loads(raw_data) if raw_data is not None else raw_data
+            dataset_row = DatasetRow(
+                dataset_id=dataset_id,
+                user_id=user_id,
+                date=row_data['date'],
+                time=row_data.get('time'),
+                product=row_data['product'],
+                revenue=row_data['revenue'],
+                cost=row_data['cost'],
+                commission=row_data['commission'],
+                profit=row_data['profit'],
+                status=row_data.get('status'),
+                category=row_data.get('category'),
+                sub_id1=row_data.get('sub_id1'),
+                mes_ano=row_data.get('mes_ano'),
+                raw_data=raw_data_json,
+            )
+            dataset_rows.append(dataset_row)
+        return dataset_rows
+
+    @staticmethod
+    def insert_chunk(db: Session, chunk: pd.DataFrame, dataset: Dataset, mode: str = MODE_APPEND) -> int:
+        """
+        Grava um bloco validado em dataset_rows (COPY por padrão, ORM como alternativa).
+        No modo merge o upsert sempre passa pelo BulkLoader. Retorna as linhas gravadas.
+        """
+        if mode == MODE_MERGE:
+            inserted, updated = BulkLoader.merge_rows(db, chunk, dataset.id, dataset.user_id)
+            return inserted + updated
+
+        if settings.CSV_USE_COPY:
+            return BulkLoader.copy_rows(db, chunk, dataset.id, dataset.user_id)
+
+        dataset_rows = IngestionService.build_dataset_rows(chunk, dataset.id, dataset.user_id)
+        db.add_all(dataset_rows)
+        db.flush()
+        # Libera os objetos do bloco da sessão para manter a memória limitada
+        for dataset_row in dataset_rows:
+            db.expunge(dataset_row)
+        return len(dataset_rows)
+
+    @staticmethod
+    def ingest_csv(
+        db: Session,
+        dataset: Dataset,
+        source: Union[bytes, BinaryIO],
+        filename: str,
+        on_progress: Optional[ProgressCallback] = None,
+        content_hash: Optional[str] = None,
+        mode: str = MODE_APPEND,
+        memory: Optional[MemoryReport] = None,
+    ) -> Tuple[int, List[str]]:
+        """
+        Processa o CSV em blocos (CSVService.iter_csv_chunks) e grava cada bloco validado
+        assim que fica pronto, sem materializar o arquivo inteiro em DataFrame.
+        A codificação é decidida antes (CSVService.detect_encoding), então o arquivo é
+        parseado uma única vez; tudo roda dentro de um savepoint, desfeito em caso de erro.
+        Com `content_hash` e PARSED_CACHE_DIR configurado, os blocos normalizados também
+        vão para o cache em disco (ParsedFrameCache).
+        No modo merge, linhas já existentes e sem alteração não são regravadas.
+        `memory` (MemoryReport) acumula o tamanho dos blocos por etapa e o pico de RSS.
+
+        Retorna (linhas gravadas, avisos mesclados entre os blocos).
+        Levanta CSVValidationError se o arquivo não puder ser processado; o commit fica a
+        cargo do chamador.
+        """
+        handle = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        return IngestionService.ingest_members(
+            db, dataset, [(filename, handle)], filename, on_progress, content_hash, mode, memory
+        )
+
+    @staticmethod
+    def ingest_file(
+        db: Session,
+        dataset: Dataset,
+        file_path: str,
+        filename: str,
+        on_progress: Optional[ProgressCallback] = None,
+        content_hash: Optional[str] = None,
+        mode: str = MODE_APPEND,
+        memory: Optional[MemoryReport] = None,
+    ) -> Tuple[int, List[str]]:
+        """
+        Ingestão de um upload salvo em disco: .csv, .csv.gz, .zip ou .xlsx (UploadArchive).
+        Os membros compactados são descompactados em stream direto para o parser; todos
+        os CSVs de um .zip vão para o mesmo dataset.
+        """
+        with UploadArchive.open_members(file_path, filename) as members:
+            return IngestionService.ingest_members(
+                db, dataset, members, filename, on_progress, content_hash, mode, memory
+            )
+
+    @staticmethod
+    def ingest_members(
+        db: Session,
+        dataset: Dataset,
+        members: Iterable[Tuple[str, BinaryIO]],
+        filename: str,
+        on_progress: Optional[ProgressCallback] = None,
+        content_hash: Optional[str] = None,
+        mode: str = MODE_APPEND,
+        memory: Optional[MemoryReport] = None,
+    ) -> Tuple[int, List[str]]:
+        """
+        Núcleo do ingest_csv para um ou mais CSVs (membros de um .zip) gravados no mesmo
+        dataset, num único savepoint e com um único cache. CSVs grandes em disco são
+        parseados em vários processos quando INGESTION_PARSE_PROCESSES > 1 (ParallelParser).
+        O progresso em bytes soma as posições (descompactadas) dos membros já lidos. Avisos
+        e erros de membros de um arquivo compactado levam o nome do membro na frente.
+        O relatório de memória vai para o log ao fim (sem `memory`, um relatório próprio).
+        Antes do primeiro bloco gravado, espera as outras ingestões do mesmo usuário
+        terminarem (RollupService.lock_user); o parse desse bloco já corre em paralelo.
+        """
+        if memory is None:
+            memory = new_report()
+        key_columns = settings.MERGE_KEY_COLUMNS if mode == MODE_MERGE else None
+        errors: List[str] = []
+        parsed = 0
+        inserted = 0
+        bytes_done = 0
+        member_name = filename
+        locked = False
+        cache_writer = ParsedFrameCache.open_writer(content_hash, mode)
+        savepoint = db.begin_nested()
+
+        def label(message: str) -> str:
+            return message if member_name == filename else f"{member_name}: {message}"
+
+        try:
+            for member_name, handle in members:
+                start_position = handle.tell()
+                if UploadArchive.kind(member_name) == KIND_XLSX:
+                    chunks = CSVService.iter_xlsx_chunks(
+                        handle, member_name, chunk_size=settings.CSV_CHUNK_SIZE, key_columns=key_columns,
+                        memory=memory,
+                    )
+                else:
+                    encoding = CSVService.detect_encoding(handle)
+                    if encoding is None:
+                        raise CSVValidationError(UNDECODABLE_MESSAGE)
+                    if ParallelParser.can_split(handle, encoding):
+                        chunks = ParallelParser.iter_csv_chunks(
+                            handle, member_name, encoding, settings.CSV_CHUNK_SIZE, key_columns, memory,
+                        )
+                    else:
+                        chunks = CSVService.iter_csv_chunks(
+                            handle, member_name, encoding=encoding, chunk_size=settings.CSV_CHUNK_SIZE,
+                            key_columns=key_columns, memory=memory,
+                        )
+
+                for chunk, chunk_errors in chunks:
+                    CSVService.merge_errors(errors, [label(message) for message in chunk_errors])
+                    parsed += len(chunk)
+                    if not chunk.empty:
+                        if not locked:
+                            RollupService.lock_user(db, dataset.user_id)
+                            locked = True
+                        inserted += IngestionService.insert_chunk(db, chunk, dataset, mode)
+                        cache_writer = IngestionService._cache_chunk(cache_writer, chunk)
+                        if memory is not None:
+                            memory.sample_rss()  # inclui o buffer do COPY
+                    if on_progress is not None:
+                        on_progress(parsed, inserted, errors, bytes_done + handle.tell() - start_position)
+                bytes_done += handle.tell() - start_position
+
+            if parsed == 0:
+                member_name = filename
+                raise CSVValidationError("Após processamento, nenhuma linha válida restou.")
+        except UnicodeDecodeError:
+            savepoint.rollback()
+            IngestionService._discard_cache(cache_writer)
+            raise CSVValidationError(label(UNDECODABLE_MESSAGE))
+        except DECOMPRESSION_ERRORS:
+            savepoint.rollback()
+            IngestionService._discard_cache(cache_writer)
+            raise CSVValidationError("Arquivo compactado inválido ou corrompido.")
+        except CSVValidationError as e:
+            savepoint.rollback()
+            IngestionService._discard_cache(cache_writer)
+            raise CSVValidationError('; '.join(errors + [label(str(e))]))
+        except Exception:
+            savepoint.rollback()
+            IngestionService._discard_cache(cache_writer)
+            raise
+
+        savepoint.commit()
+        DashboardCache.bump_version(db, dataset.user_id)
+        if memory is not None:
+            logger.info(f"Memória da ingestão de {filename}: {memory.summary()}")
+        if cache_writer is not None:
+            try:
+                cache_writer.commit()
+            except Exception as e:
+                logger.warning(f"Não foi possível gravar o cache do arquivo {content_hash}: {e}")
+                IngestionService._discard_cache(cache_writer)
+        return inserted, errors
+
+    @staticmethod
+    def _cache_chunk(cache_writer: Optional[ParsedFrameWriter], chunk: pd.DataFrame) -> Optional[ParsedFrameWriter]:
+        """Acrescenta o bloco ao cache; uma falha no cache desativa-o sem afetar a ingestão."""
+        if cache_writer is None:
+            return None
+        try:
+            cache_writer.write(chunk)
+            return cache_writer
+        except Exception as e:
+            logger.warning(f"Cache do frame normalizado desativado para este upload: {e}")
+            IngestionService._discard_cache(cache_writer)
+            return None
+
+    @staticmethod
+    def _discard_cache(cache_writer: Optional[ParsedFrameWriter]) -> None:
+        if cache_writer is None:
+            return
+        try:
+            cache_writer.discard()
+        except Exception as e:
+            logger.warning(f"Não foi possível descartar o cache temporário {cache_writer.path}: {e}")
+
+    @staticmethod
+    def find_existing_dataset(db: Session, user_id: int, content_hash: str) -> Optional[Dataset]:
+        """Dataset mais recente do usuário criado a partir exatamente destes bytes."""
+        return (
+            db.query(Dataset)
+            .filter(Dataset.user_id == user_id, Dataset.content_hash == content_hash)
+            .order_by(Dataset.id.desc())
+            .first()
+        )
+
+    @staticmethod
+    def find_pending_job(db: Session, user_id: int, content_hash: str) -> Optional[IngestionJob]:
+        """Job ainda na fila ou em execução para o mesmo arquivo do mesmo usuário."""
+        return (
+            db.query(IngestionJob)
+            .filter(
+                IngestionJob.user_id == user_id,
+                IngestionJob.content_hash == content_hash,
+                IngestionJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+                IngestionJob.cancel_requested.is_(False),
+            )
+            .order_by(IngestionJob.id.desc())
+            .first()
+        )
+
+    @staticmethod
+    def has_ad_spend(db: Session, dataset: Dataset) -> bool:
+        """Se alguma linha do dataset recebeu rateio de anúncios (perdido num reload_from_cache)."""
+        return db.query(
+            db.query(DatasetRow.id).filter(
+                DatasetRow.dataset_id == dataset.id, DatasetRow.raw_data[AD_SPEND_KEY].isnot(None)
+            ).exists()
+        ).scalar()
+
+    @staticmethod
+    def reload_from_cache(db: Session, dataset: Dataset) -> int:
+        """
+        Regrava as linhas do dataset a partir do frame cacheado, sem parsear o CSV.
+        As linhas voltam ao estado do upload (ajustes feitos depois, como ad_spend, são
+        descartados; ver has_ad_spend). Frames do modo merge só devolvem as chaves que o usuário não tem mais:
+        as que um upload mais novo gravou ou atualizou continuam com ele, com os valores
+        dele. O commit fica a cargo do chamador.
+        """
+        RollupService.lock_user(db, dataset.user_id)
+        db.query(DatasetRow).filter(DatasetRow.dataset_id == dataset.id).delete(synchronize_session=False)
+        inserted = 0
+        mode = dataset.mode or MODE_APPEND
+        for chunk in ParsedFrameCache.iter_chunks(dataset.content_hash, mode, settings.CSV_CHUNK_SIZE):
+            # Frames do modo merge trazem row_key: nunca sobrescrevem dados mais novos
+            if mode == MODE_MERGE:
+                inserted += BulkLoader.insert_missing_rows(db, chunk, dataset.id, dataset.user_id)
+            else:
+                inserted += IngestionService.insert_chunk(db, chunk, dataset, MODE_APPEND)
+        DashboardCache.bump_version(db, dataset.user_id)
+        return inserted
+
+    # ------------------------------------------------------------------
+    # Fila de jobs (tabela ingestion_jobs no próprio PostgreSQL)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        user_id: int,
+        filename: str,
+        file_path: str,
+        content_hash: Optional[str] = None,
+        mode: str = MODE_APPEND,
+    ) -> IngestionJob:
+        """
+        Cria um job na fila para um arquivo já salvo no spool. Para .csv.gz/.zip, total_bytes
+        é o tamanho descompactado, a mesma base do progresso reportado durante o parse.
+        """
+        job = IngestionJob(
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            content_hash=content_hash,
+            mode=mode,
+            status=JOB_QUEUED,
+            spool_host=socket.gethostname(),
+            total_bytes=UploadArchive.uncompressed_size(file_path, filename),
+            bytes_processed=0,
+            rows_parsed=0,
+            rows_inserted=0,
+            warnings=[],
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def claim_next_job(db: Session) -> Optional[int]:
+        """
+        Reserva o próximo job da fila (FOR UPDATE SKIP LOCKED, seguro entre processos).
+        Jobs "running" sem heartbeat há mais de INGESTION_JOB_TIMEOUT segundos são
+        considerados abandonados (worker morto) e voltam a ser processados; enquanto o worker
+        vive, JobHeartbeat renova o heartbeat mesmo durante um bloco lento.
+        O arquivo do job fica no spool local de quem recebeu o upload: sem
+        INGESTION_SPOOL_SHARED, só workers do mesmo host (spool_host) pegam o job.
+        """
+        stale_before = func.now() - timedelta(seconds=settings.INGESTION_JOB_TIMEOUT)
+        conditions = [
+            or_(
+                IngestionJob.status == JOB_QUEUED,
+                and_(
+                    IngestionJob.status == JOB_RUNNING,
+                    func.coalesce(IngestionJob.heartbeat_at, IngestionJob.started_at) < stale_before,
+                ),
+            )
+        ]
+        if not settings.INGESTION_SPOOL_SHARED:
+            # Jobs sem spool_host são anteriores à coluna
+            conditions.append(
+                or_(IngestionJob.spool_host.is_(None), IngestionJob.spool_host == socket.gethostname())
+            )
+        job = (
+            db.query(IngestionJob)
+            .filter(*conditions)
+            .order_by(IngestionJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+
+        job.status = JOB_RUNNING
+        job.started_at = func.now()
+        job.heartbeat_at = func.now()
+        db.commit()
+        return job.id
+
+    @staticmethod
+    def run_job(job_id: int) -> None:
+        """
+        Executa um job reservado. Os dados vão numa sessão/transação própria; o progresso
+        é gravado (e o pedido de cancelamento é lido) numa segunda sessão, com commit a
+        cada bloco, para ficar visível em GET /datasets/jobs/{id}.
+        """
+        db = SessionLocal()
+        status_db = SessionLocal()
+        job = status_db.get(IngestionJob, job_id)
+        heartbeat = JobHeartbeat(job_id)
+        heartbeat.start()
+        try:
+            dataset = Dataset(
+                user_id=job.user_id, filename=job.filename, content_hash=job.content_hash,
+                mode=job.mode or MODE_APPEND,
+            )
+            db.add(dataset)
+            db.flush()
+            memory = new_report()
+
+            def on_progress(rows_parsed: int, rows_inserted: int, errors: List[str], bytes_processed: int):
+                status_db.refresh(job)
+                if job.cancel_requested:
+                    raise IngestionCanceled()
+                job.rows_parsed = rows_parsed
+                job.rows_inserted = rows_inserted
+                job.warnings = list(errors)
+                job.bytes_processed = bytes_processed
+                job.memory_stats = memory.to_dict() if memory is not None else None
+                job.heartbeat_at = func.now()
+                status_db.commit()
+
+            inserted, errors = IngestionService.ingest_file(
+                db, dataset, job.file_path, job.filename, on_progress,
+                content_hash=job.content_hash, mode=job.mode or MODE_APPEND, memory=memory,
+            )
+            db.commit()
+
+            job.status = JOB_COMPLETED
+            job.dataset_id = dataset.id
+            job.rows_inserted = inserted
+            job.warnings = errors
+            job.bytes_processed = job.total_bytes or job.bytes_processed
+            job.memory_stats = memory.to_dict() if memory is not None else None
+        except IngestionCanceled:
+            db.rollback()
+            job.status = JOB_CANCELED
+        except CSVValidationError as e:
+            db.rollback()
+            job.status = JOB_FAILED
+            job.error = f"Erro ao processar CSV: {e}"
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"Falha no job de ingestão {job_id}")
+            job.status = JOB_FAILED
+            job.error = f"Erro ao processar arquivo CSV: {str(e)}"
+        finally:
+            heartbeat.stop()
+            job.finished_at = func.now()
+            status_db.commit()
+            IngestionService.remove_spool_file(job.file_path)
+            db.close()
+            status_db.close()
+
+    @staticmethod
+    def request_cancel(db: Session, job: IngestionJob) -> IngestionJob:
+        """
+        Cancela um job na fila na hora; um job em execução para no próximo bloco. O status
+        muda num UPDATE condicional (status = queued), e não pelo objeto já carregado: se um
+        worker acabou de reservar o job (claim_next_job), só cancel_requested é gravado, e o
+        arquivo do spool, que o worker vai ler, fica.
+        """
+        canceled = db.query(IngestionJob).filter(
+            IngestionJob.id == job.id, IngestionJob.status == JOB_QUEUED
+        ).update(
+            {IngestionJob.status: JOB_CANCELED, IngestionJob.finished_at: func.now(), IngestionJob.cancel_requested: True},
+            synchronize_session=False,
+        )
+        if not canceled:
+            db.query(IngestionJob).filter(
+                IngestionJob.id == job.id, IngestionJob.status.notin_(FINISHED_STATUSES)
+            ).update({IngestionJob.cancel_requested: True}, synchronize_session=False)
+        db.commit()
+        if canceled:
+            IngestionService.remove_spool_file(job.file_path)
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def job_to_response(job: IngestionJob) -> IngestionJobResponse:
+        """Monta a resposta do job, estimando o tempo restante pelo avanço em bytes."""
+        eta_seconds = None
+        if (
+            job.status == JOB_RUNNING
+            and job.total_bytes
+            and job.bytes_processed
+            and job.started_at is not None
+            and job.heartbeat_at is not None
+        ):
+            elapsed = (job.heartbeat_at - job.started_at).total_seconds()
+            remaining = max(job.total_bytes - job.bytes_processed, 0)
+            eta_seconds = round(elapsed * remaining / job.bytes_processed, 1)
+
+        return IngestionJobResponse(
+            id=job.id,
+            user_id=job.user_id,
+            dataset_id=job.dataset_id,
+            filename=job.filename,
+            status=job.status,
+            mode=job.mode or MODE_APPEND,
+            cancel_requested=bool(job.cancel_requested),
+            total_bytes=job.total_bytes,
+            bytes_processed=job.bytes_processed or 0,
+            rows_parsed=job.rows_parsed or 0,
+            rows_inserted=job.rows_inserted or 0,
+            rows_unchanged=(
+                max((job.rows_parsed or 0) - (job.rows_inserted or 0), 0)
+                if job.mode == MODE_MERGE and job.status == JOB_COMPLETED else None
+            ),
+            warnings=job.warnings or [],
+            error=job.error,
+            eta_seconds=eta_seconds,
+            memory=job.memory_stats,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+        )
+
+    @staticmethod
+    def remove_spool_file(file_path: str) -> None:
+        UploadSpooler.remove(file_path)
+
+
+class IngestionWorkerPool:
+    """Threads que consomem a fila ingestion_jobs dentro do processo da API."""
+
+    def __init__(self):
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self, workers: int) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(workers):
+            thread = threading.Thread(target=self._loop, name=f"ingestion-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"{workers} worker(s) de ingestão iniciados")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """Acorda os workers ociosos (novo job enfileirado por este processo)."""
+        self._wakeup.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            job_id = None
+            db = SessionLocal()
+            try:
+                job_id = IngestionService.claim_next_job(db)
+            except Exception as e:
+                logger.error(f"Erro ao buscar jobs de ingestão: {e}")
+            finally:
+                db.close()
+
+            if job_id is None:
+                self._wakeup.wait(settings.INGESTION_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+
+            IngestionService.run_job(job_id)
+
+
+class JobHeartbeat:
+    """
+    Renova o heartbeat_at de um job em execução numa thread e sessão próprias, a cada quarto
+    de INGESTION_JOB_TIMEOUT. O heartbeat de cada bloco (on_progress) não basta: um único
+    bloco lento (upsert grande, planilha .xlsx) deixaria o job parecer abandonado e outro
+    worker o pegaria enquanto este ainda grava.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.interval = max(settings.INGESTION_JOB_TIMEOUT / 4, 1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f"ingestion-heartbeat-{job_id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                db.query(IngestionJob).filter(
+                    IngestionJob.id == self.job_id, IngestionJob.status == JOB_RUNNING
+                ).update({IngestionJob.heartbeat_at: func.now()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                logger.warning(f"Não foi possível renovar o heartbeat do job {self.job_id}: {e}")
+            finally:
+                db.close()
+
+
+ingestion_worker_pool = IngestionWorkerPool()
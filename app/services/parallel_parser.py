@@ -0,0 +1,324 @@
+import codecs
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BufferedReader, BytesIO
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.csv_service import CSVService, CSVValidationError, RowKeyBuilder
+from app.services.frame_memory import MemoryReport
+
+try:
+    import resource
+except ImportError:  # Windows: sem limite de memória por processo
+    resource = None
+
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# Codificações em que b"\n" e b'"' são sempre esses caracteres (dá para cortar o arquivo
+# nos bytes); UTF-16/32 ficam no parse sequencial
+SPLITTABLE_ENCODINGS = {"utf-8", "iso8859-1", "cp1252", "ascii"}
+
+
+class ParseTask(NamedTuple):
+    """Um pedaço de CSV (linhas completas entre start e end) e o que é preciso para normalizá-lo."""
+    path: str
+    encoding: str
+    header_end: int
+    start: int
+    end: int
+    chunk_size: int
+    col_map: Dict[str, str]
+    date_formats: Dict[str, Optional[str]]
+    dtypes: Optional[Dict[str, Any]]
+    typed_numbers: bool
+    key_columns: Optional[List[str]]
+    memory_stats: bool
+
+
+class FilePlan(NamedTuple):
+    """Pedaços de um arquivo e o estado que fica no processo pai (numeração das chaves)."""
+    path: str
+    tasks: List[ParseTask]
+    key_builder: Optional[RowKeyBuilder]
+    warnings: List[str]
+
+
+def split_csv(handle: BinaryIO, piece_bytes: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Divide o CSV em pedaços de ~piece_bytes terminados em fim de linha, numa passada de
+    leitura. Uma quebra de linha só vale como fronteira fora de campo entre aspas (número
+    par de aspas desde o início do arquivo; aspas escapadas "" não mudam a paridade).
+    Retorna (fim do cabeçalho, [(início, fim), ...] dos pedaços do corpo).
+    """
+    size = os.fstat(handle.fileno()).st_size
+    handle.seek(0)
+    boundaries: List[int] = []
+    offset = 0
+    parity = 0
+    target = 0
+    for block in iter(lambda: handle.read(SCAN_BLOCK_SIZE), b""):
+        scanned = 0
+        while True:
+            search_from = max(target - offset, scanned)
+            if search_from >= len(block):
+                break
+            newline = block.find(b"\n", search_from)
+            if newline < 0:
+                break
+            parity = (parity + block.count(b'"', scanned, newline)) % 2
+            scanned = newline + 1
+            if parity == 0:
+                boundaries.append(offset + newline + 1)
+                target = offset + newline + 1 + piece_bytes
+        parity = (parity + block.count(b'"', scanned)) % 2
+        offset += len(block)
+    handle.seek(0)
+
+    if not boundaries:
+        return size, []
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    header_end = boundaries[0]
+    return header_end, list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _limit_memory(memory_mb: int) -> None:
+    """Inicializador dos processos de parse: limita o espaço de endereçamento (RLIMIT_AS)."""
+    if memory_mb > 0 and resource is not None:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def parse_piece(task: ParseTask) -> Tuple[List[Tuple[pd.DataFrame, List[str]]], Optional[MemoryReport]]:
+    """
+    Executado nos processos do pool: parseia um pedaço (cabeçalho + linhas) em blocos de
+    chunk_size e normaliza cada bloco com o mapa de colunas e os formatos de data já
+    resolvidos no processo pai. No modo merge, "row_key" sai sem o número da ocorrência.
+    Devolve também o relatório de memória do pedaço (com memory_stats).
+    """
+    with open(task.path, "rb") as handle:
+        header = handle.read(task.header_end)
+        handle.seek(task.start)
+        body = handle.read(task.end - task.start)
+
+    key_builder = RowKeyBuilder(task.key_columns) if task.key_columns else None
+    memory = MemoryReport() if task.memory_stats else None
+    results: List[Tuple[pd.DataFrame, List[str]]] = []
+    try:
+        for chunk in pd.read_csv(
+            BytesIO(header + body), encoding=task.encoding, chunksize=task.chunk_size, dtype=task.dtypes,
+        ):
+            chunk_errors: List[str] = []
+            out = CSVService._transform_frame(
+                chunk, task.col_map, chunk_errors, task.date_formats, task.typed_numbers, memory
+            )
+            if key_builder is not None:
+                out["row_key"] = key_builder.base_keys(chunk.loc[out.index])
+            results.append((out, chunk_errors))
+    except (UnicodeDecodeError, CSVValidationError, MemoryError):
+        raise
+    except pd.errors.EmptyDataError:
+        raise CSVValidationError("O arquivo CSV está vazio ou mal formatado.")
+    except Exception as e:
+        raise CSVValidationError(f"Erro ao processar arquivo CSV: {str(e)}")
+    return results, memory
+
+
+class ParseProcessPool:
+    """
+    ProcessPoolExecutor compartilhado pelas ingestões do processo, criado na primeira
+    utilização. Usa "spawn": os workers não herdam threads nem conexões do processo da API.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.INGESTION_PARSE_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_limit_memory,
+                    initargs=(settings.INGESTION_PARSE_MEMORY_MB,),
+                )
+            return self._executor
+
+    def reset(self) -> None:
+        """Descarta um pool quebrado (processo morto pelo sistema, por ex.)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+parse_process_pool = ParseProcessPool()
+
+
+class ParallelParser:
+    """
+    Parse de CSVs grandes em vários processos: o arquivo é cortado em pedaços de linhas
+    completas (split_csv), cada pedaço é normalizado num processo do pool (parse_piece) e
+    os blocos voltam na ordem do arquivo para o BulkLoader. O mapa de colunas, os formatos
+    de data e a numeração das chaves do modo merge são decididos no processo pai, como no
+    parse sequencial (CSVService.iter_csv_chunks), então o resultado é o mesmo.
+    """
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.INGESTION_PARSE_PROCESSES > 1
+
+    @staticmethod
+    def can_split(handle: BinaryIO, encoding: str) -> bool:
+        """
+        Arquivo comum em disco, grande o bastante e numa codificação que dá para cortar nos bytes.
+        Só vale o handle do próprio arquivo (BufferedReader): membros de .gz/.zip
+        (GzipFile, ZipExtFile) também têm `name`, mas ele aponta para o arquivo compactado,
+        que split_csv e parse_piece leriam como CSV.
+        """
+        if not ParallelParser.enabled():
+            return False
+        if not isinstance(handle, BufferedReader):
+            return False
+        path = getattr(handle, "name", None)
+        if not isinstance(path, str) or not os.path.isfile(path):
+            return False
+        if codecs.lookup(encoding).name not in SPLITTABLE_ENCODINGS:
+            return False
+        return os.path.getsize(path) >= settings.INGESTION_PARSE_MIN_MB * 1024 * 1024
+
+    @staticmethod
+    def plan(path: str, encoding: str, chunk_size: int, key_columns: Optional[List[str]] = None) -> Optional[FilePlan]:
+        """
+        Resolve colunas e formatos a partir do primeiro bloco (como o parse sequencial) e
+        corta o arquivo em pedaços. None quando não compensa ou não dá para paralelizar:
+        menos de dois pedaços, ou sem coluna de produto (o fallback usa o índice global).
+        """
+        piece_bytes = max(settings.INGESTION_PARSE_PIECE_MB, 1) * 1024 * 1024
+        with open(path, "rb") as handle:
+            header_end, pieces = split_csv(handle, piece_bytes)
+            if len(pieces) < 2:
+                return None
+            try:
+                first = pd.read_csv(handle, encoding=encoding, nrows=chunk_size)
+            except pd.errors.EmptyDataError:
+                return None
+
+        col_map, date_formats = CSVService._prepare_columns(first)
+        if "product" not in col_map:
+            return None
+
+        warnings: List[str] = []
+        key_builder = None
+        if key_columns:
+            key_builder, missing = RowKeyBuilder.for_frame(first, key_columns)
+            if key_builder is None:
+                warnings.append(
+                    f"Colunas da chave de merge ausentes ({', '.join(missing)}); "
+                    "linhas adicionadas sem deduplicação."
+                )
+
+        tasks = [
+            ParseTask(
+                path=path, encoding=encoding, header_end=header_end, start=start, end=end,
+                chunk_size=chunk_size, col_map=col_map, date_formats=date_formats,
+                dtypes=CSVService.read_dtypes(first.columns.tolist()),
+                typed_numbers=CSVService.typed_numbers(first.columns.tolist()),
+                key_columns=key_builder.columns if key_builder else None,
+                memory_stats=MemoryReport.enabled(),
+            )
+            for start, end in pieces
+        ]
+        return FilePlan(path=path, tasks=tasks, key_builder=key_builder, warnings=warnings)
+
+    @staticmethod
+    def run(
+        plans: List[FilePlan], memory: Optional[MemoryReport] = None,
+    ) -> Iterator[Tuple[FilePlan, ParseTask, pd.DataFrame, List[str]]]:
+        """
+        Executa os pedaços de um ou mais arquivos (um lote) no pool e devolve os blocos na
+        ordem original. No máximo 2x INGESTION_PARSE_PROCESSES pedaços ficam em voo, o que
+        limita a memória do processo pai. Os relatórios de memória dos processos são
+        somados em `memory`.
+        """
+        executor = parse_process_pool.get()
+        queue = iter([(plan, task) for plan in plans for task in plan.tasks])
+        pending: Deque = deque()
+
+        def submit_next() -> None:
+            item = next(queue, None)
+            if item is not None:
+                pending.append((item[0], item[1], executor.submit(parse_piece, item[1])))
+
+        for _ in range(max(settings.INGESTION_PARSE_PROCESSES, 1) * 2):
+            submit_next()
+
+        warned = set()
+        try:
+            while pending:
+                plan, task, future = pending.popleft()
+                try:
+                    results, piece_memory = future.result()
+                except MemoryError:
+                    raise CSVValidationError(
+                        "Um pedaço do arquivo passou do limite de memória do processo de parse "
+                        f"({settings.INGESTION_PARSE_MEMORY_MB} MB)."
+                    )
+                except BrokenProcessPool:
+                    parse_process_pool.reset()
+                    raise CSVValidationError("Um processo de parse foi encerrado durante o processamento do arquivo.")
+                submit_next()
+                if memory is not None and piece_memory is not None:
+                    memory.merge(piece_memory)
+                    memory.sample_rss()
+
+                for out, chunk_errors in results:
+                    if plan.path not in warned:
+                        warned.add(plan.path)
+                        chunk_errors = plan.warnings + chunk_errors
+                    if plan.key_builder is not None:
+                        out["row_key"] = plan.key_builder.number(out["row_key"])
+                    yield plan, task, out, chunk_errors
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+
+    @staticmethod
+    def iter_csv_chunks(
+        handle: BinaryIO,
+        filename: str,
+        encoding: str,
+        chunk_size: int,
+        key_columns: Optional[List[str]] = None,
+        memory: Optional[MemoryReport] = None,
+    ) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+        """
+        Mesmo contrato do CSVService.iter_csv_chunks para um arquivo em disco (ver can_split).
+        O handle é avançado até o fim de cada pedaço entregue, então o progresso por tell()
+        continua valendo. Cai no parse sequencial quando o arquivo não compensa dividir.
+        """
+        plan = ParallelParser.plan(handle.name, encoding, chunk_size, key_columns)
+        if plan is None:
+            yield from CSVService.iter_csv_chunks(
+                handle, filename, encoding=encoding, chunk_size=chunk_size, key_columns=key_columns,
+                memory=memory,
+            )
+            return
+
+        for _, task, out, chunk_errors in ParallelParser.run([plan], memory):
+            handle.seek(task.end)
+            yield out, chunk_errors
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from app.core.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele o cache fica desativado
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato do frame cacheado: incrementar sempre que o parser, a normalização
+# (CSVService) ou CACHED_COLUMNS mudarem, para que frames antigos deixem de ser lidos
+PARSED_CACHE_VERSION = 2
+
+# Colunas do frame normalizado (saída de CSVService.iter_csv_chunks) guardadas no cache
+CACHED_COLUMNS = [
+    "date", "time", "product", "revenue", "cost", "commission", "profit",
+    "status", "category", "sub_id1", "mes_ano", "raw_data", "row_key",
+]
+
+
+def _arrow_schema():
+    # Schema fixo: um bloco com "time" todo nulo não pode mudar o tipo da coluna no arquivo
+    return pa.schema([
+        ("date", pa.date32()),
+        ("time", pa.time64("us")),
+        ("product", pa.string()),
+        ("revenue", pa.float64()),
+        ("cost", pa.float64()),
+        ("commission", pa.float64()),
+        ("profit", pa.float64()),
+        ("status", pa.string()),
+        ("category", pa.string()),
+        ("sub_id1", pa.string()),
+        ("mes_ano", pa.string()),
+        ("raw_data", pa.string()),
+        ("row_key", pa.string()),  # só no modo merge
+    ])
+
+
+class ParsedFrameWriter:
+    """Grava os blocos de um upload num Parquet temporário, publicado só no commit()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._schema = _arrow_schema()
+        self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if "row_key" not in chunk.columns:
+            chunk = chunk.assign(row_key=None)
+        table = pa.Table.from_pandas(chunk[CACHED_COLUMNS], schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def commit(self) -> None:
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self) -> None:
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+
+class ParsedFrameCache:
+    """
+    Cache em disco do frame já validado e normalizado, por SHA-256 do arquivo, modo de
+    ingestão e PARSED_CACHE_VERSION. Permite recarregar um dataset
+    (POST /datasets/{id}/refresh) sem parsear o CSV de novo.
+    """
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.PARSED_CACHE_DIR) and pq is not None
+
+    @staticmethod
+    def path_for(content_hash: str, mode: str) -> str:
+        """
+        O mesmo arquivo gera frames diferentes por modo (só o merge traz row_key, que também
+        depende de MERGE_KEY_COLUMNS), então cada modo tem seu próprio arquivo.
+        """
+        variant = mode
+        if mode != "append":
+            key_columns = "\x1f".join(settings.MERGE_KEY_COLUMNS).encode("utf-8")
+            variant = f"{mode}-{hashlib.sha256(key_columns).hexdigest()[:12]}"
+        return os.path.join(
+            settings.PARSED_CACHE_DIR, f"{content_hash}.{variant}.v{PARSED_CACHE_VERSION}.parquet"
+        )
+
+    @staticmethod
+    def exists(content_hash: Optional[str], mode: str) -> bool:
+        return bool(content_hash) and ParsedFrameCache.enabled() and os.path.exists(
+            ParsedFrameCache.path_for(content_hash, mode)
+        )
+
+    @staticmethod
+    def open_writer(content_hash: Optional[str], mode: str) -> Optional[ParsedFrameWriter]:
+        """Writer para um digest/modo ainda não cacheado; None se o cache estiver desativado ou já existir."""
+        if not content_hash or not ParsedFrameCache.enabled() or ParsedFrameCache.exists(content_hash, mode):
+            return None
+        try:
+            os.makedirs(settings.PARSED_CACHE_DIR, exist_ok=True)
+            return ParsedFrameWriter(ParsedFrameCache.path_for(content_hash, mode))
+        except Exception as e:
+            logger.warning(f"Não foi possível abrir o cache do arquivo {content_hash}: {e}")
+            return None
+
+    @staticmethod
+    def iter_chunks(content_hash: str, mode: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Lê o frame cacheado em blocos de até chunk_size linhas."""
+        parquet_file = pq.ParquetFile(ParsedFrameCache.path_for(content_hash, mode))
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
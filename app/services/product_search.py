@@ -0,0 +1,78 @@
+import logging
+from typing import List
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.models.user_product import UserProduct
+from app.schemas.dashboard import ProductSuggestion
+
+logger = logging.getLogger(__name__)
+
+# Índices GIN (pg_trgm) de product: atendem o ILIKE '%termo%' do dashboard, que lê o
+# rollup, e o autocomplete (user_products). dataset_rows fica sem: o índice seria mantido a
+# cada COPY e só serviria às leituras linha a linha (filtros por valor, analytics)
+TRIGRAM_INDEXES = {
+    "idx_rollup_product_trgm": "dataset_daily_rollups",
+    "idx_user_products_product_trgm": "user_products",
+}
+# Criados por versões anteriores
+DROPPED_INDEXES = ["idx_dataset_rows_product_trgm"]
+
+# Maior número de sugestões por consulta
+MAX_SUGGESTIONS = 50
+
+
+class ProductSearch:
+    """
+    Busca de produtos: índices trigram para o filtro por produto (busca parcial) e o
+    autocomplete, que lê o dicionário de produtos do usuário (UserProduct) em vez das
+    linhas de dataset_rows.
+    """
+
+    @staticmethod
+    def install(conn: Connection) -> bool:
+        """
+        Cria a extensão pg_trgm e os índices trigram. Sem permissão para a extensão, segue
+        sem eles (o ILIKE continua correto, só sem índice) e retorna False.
+        """
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except DBAPIError as e:
+            logger.warning(f"pg_trgm indisponível, busca por produto sem índice trigram: {e.orig}")
+            return False
+
+        for name, table in TRIGRAM_INDEXES.items():
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (product gin_trgm_ops)"))
+        return True
+
+    @staticmethod
+    def suggest(db: Session, user_id: int, query: str, limit: int = 10) -> List[ProductSuggestion]:
+        """
+        Produtos do usuário que contêm `query` (sem diferenciar maiúsculas; % e _ são
+        literais): primeiro os que começam pelo termo, depois os com mais linhas.
+        """
+        term = query.strip()
+        if not term:
+            return []
+
+        results = db.execute(
+            select(
+                UserProduct.product,
+                UserProduct.row_count
+            ).where(
+                UserProduct.user_id == user_id,
+                UserProduct.product.icontains(term, autoescape=True)
+            ).order_by(
+                UserProduct.product.istartswith(term, autoescape=True).desc(),
+                UserProduct.row_count.desc(),
+                UserProduct.product
+            ).limit(min(limit, MAX_SUGGESTIONS))
+        ).all()
+
+        return [ProductSuggestion(product=result.product, row_count=result.row_count) for result in results]
@@ -0,0 +1,224 @@
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple
+
+from sqlalchemy import Date, and_, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.daily_rollup import DailyRollup
+from app.models.dataset_row import DatasetRow
+from app.schemas.analytics import (
+    AggregateQuery,
+    AggregateQueryPlan,
+    AggregateQueryResponse,
+    AnalyticsFilters,
+    DimensionType,
+    MetricType,
+    TimeSeriesPeriod,
+)
+from app.services.analytics_service import METRIC_EXPRESSIONS, METRIC_LABELS, PERIOD_UNITS
+
+# Limites do allow-list de consultas
+MAX_DIMENSIONS = 3
+MAX_ROWS = 5000
+
+
+class QueryPlanError(ValueError):
+    """Consulta fora do allow-list (dimensões, métricas ou limites)."""
+    pass
+
+
+class AggregateSource(NamedTuple):
+    """
+    Tabela que pode responder a uma consulta agregada: o que ela expõe como dimensão e
+    métrica (já agregada) e se aceita os filtros por linha (min_value, max_value, platform).
+    """
+    name: str
+    model: Any
+    dimensions: Dict[DimensionType, Any]
+    metrics: Dict[MetricType, Any]
+    row_filters: bool
+
+
+# Rollup diário (dataset_daily_rollups): sem platform nem valores por linha. As métricas
+# vêm de revenue/commission/profit, que é o que gross/commission/net valem para as linhas
+# gravadas pela ingestão, e quantity é a contagem de linhas (a ingestão grava quantity = 1).
+ROLLUP_SOURCE = AggregateSource(
+    name="rollup",
+    model=DailyRollup,
+    dimensions={
+        DimensionType.PRODUCT: DailyRollup.product,
+        DimensionType.DATE: DailyRollup.date,
+        DimensionType.STATUS: func.nullif(DailyRollup.status, ""),
+        DimensionType.CATEGORY: func.nullif(DailyRollup.category, ""),
+        DimensionType.SUB_ID1: func.nullif(DailyRollup.sub_id1, ""),
+    },
+    metrics={
+        MetricType.GROSS: func.sum(DailyRollup.revenue),
+        MetricType.COMMISSION: func.sum(DailyRollup.commission),
+        MetricType.NET: func.sum(DailyRollup.profit),
+        MetricType.QUANTITY: func.sum(DailyRollup.row_count),
+    },
+    row_filters=False,
+)
+
+RAW_SOURCE = AggregateSource(
+    name="dataset_rows",
+    model=DatasetRow,
+    dimensions={
+        DimensionType.PRODUCT: DatasetRow.product,
+        DimensionType.PLATFORM: func.nullif(DatasetRow.platform, ""),
+        DimensionType.DATE: DatasetRow.date,
+        DimensionType.STATUS: func.nullif(DatasetRow.status, ""),
+        DimensionType.CATEGORY: func.nullif(DatasetRow.category, ""),
+        DimensionType.SUB_ID1: func.nullif(DatasetRow.sub_id1, ""),
+    },
+    metrics={metric: func.sum(expression) for metric, expression in METRIC_EXPRESSIONS.items()},
+    row_filters=True,
+)
+
+# Ordem de preferência: a menor tabela que cobre a consulta
+SOURCES = [ROLLUP_SOURCE, RAW_SOURCE]
+
+
+class QueryPlan(NamedTuple):
+    source: AggregateSource
+    reason: str
+    statement: Any
+    dimensions: List[DimensionType]
+    metrics: List[MetricType]
+
+
+def _needs_row_filters(filters: AnalyticsFilters) -> bool:
+    return filters.platform is not None or filters.min_value is not None or filters.max_value is not None
+
+
+def _json_value(key: str, value: Any) -> Any:
+    if key == METRIC_LABELS[MetricType.QUANTITY] and value is not None:
+        return int(value)  # sum(bigint) do rollup volta como numeric
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class QueryPlanner:
+    """
+    Planejador de consultas agregadas: valida a consulta (dimensões x métricas x filtros)
+    contra o allow-list, escolhe a tabela (o rollup diário quando ele cobre tudo;
+    dataset_rows quando precisa) e monta um único SELECT ... GROUP BY.
+    """
+
+    @staticmethod
+    def validate(query: AggregateQuery) -> None:
+        if not query.metrics:
+            raise QueryPlanError("Informe ao menos uma métrica")
+        if len(query.dimensions) > MAX_DIMENSIONS:
+            raise QueryPlanError(f"No máximo {MAX_DIMENSIONS} dimensões por consulta")
+        if len(set(query.dimensions)) != len(query.dimensions) or len(set(query.metrics)) != len(query.metrics):
+            raise QueryPlanError("Dimensões e métricas não podem se repetir")
+        if query.order_by is not None and query.order_by not in query.metrics:
+            raise QueryPlanError("order_by precisa ser uma das métricas pedidas")
+        if query.limit is not None and query.limit > MAX_ROWS:
+            raise QueryPlanError(f"limit máximo: {MAX_ROWS}")
+
+    @staticmethod
+    def choose_source(query: AggregateQuery):
+        """(tabela, motivo) para a consulta; a primeira de SOURCES que cobre tudo."""
+        missing_reasons = []
+        for source in SOURCES:
+            if source is ROLLUP_SOURCE and not settings.DASHBOARD_USE_ROLLUP:
+                missing_reasons.append("rollup desativado (DASHBOARD_USE_ROLLUP)")
+                continue
+            uncovered = [dimension.value for dimension in query.dimensions if dimension not in source.dimensions]
+            uncovered += [metric.value for metric in query.metrics if metric not in source.metrics]
+            if uncovered:
+                missing_reasons.append(f"{source.name} não tem {', '.join(uncovered)}")
+                continue
+            if _needs_row_filters(query.filters) and not source.row_filters:
+                missing_reasons.append(f"{source.name} não aceita filtros por linha (platform, min_value, max_value)")
+                continue
+            reason = "; ".join(missing_reasons) if missing_reasons else "cobre dimensões, métricas e filtros"
+            return source, reason
+        raise QueryPlanError("Nenhuma tabela atende à consulta: " + "; ".join(missing_reasons))
+
+    @staticmethod
+    def build_filters(source: AggregateSource, user_id: int, filters: AnalyticsFilters) -> List:
+        model = source.model
+        conditions = [model.user_id == user_id]
+
+        if filters.start_date:
+            conditions.append(model.date >= filters.start_date)
+
+        if filters.end_date:
+            conditions.append(model.date <= filters.end_date)
+
+        if filters.product_name:
+            conditions.append(model.product.ilike(f"%{filters.product_name}%"))
+
+        if filters.platform:
+            conditions.append(model.platform == filters.platform)
+
+        if filters.min_value is not None:
+            conditions.append(METRIC_EXPRESSIONS[MetricType.GROSS] >= filters.min_value)
+
+        if filters.max_value is not None:
+            conditions.append(METRIC_EXPRESSIONS[MetricType.GROSS] <= filters.max_value)
+
+        return conditions
+
+    @staticmethod
+    def plan(user_id: int, query: AggregateQuery) -> QueryPlan:
+        QueryPlanner.validate(query)
+        source, reason = QueryPlanner.choose_source(query)
+
+        dimensions = []
+        for dimension in query.dimensions:
+            column = source.dimensions[dimension]
+            if dimension == DimensionType.DATE and query.period != TimeSeriesPeriod.DAILY:
+                column = cast(func.date_trunc(PERIOD_UNITS[query.period], column), Date)
+            dimensions.append(column.label(dimension.value))
+        metrics = {metric: source.metrics[metric].label(METRIC_LABELS[metric]) for metric in query.metrics}
+
+        statement = select(*dimensions, *metrics.values()).where(
+            and_(*QueryPlanner.build_filters(source, user_id, query.filters))
+        )
+        if dimensions:
+            statement = statement.group_by(*dimensions)
+        if query.order_by is not None:
+            statement = statement.order_by(metrics[query.order_by].desc().nullslast(), *dimensions)
+        elif dimensions:
+            statement = statement.order_by(*dimensions)
+        statement = statement.limit(query.limit or MAX_ROWS)
+
+        return QueryPlan(source, reason, statement, list(query.dimensions), list(query.metrics))
+
+    @staticmethod
+    def explain(db: Session, plan: QueryPlan) -> AggregateQueryPlan:
+        """SQL (com os valores) e EXPLAIN do PostgreSQL para o plano."""
+        compiled = plan.statement.compile(dialect=db.get_bind().dialect)
+        lines = db.connection().exec_driver_sql(f"EXPLAIN {compiled.string}", compiled.params).scalars().all()
+        try:
+            sql = str(plan.statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+            sql = sql.replace("%%", "%")  # escape do paramstyle do psycopg2
+        except Exception:  # tipo sem representação literal: SQL com os parâmetros nomeados
+            sql = f"{compiled.string} -- {compiled.params}"
+        return AggregateQueryPlan(source=plan.source.name, reason=plan.reason, sql=sql, explain=list(lines))
+
+    @staticmethod
+    def execute(db: Session, user_id: int, query: AggregateQuery) -> AggregateQueryResponse:
+        """Planeja e executa a consulta; com query.explain (e QUERY_DEBUG), inclui o plano."""
+        if query.explain and not settings.QUERY_DEBUG:
+            raise QueryPlanError("explain só está disponível com QUERY_DEBUG ativado")
+        plan = QueryPlanner.plan(user_id, query)
+        results = db.execute(plan.statement).mappings().all()
+
+        return AggregateQueryResponse(
+            source=plan.source.name,
+            dimensions=[dimension.value for dimension in plan.dimensions],
+            metrics=[METRIC_LABELS[metric] for metric in plan.metrics],
+            rows=[{key: _json_value(key, value) for key, value in result.items()} for result in results],
+            plan=QueryPlanner.explain(db, plan) if query.explain else None,
+        )
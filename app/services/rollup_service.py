@@ -0,0 +1,247 @@
+import logging
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "dataset_daily_rollups"
+
+# Primeira chave do advisory lock por usuário (pg_advisory_xact_lock(USER_LOCK_NAMESPACE, user_id))
+USER_LOCK_NAMESPACE = 0x726F6C6C
+
+# Chave do rollup; dimensões ausentes viram "" (ver DailyRollup)
+ROLLUP_KEY_COLUMNS = ["user_id", "date", "product", "sub_id1", "status", "category"]
+ROLLUP_METRIC_COLUMNS = ["revenue", "cost", "commission", "profit"]
+
+_KEY_EXPRS = [
+    "user_id", "date", "product",
+    "COALESCE(sub_id1, '') AS sub_id1", "COALESCE(status, '') AS status", "COALESCE(category, '') AS category",
+]
+
+
+class RollupTable(NamedTuple):
+    """Tabela derivada de dataset_rows: colunas da chave, expressões sobre a origem e métricas somadas."""
+    name: str
+    key_columns: List[str]
+    key_exprs: List[str]
+    metric_columns: List[str]
+
+
+DAILY_ROLLUP = RollupTable(ROLLUP_TABLE, ROLLUP_KEY_COLUMNS, _KEY_EXPRS, ROLLUP_METRIC_COLUMNS)
+# Dicionário de produtos por usuário (UserProduct): só a contagem de linhas
+USER_PRODUCTS = RollupTable("user_products", ["user_id", "product"], ["user_id", "product"], [])
+ROLLUP_TABLES = [DAILY_ROLLUP, USER_PRODUCTS]
+
+
+def _aggregate_sql(table: RollupTable, source: str, where: str = "") -> str:
+    """Totais de `source` (dataset_rows ou tabela de transição do trigger) por chave de `table`."""
+    metrics = [f"COALESCE(sum({column}), 0) AS {column}" for column in table.metric_columns]
+    group = ", ".join(str(position) for position in range(1, len(table.key_columns) + 1))
+    return (
+        f"SELECT {', '.join(table.key_exprs + metrics)}, count(*) AS row_count "
+        f"FROM {source} {where} GROUP BY {group} ORDER BY {group}"
+    )
+
+
+def _key_match(table: RollupTable) -> str:
+    return " AND ".join(f"r.{column} = d.{column}" for column in table.key_columns)
+
+
+def _all_columns(table: RollupTable) -> str:
+    return ", ".join(table.key_columns + table.metric_columns + ["row_count"])
+
+
+def _add_sql(table: RollupTable, source: str) -> str:
+    """
+    Soma os totais de `source` em `table`. As chaves são gravadas em ordem, o que evita
+    deadlocks dentro de um comando; entre transações do mesmo usuário, ver RollupService.lock_user.
+    """
+    updates = ", ".join(
+        f"{column} = r.{column} + EXCLUDED.{column}" for column in table.metric_columns + ["row_count"]
+    )
+    return (
+        f"INSERT INTO {table.name} AS r ({_all_columns(table)}) {_aggregate_sql(table, source)} "
+        f"ON CONFLICT ({', '.join(table.key_columns)}) DO UPDATE SET {updates}"
+    )
+
+
+def _subtract_sql(table: RollupTable, source: str) -> str:
+    """
+    Desconta os totais de `source`. É um UPDATE (e não upsert): chave sem linha no rollup
+    não tem o que descontar, ex.: exclusão do usuário, cujo rollup sai junto por cascade.
+    """
+    updates = ", ".join(
+        f"{column} = r.{column} - d.{column}" for column in table.metric_columns + ["row_count"]
+    )
+    return (
+        f"UPDATE {table.name} AS r SET {updates} "
+        f"FROM ({_aggregate_sql(table, source)}) AS d WHERE {_key_match(table)}"
+    )
+
+
+def _prune_sql(table: RollupTable, source: str) -> str:
+    """Remove as chaves que ficaram sem linhas."""
+    return (
+        f"DELETE FROM {table.name} AS r USING ({_aggregate_sql(table, source)}) AS d "
+        f"WHERE {_key_match(table)} AND r.row_count <= 0"
+    )
+
+
+def _changed_rows(side: str) -> str:
+    """
+    Linhas do UPDATE (lado old/new) cuja chave ou métrica mudou; as demais não alteram o
+    rollup, ex.: o rateio de anúncios, que só regrava raw_data. A chave do rollup diário
+    contém a das demais tabelas.
+    """
+    columns = ["date", "product", "sub_id1", "status", "category"] + ROLLUP_METRIC_COLUMNS
+    old = ", ".join(f"o.{column}" for column in ["user_id"] + columns)
+    new = ", ".join(f"n.{column}" for column in ["user_id"] + columns)
+    return (
+        f"(SELECT {side}.* FROM old_rows AS o JOIN new_rows AS n ON n.id = o.id "
+        f"WHERE ({old}) IS DISTINCT FROM ({new})) AS changed"
+    )
+
+
+def _unless_changed() -> str:
+    """
+    Sai do trigger de UPDATE se nenhuma linha mudou de chave ou métrica. O PostgreSQL não
+    aceita AFTER UPDATE OF <colunas> com tabelas de transição, e o rateio de anúncios
+    (bulk_update_mappings) dispara um UPDATE por linha, só em raw_data.
+    """
+    return f"IF NOT EXISTS (SELECT 1 FROM {_changed_rows('o')}) THEN\n        RETURN NULL;\n    END IF;"
+
+
+def _statements(statements: Sequence[str]) -> str:
+    return "\n    ".join(f"{statement};" for statement in statements)
+
+
+def _trigger_function(name: str, body: str) -> str:
+    return f"""
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    {body}
+    RETURN NULL;
+END
+$$"""
+
+
+# Triggers por comando (FOR EACH STATEMENT) com tabelas de transição: um COPY + INSERT do
+# BulkLoader, o upsert do modo merge, o INSERT via ORM, o rateio de anúncios e a
+# exclusão de datasets/usuários (inclusive por cascade) atualizam cada tabela de
+# ROLLUP_TABLES com um único agregado das linhas afetadas, na mesma transação.
+_TRIGGERS = {
+    "dataset_rows_rollup_insert": (
+        "INSERT", "REFERENCING NEW TABLE AS new_rows",
+        _statements([_add_sql(table, "new_rows") for table in ROLLUP_TABLES]),
+    ),
+    "dataset_rows_rollup_update": (
+        "UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        _unless_changed() + "\n    " + _statements([
+            statement
+            for table in ROLLUP_TABLES
+            for statement in (
+                _subtract_sql(table, _changed_rows("o")),
+                _add_sql(table, _changed_rows("n")),
+                _prune_sql(table, _changed_rows("o")),
+            )
+        ]),
+    ),
+    "dataset_rows_rollup_delete": (
+        "DELETE", "REFERENCING OLD TABLE AS old_rows",
+        _statements([
+            statement
+            for table in ROLLUP_TABLES
+            for statement in (_subtract_sql(table, "old_rows"), _prune_sql(table, "old_rows"))
+        ]),
+    ),
+}
+
+
+class RollupService:
+    """
+    Rollup diário de dataset_rows (tabela dataset_daily_rollups), lido pelo DashboardService
+    no lugar das linhas brutas quando os filtros permitem, e o dicionário de produtos por
+    usuário (user_products). A manutenção é incremental, por triggers no banco: nenhum
+    caminho de escrita em dataset_rows precisa lembrar de atualizá-los.
+    """
+
+    @staticmethod
+    def install(conn: Connection) -> None:
+        """
+        Cria/atualiza as funções dos triggers e, se os triggers ainda não existem, cria-os e
+        preenche as tabelas a partir de dataset_rows; com os triggers já instalados, preenche
+        só as tabelas novas (vazias com dataset_rows não vazia). O LOCK impede escritas entre
+        o preenchimento e a criação dos triggers (e serializa processos subindo juntos).
+        """
+        for name, (_, _, body) in _TRIGGERS.items():
+            conn.execute(text(_trigger_function(name, body)))
+
+        installed = conn.execute(
+            text("SELECT count(*) FROM pg_trigger WHERE tgrelid = 'dataset_rows'::regclass AND tgname = ANY(:names)"),
+            {"names": list(_TRIGGERS)},
+        ).scalar()
+        if installed == len(_TRIGGERS):
+            empty = [table for table in ROLLUP_TABLES if RollupService._needs_fill(conn, table)]
+            if not empty:
+                return
+            rows = RollupService.rebuild(conn, tables=empty)
+            logger.info(f"{', '.join(table.name for table in empty)} preenchida(s) a partir de {rows} linhas de dataset_rows")
+            return
+
+        conn.execute(text("LOCK TABLE dataset_rows IN SHARE ROW EXCLUSIVE MODE"))
+        for name, (event, referencing, _) in _TRIGGERS.items():
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name} ON dataset_rows"))
+            conn.execute(text(
+                f"CREATE TRIGGER {name} AFTER {event} ON dataset_rows {referencing} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION {name}()"
+            ))
+        rows = RollupService.rebuild(conn)
+        logger.info(f"Rollup diário criado a partir de {rows} linhas de dataset_rows")
+
+    @staticmethod
+    def lock_user(db: Union[Session, Connection], user_id: int) -> None:
+        """
+        Serializa, até o fim da transação, as escritas em dataset_rows de um usuário. Os
+        triggers atualizam as mesmas chaves do rollup e de user_products (usuário, data,
+        produto...) a cada bloco, e os locks dessas linhas duram a ingestão inteira: duas
+        ingestões do mesmo usuário em paralelo se bloqueariam em ordens cruzadas (deadlock).
+        Usuários diferentes não disputam linhas e seguem em paralelo.
+        """
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :user_id)"),
+            {"namespace": USER_LOCK_NAMESPACE, "user_id": user_id},
+        )
+
+    @staticmethod
+    def _needs_fill(conn: Connection, table: RollupTable) -> bool:
+        return conn.execute(text(
+            f"SELECT NOT EXISTS (SELECT 1 FROM {table.name}) AND EXISTS (SELECT 1 FROM dataset_rows)"
+        )).scalar()
+
+    @staticmethod
+    def rebuild(
+        conn: Connection,
+        user_id: Optional[int] = None,
+        tables: Sequence[RollupTable] = ROLLUP_TABLES
+    ) -> int:
+        """
+        Recalcula as tabelas (de um usuário ou de todos) direto de dataset_rows. Retorna as
+        linhas lidas. O LOCK bloqueia escritas em dataset_rows até o fim da transação (leituras
+        seguem): sem ele, linhas gravadas durante o recálculo, já somadas pelos triggers,
+        seriam apagadas ou contadas duas vezes. Também serializa dois recálculos simultâneos.
+        """
+        conn.execute(text("LOCK TABLE dataset_rows IN SHARE ROW EXCLUSIVE MODE"))
+        where = "WHERE user_id = :user_id" if user_id is not None else ""
+        params = {"user_id": user_id} if user_id is not None else {}
+        for table in tables:
+            conn.execute(text(f"DELETE FROM {table.name} {where}"), params)
+            conn.execute(
+                text(f"INSERT INTO {table.name} ({_all_columns(table)}) {_aggregate_sql(table, 'dataset_rows', where)}"),
+                params,
+            )
+        return conn.execute(
+            text(f"SELECT COALESCE(sum(row_count), 0) FROM {tables[0].name} {where}"), params
+        ).scalar()
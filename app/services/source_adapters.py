@@ -0,0 +1,58 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class SourceAdapter(NamedTuple):
+    """
+    Layout conhecido de exportação (marketplace/template). Quando o cabeçalho do arquivo
+    contém todas as colunas de `required`, o mapa de colunas, os formatos de data e os
+    tipos de leitura vêm daqui, em vez da busca por ALIASES e da inferência do pandas.
+    Os nomes são comparados normalizados (normalize_name: sem acentos, maiúsculas e pontuação).
+    """
+    name: str
+    required: Tuple[str, ...]        # colunas que identificam o layout
+    columns: Dict[str, str]          # coluna alvo (date, product, revenue...) -> coluna do arquivo
+    date_formats: Dict[str, str]     # formato de "date"/"time"; conferido numa amostra antes de usar
+    text_columns: Tuple[str, ...]    # lidas como texto (dtype object), sem inferência de tipo
+    typed_numbers: bool              # valores já numéricos (ex.: 19.99) ficam como estão, sem limpeza de texto
+
+
+# Relatório de comissões de afiliados da Shopee (exportação completa, 47 colunas)
+SHOPEE_AFFILIATE = SourceAdapter(
+    name="shopee_affiliate",
+    required=(
+        "ID do pedido", "Status do Pedido", "Horário do pedido", "Nome do Item",
+        "Valor de Compra(R$)", "Comissão líquida do afiliado(R$)",
+    ),
+    columns={
+        "date": "Horário do pedido",
+        "time": "Horário do pedido",
+        "product": "Nome do Item",
+        "revenue": "Valor de Compra(R$)",
+        "commission": "Comissão líquida do afiliado(R$)",
+        "status": "Status do Pedido",
+        "category": "Categoria Global L1",
+        "sub_id1": "Sub_id1",
+    },
+    date_formats={"date": "%Y-%m-%d %H:%M:%S", "time": "%Y-%m-%d %H:%M:%S"},
+    text_columns=(
+        "ID do pedido", "Status do Pedido", "Horário do pedido", "Tempo de Conclusão", "Tempo dos Cliques",
+        "Nome da loja", "Tipo da Loja", "Nome do Item", "Tipo de Produto",
+        "Categoria Global L1", "Categoria Global L2", "Categoria Global L3", "Offer Type",
+        "Status do item do afiliado", "Notas do item", "Tipo de atribuição", "Status do Comprador", "Canal",
+    ),
+    typed_numbers=True,
+)
+
+# Template do próprio DashAds (ver API_EXAMPLES.md): date,product,revenue,cost,commission
+DASHADS_TEMPLATE = SourceAdapter(
+    name="dashads_template",
+    required=("date", "product", "revenue", "cost", "commission"),
+    columns={"date": "date", "product": "product", "revenue": "revenue", "cost": "cost", "commission": "commission"},
+    date_formats={"date": "%Y-%m-%d"},
+    text_columns=("product",),
+    typed_numbers=True,
+)
+
+# Ordem de tentativa: o primeiro layout cujo `required` casar é usado; sem nenhum,
+# vale a resolução genérica por ALIASES
+SOURCE_ADAPTERS: List[SourceAdapter] = [SHOPEE_AFFILIATE, DASHADS_TEMPLATE]
@@ -0,0 +1,111 @@
+import gzip
+import os
+import struct
+import zipfile
+import zlib
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Tuple
+
+from app.services.csv_service import CSVValidationError
+
+KIND_CSV = "csv"
+KIND_GZIP = "gzip"
+KIND_ZIP = "zip"
+KIND_XLSX = "xlsx"
+
+# Sufixo do nome do arquivo -> formato do upload (o mais longo primeiro)
+UPLOAD_SUFFIXES = [(".csv.gz", KIND_GZIP), (".zip", KIND_ZIP), (".csv", KIND_CSV), (".xlsx", KIND_XLSX)]
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Falhas de descompressão que indicam arquivo truncado/corrompido (não um erro do servidor)
+DECOMPRESSION_ERRORS = (EOFError, zlib.error, gzip.BadGzipFile, zipfile.BadZipFile)
+
+
+class UploadArchive:
+    """
+    Formatos de upload: .csv, .xlsx e os compactados .csv.gz e .zip (um ou mais CSVs).
+    Os membros compactados são lidos como stream (GzipFile/ZipExtFile) direto pelo parser,
+    sem extrair o arquivo em disco nem em memória. Ambos aceitam seek, que o
+    detect_encoding usa para voltar ao início.
+    """
+
+    @staticmethod
+    def kind(filename: str) -> str:
+        lower = (filename or "").lower()
+        for suffix, kind in UPLOAD_SUFFIXES:
+            if lower.endswith(suffix):
+                return kind
+        return ""
+
+    @staticmethod
+    def is_supported(filename: str) -> bool:
+        return UploadArchive.kind(filename) != ""
+
+    @staticmethod
+    def _zip_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+        """CSVs dentro do zip, na ordem do arquivo (ignora pastas e metadados do macOS)."""
+        return [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and not os.path.basename(info.filename).startswith(".")
+            and info.filename.lower().endswith(".csv")
+        ]
+
+    @staticmethod
+    def uncompressed_size(file_path: str, filename: str) -> int:
+        """
+        Tamanho descompactado (base do progresso em bytes dos jobs). Para gzip vem do
+        trailer ISIZE (módulo 4 GiB, então é só uma estimativa em arquivos enormes).
+        """
+        kind = UploadArchive.kind(filename)
+        try:
+            if kind == KIND_ZIP:
+                with zipfile.ZipFile(file_path) as archive:
+                    return sum(info.file_size for info in UploadArchive._zip_members(archive))
+            if kind == KIND_GZIP:
+                with open(file_path, "rb") as handle:
+                    handle.seek(-4, os.SEEK_END)
+                    return struct.unpack("<I", handle.read(4))[0]
+        except (OSError, zipfile.BadZipFile, struct.error):
+            pass
+        return os.path.getsize(file_path)
+
+    @staticmethod
+    @contextmanager
+    def open_members(file_path: str, filename: str) -> Iterator[Iterator[Tuple[str, BinaryIO]]]:
+        """
+        Abre o upload salvo em `file_path` e entrega um iterador de (nome, arquivo binário)
+        com os CSVs a ingerir; cada membro só é aberto quando o iterador chega nele.
+        Um .csv ou .xlsx simples é um único membro. Levanta CSVValidationError para zip sem
+        CSV ou arquivo que não é do formato indicado pelo nome.
+        """
+        kind = UploadArchive.kind(filename)
+        if kind == KIND_ZIP:
+            try:
+                archive = zipfile.ZipFile(file_path)
+            except zipfile.BadZipFile:
+                raise CSVValidationError("Arquivo .zip inválido ou corrompido.")
+            with archive:
+                members = UploadArchive._zip_members(archive)
+                if not members:
+                    raise CSVValidationError("O arquivo .zip não contém nenhum CSV.")
+
+                def iter_zip() -> Iterator[Tuple[str, BinaryIO]]:
+                    for info in members:
+                        with archive.open(info) as handle:
+                            yield info.filename, handle
+
+                yield iter_zip()
+            return
+
+        with open(file_path, "rb") as raw:
+            if kind != KIND_GZIP:
+                yield iter([(filename, raw)])
+                return
+            if raw.read(2) != GZIP_MAGIC:
+                raise CSVValidationError("Arquivo .csv.gz inválido: não está no formato gzip.")
+            raw.seek(0)
+            with gzip.GzipFile(fileobj=raw, mode="rb") as handle:
+                yield iter([(filename[:-len(".gz")], handle)])
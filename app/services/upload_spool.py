@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import os
+import uuid
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_READ_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """O arquivo enviado passou de MAX_UPLOAD_MB."""
+
+
+class UploadSpooler:
+    """
+    Grava o corpo de um UploadFile no spool local (INGESTION_SPOOL_DIR) em blocos, calculando
+    o SHA-256 no caminho e abortando assim que o tamanho passa do limite. Nada do arquivo fica
+    inteiro em memória: o parser recebe depois um handle do arquivo em disco.
+    """
+
+    @staticmethod
+    def max_bytes() -> Optional[int]:
+        """Limite em bytes (None quando MAX_UPLOAD_MB <= 0)."""
+        if settings.MAX_UPLOAD_MB <= 0:
+            return None
+        return settings.MAX_UPLOAD_MB * 1024 * 1024
+
+    @staticmethod
+    def too_large_message() -> str:
+        return f"Arquivo maior que o limite de {settings.MAX_UPLOAD_MB} MB"
+
+    @staticmethod
+    def spool_path(filename: str) -> str:
+        """Caminho único no spool local para um arquivo enviado."""
+        os.makedirs(settings.INGESTION_SPOOL_DIR, exist_ok=True)
+        suffix = os.path.splitext(filename)[1] or ".csv"
+        return os.path.join(settings.INGESTION_SPOOL_DIR, f"{uuid.uuid4().hex}{suffix}")
+
+    @staticmethod
+    async def spool(file: UploadFile) -> Tuple[str, str, int]:
+        """
+        Copia o upload para o spool. Retorna (caminho, sha256, tamanho em bytes).
+        Levanta UploadTooLargeError (e remove o arquivo parcial) se passar do limite.
+        """
+        limit = UploadSpooler.max_bytes()
+        file_path = UploadSpooler.spool_path(file.filename)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(file_path, "wb") as spool:
+                while True:
+                    block = await file.read(UPLOAD_READ_BLOCK_SIZE)
+                    if not block:
+                        break
+                    size += len(block)
+                    if limit is not None and size > limit:
+                        raise UploadTooLargeError(UploadSpooler.too_large_message())
+                    digest.update(block)
+                    spool.write(block)
+        except BaseException:
+            UploadSpooler.remove(file_path)
+            raise
+        return file_path, digest.hexdigest(), size
+
+    @staticmethod
+    def remove(file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Não foi possível remover o arquivo {file_path}: {e}")
@@ -0,0 +1,111 @@
+from datetime import date, datetime, time
+from typing import BinaryIO, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # openpyxl é opcional: sem ele uploads .xlsx são recusados
+    load_workbook = None
+
+DATETIME_TEXT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Resultados do infer_dtype para colunas sem datas/horas (não precisam de conversão)
+PLAIN_CELL_TYPES = {"string", "empty", "integer", "floating", "mixed-integer-float", "decimal", "boolean"}
+
+
+class XLSXUnavailableError(Exception):
+    """openpyxl não está instalado."""
+
+
+def _header_names(cells: Sequence) -> List[str]:
+    """
+    Nomes das colunas como o pd.read_csv os daria: célula vazia vira "Unnamed: N" e
+    nomes repetidos ganham sufixo ".1", ".2"...
+    """
+    names: List[str] = []
+    seen = {}
+    for position, cell in enumerate(cells):
+        name = f"Unnamed: {position}" if cell is None or str(cell).strip() == "" else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _cell_text(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_TEXT_FORMAT)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def _frame(rows: List[tuple], columns: List[str], offset: int) -> pd.DataFrame:
+    """
+    Bloco de linhas da planilha no mesmo formato de um chunk do read_csv: índice contínuo
+    entre blocos, células vazias como NaN e datas como texto "AAAA-MM-DD HH:MM:SS" (o mesmo
+    de uma exportação CSV, para o parse de datas e o raw_data não mudarem com o formato).
+    Números continuam tipados.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    frame.index = pd.RangeIndex(offset, offset + len(rows))
+    for column in frame.columns:
+        series = frame[column]
+        if series.dtype.kind == "M":
+            frame[column] = series.dt.strftime(DATETIME_TEXT_FORMAT)
+        elif series.dtype == object:
+            values = series.to_numpy(dtype=object, copy=True)
+            if pd.api.types.infer_dtype(values, skipna=True) not in PLAIN_CELL_TYPES:
+                values = np.array([_cell_text(value) for value in values] + [None], dtype=object)[:-1]
+            values[pd.isna(values)] = np.nan
+            frame[column] = values
+    return frame
+
+
+def iter_xlsx_frames(source: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Lê a primeira planilha do .xlsx em modo read-only do openpyxl (as linhas são lidas em
+    stream do XML, sem carregar a pasta de trabalho) e devolve blocos de `chunk_size`
+    linhas. A primeira linha não vazia é o cabeçalho; linhas totalmente vazias são
+    ignoradas, como no read_csv. Números chegam tipados e datas viram texto (ver _frame);
+    fórmulas valem o último resultado salvo (data_only).
+    """
+    if load_workbook is None:
+        raise XLSXUnavailableError("Suporte a .xlsx indisponível: instale o pacote openpyxl.")
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+
+        header: Optional[List[str]] = None
+        for row in rows:
+            if any(cell is not None for cell in row):
+                # Colunas vazias à direita (formatação sem dados) não entram no cabeçalho
+                width = max(position for position, cell in enumerate(row) if cell is not None) + 1
+                header = _header_names(row[:width])
+                break
+        if header is None:
+            return
+
+        width = len(header)
+        padding = (None,) * width
+        buffer: List[tuple] = []
+        offset = 0
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue
+            buffer.append(row[:width] if len(row) >= width else (tuple(row) + padding)[:width])
+            if len(buffer) >= chunk_size:
+                yield _frame(buffer, header, offset)
+                offset += len(buffer)
+                buffer = []
+        if buffer:
+            yield _frame(buffer, header, offset)
+    finally:
+        workbook.close()
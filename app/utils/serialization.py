@@ -0,0 +1,165 @@
+import datetime
+import json
+import math
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+
+def serialize_value(value):
+    if value is None:
+        return None
+    try:
+        if isinstance(value, float) and math.isnan(value):
+            return None
+    except Exception:
+        pass
+    try:
+        if pd.isna(value):
+            return None
+    except Exception:
+        pass
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def clean_number(value):
+    """
+    Converte strings monetárias/numéricas com vírgula/ponto/R$/% para float.
+    Respeita ponto como separador decimal quando não há vírgula (não zera decimais).
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)) and not (isinstance(value, float) and math.isnan(value)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = (
+            value.replace("R$", "")
+            .replace("%", "")
+            .replace(" ", "")
+            .replace("\u00a0", "")  # nbsp
+        )
+        has_comma = "," in cleaned
+        has_dot = "." in cleaned
+
+        if has_comma and has_dot:
+            # assume dot = thousand, comma = decimal
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        elif has_comma:
+            # assume comma decimal, strip thousand dots if any
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            # only dot or digits -> keep dot as decimal
+            cleaned = cleaned
+
+        try:
+            num = float(cleaned)
+            if math.isnan(num):
+                return None
+            return num
+        except Exception:
+            return None
+    try:
+        num = float(value)
+        if math.isnan(num):
+            return None
+        return num
+    except Exception:
+        return None
+
+
+def normalize_raw_data(raw: dict) -> dict:
+    """
+    Garante que campos que começam com 'valor' ou 'comiss' sejam numéricos.
+    """
+    if not isinstance(raw, dict):
+        return raw
+    normalized = {}
+    for k, v in raw.items():
+        key_lower = k.lower()
+        if key_lower.startswith("valor") or key_lower.startswith("comiss"):
+            parsed = clean_number(v)
+            normalized[k] = parsed if parsed is not None else serialize_value(v)
+        else:
+            normalized[k] = serialize_value(v)
+    return normalized
+
+
+def _is_numeric_key(key) -> bool:
+    key_lower = key.lower()
+    return key_lower.startswith("valor") or key_lower.startswith("comiss")
+
+
+def _json_value(value, numeric: bool) -> str:
+    """JSON de um único valor, exatamente como normalize_raw_data + json.dumps o gerariam."""
+    if numeric:
+        parsed = clean_number(value)
+        return json.dumps(parsed if parsed is not None else serialize_value(value))
+    return json.dumps(serialize_value(value))
+
+
+# Strings que o json.dumps (ensure_ascii) devolve apenas entre aspas, sem escapes
+_JSON_PLAIN_STRING = r'^[\x20\x21\x23-\x5b\x5d-\x7e]*$'
+
+
+def _encode_column(series: pd.Series, numeric: bool, prefix: str = "") -> np.ndarray:
+    """
+    Codifica uma coluna inteira em JSON (cada item já com `prefix`, ex.: '"chave": ').
+    Cada valor distinto é convertido uma única vez, com as mesmas funções escalares de
+    normalize_raw_data, e o resultado é espalhado pelas linhas via factorize.
+    Strings ASCII simples são codificadas sem passar por json.dumps.
+    """
+    values = series.to_numpy()
+
+    if series.dtype.kind == "f":
+        # Fatora pelos bits para não juntar 0.0 e -0.0 (repr diferente)
+        codes, _ = pd.factorize(values.view(np.int64))
+        codes[np.isnan(values)] = -1
+        n_uniques = codes.max() + 1 if len(codes) else 0
+        _, first_index = np.unique(codes, return_index=True)
+        uniques = [None] * n_uniques
+        for position in first_index:
+            if codes[position] >= 0:
+                uniques[codes[position]] = values[position].item()
+    else:
+        codes, unique_values = pd.factorize(values)
+        uniques = unique_values.tolist()
+
+    if uniques and not numeric and all(isinstance(u, str) for u in uniques):
+        unique_series = pd.Series(uniques, dtype=object)
+        plain = unique_series.str.match(_JSON_PLAIN_STRING).to_numpy()
+        encoded_uniques = (prefix + '"' + unique_series + '"').to_numpy(dtype=object)
+        for position in np.flatnonzero(~plain):
+            encoded_uniques[position] = prefix + json.dumps(uniques[position])
+    elif series.dtype.kind in "iu" and not numeric:
+        encoded_uniques = np.array([prefix + str(u) for u in uniques] + [None], dtype=object)[:-1]
+    else:
+        encoded_uniques = np.array([prefix + _json_value(u, numeric) for u in uniques] + [None], dtype=object)[:-1]
+
+    encoded = np.empty(len(codes), dtype=object)
+    valid = codes >= 0
+    encoded[valid] = encoded_uniques[codes[valid]]
+    encoded[~valid] = prefix + _json_value(None, numeric)
+    return encoded
+
+
+def encode_raw_frame(df: pd.DataFrame) -> pd.Series:
+    """
+    Versão colunar de json.dumps(normalize_raw_data(row)) para todas as linhas do frame.
+    Decide uma vez por coluna se ela é numérica ('valor*'/'comiss*'), codifica cada coluna
+    em bloco e só então monta os objetos JSON. A saída é idêntica, byte a byte, ao
+    caminho linha a linha.
+    """
+    parts = [
+        _encode_column(df[key], _is_numeric_key(key), prefix=json.dumps(key) + ": ")
+        for key in df.columns
+    ]
+    if not parts:
+        return pd.Series(["{}"] * len(df), index=df.index, dtype=object)
+
+    rows = ["{" + ", ".join(fields) + "}" for fields in zip(*parts)]
+    return pd.Series(rows, index=df.index, dtype=object)
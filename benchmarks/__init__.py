@@ -0,0 +1 @@
+"""Benchmarks de ingestão e consultas (rodam contra um PostgreSQL local)."""
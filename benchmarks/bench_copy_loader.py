@@ -0,0 +1,126 @@
+"""
+Benchmark: INSERT via ORM (add_all) x COPY (BulkLoader) em dataset_rows.
+
+Uso (precisa de um PostgreSQL local em DATABASE_URL):
+
+    python -m benchmarks.bench_copy_loader --rows 1000000 --orm-rows 100000
+
+Tudo roda dentro de uma transação que é desfeita no final (nenhum dado fica no banco).
+O caminho ORM é medido sobre uma amostra (--orm-rows), já que em 1M de linhas
+ele levaria vários minutos; a comparação é feita em linhas/segundo.
+"""
+import argparse
+import json
+import time
+from datetime import date, time as time_cls, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.db.session import SessionLocal
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.services.bulk_loader import BulkLoader
+from app.services.ingestion_service import IngestionService
+from app.utils.serialization import encode_raw_frame
+
+
+STATUSES = ["Pendente", "Concluído", "Não pago", "Cancelado"]
+CATEGORIES = ["Casa e Decoração", "Saúde", "Beleza", "Sapatos Femininos", "Celulares"]
+SUB_IDS = ["dispenser01", "pipoqueira01", "lojanatal02", "instagram03"]
+
+
+def synthetic_frame(n_rows: int, offset: int = 0, seed: int = 42) -> pd.DataFrame:
+    """Frame no formato de saída do CSVService.validate_csv (com raw_data)."""
+    rng = np.random.default_rng(seed + offset)
+    base = date(2025, 1, 1)
+    days = rng.integers(0, 365, n_rows)
+    seconds = rng.integers(0, 86400, n_rows)
+    revenue = np.round(rng.uniform(5, 500, n_rows), 2)
+    commission = np.round(revenue * rng.uniform(0, 0.12, n_rows), 4)
+
+    dates = [base + timedelta(days=int(d)) for d in days]
+    times = [time_cls(int(s) // 3600, (int(s) % 3600) // 60, int(s) % 60) for s in seconds]
+    products = [f"{offset + i:014d}" for i in range(n_rows)]
+    statuses = [STATUSES[i] for i in rng.integers(0, len(STATUSES), n_rows)]
+    categories = [CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), n_rows)]
+    sub_ids = [SUB_IDS[i] for i in rng.integers(0, len(SUB_IDS), n_rows)]
+
+    df = pd.DataFrame({
+        "date": dates,
+        "time": times,
+        "product": products,
+        "revenue": revenue,
+        "cost": 0,
+        "commission": commission,
+        "status": statuses,
+        "category": categories,
+        "sub_id1": sub_ids,
+        "mes_ano": [f"{d.year:04d}-{d.month:02d}" for d in dates],
+    })
+    df["profit"] = df["revenue"] - df["cost"] - df["commission"]
+    raw = pd.DataFrame({
+        "ID do pedido": products,
+        "Status do Pedido": statuses,
+        "Horário do pedido": [f"{d.isoformat()} {t.isoformat()}" for d, t in zip(dates, times)],
+        "Valor de Compra(R$)": [f"{r:.2f}".replace(".", ",") for r in revenue],
+        "Comissão líquida do afiliado(R$)": commission,
+        "Categoria Global L1": categories,
+        "Sub_id1": sub_ids,
+        "Sub_id2": None,
+    })
+    df["raw_data"] = encode_raw_frame(raw).to_numpy()
+    return df
+
+
+def _run(db, dataset, n_rows: int, chunk_size: int, use_copy: bool) -> float:
+    """Insere n_rows em blocos e devolve o tempo gasto (s) só na gravação."""
+    elapsed = 0.0
+    for offset in range(0, n_rows, chunk_size):
+        chunk = synthetic_frame(min(chunk_size, n_rows - offset), offset=offset)
+        start = time.perf_counter()
+        if use_copy:
+            BulkLoader.copy_rows(db, chunk, dataset.id, dataset.user_id)
+        else:
+            rows = IngestionService.build_dataset_rows(chunk, dataset.id, dataset.user_id)
+            db.add_all(rows)
+            db.flush()
+            for row in rows:
+                db.expunge(row)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas gravadas via COPY")
+    parser.add_argument("--orm-rows", type=int, default=100_000, help="Linhas gravadas via ORM (amostra)")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = User(email="bench-copy@example.com", hashed_password="-", name="bench")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv")
+        db.add(dataset)
+        db.flush()
+
+        orm_seconds = _run(db, dataset, args.orm_rows, args.chunk_size, use_copy=False)
+        copy_seconds = _run(db, dataset, args.rows, args.chunk_size, use_copy=True)
+    finally:
+        db.rollback()
+        db.close()
+
+    orm_rps = args.orm_rows / orm_seconds if orm_seconds else 0.0
+    copy_rps = args.rows / copy_seconds if copy_seconds else 0.0
+    print(json.dumps({
+        "orm": {"rows": args.orm_rows, "seconds": round(orm_seconds, 3), "rows_per_sec": round(orm_rps)},
+        "copy": {"rows": args.rows, "seconds": round(copy_seconds, 3), "rows_per_sec": round(copy_rps)},
+        "speedup": round(copy_rps / orm_rps, 2) if orm_rps else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
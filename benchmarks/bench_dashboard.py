@@ -0,0 +1,150 @@
+"""
+Benchmark: GET /dashboard em três consultas (KPIs, por período, por produto) x uma consulta
+com GROUPING SETS (DashboardService.get_dashboard_single_query).
+
+Uso (precisa de um PostgreSQL local em DATABASE_URL):
+
+    python -m benchmarks.bench_dashboard --rows 1000000 --products 5000 --repeat 5
+
+Grava --rows linhas sintéticas (benchmarks.bench_copy_loader) via COPY para um usuário novo,
+com --products produtos distintos, e mede os dois caminhos lendo de dataset_rows e do rollup
+diário, sem filtro, com um intervalo de 30 dias e com min_value (que sempre lê dataset_rows).
+Cada medida é a mediana de --repeat execuções, após uma de aquecimento, e os dois caminhos
+são conferidos (mesma resposta). Tudo roda numa transação desfeita no final.
+
+Por fim, mede o tamanho da resposta (JSON) e o tempo de serialização listando todos os
+produtos (product_limit 0) x o top-N de DASHBOARD_PRODUCT_LIMIT com o balde "Outros".
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.schemas.dashboard import DashboardFilters
+from app.services.bulk_loader import BulkLoader
+from app.services.dashboard_service import DashboardService
+from benchmarks.bench_copy_loader import synthetic_frame
+
+SCENARIOS = {
+    "all": DashboardFilters(),
+    "30_days": DashboardFilters(start_date=date(2025, 6, 1), end_date=date(2025, 6, 30)),
+    "min_value": DashboardFilters(min_value=100),
+}
+
+
+def load_rows(db, dataset: Dataset, n_rows: int, n_products: int, chunk_size: int) -> float:
+    """Grava as linhas (com produtos repetidos, como num relatório real) e devolve os segundos."""
+    start = time.perf_counter()
+    for offset in range(0, n_rows, chunk_size):
+        chunk = synthetic_frame(min(chunk_size, n_rows - offset), offset=offset)
+        chunk["product"] = [f"Produto {(offset + i) % n_products:05d}" for i in range(len(chunk))]
+        BulkLoader.copy_rows(db, chunk, dataset.id, dataset.user_id)
+    db.execute(text("ANALYZE dataset_rows"))
+    db.execute(text("ANALYZE dataset_daily_rollups"))
+    return time.perf_counter() - start
+
+
+def measure(db, user_id: int, filters: DashboardFilters, single_query: bool, repeat: int):
+    """Mediana (s) de `repeat` execuções de get_dashboard, e a última resposta."""
+    settings.DASHBOARD_SINGLE_QUERY = single_query
+    response = DashboardService.get_dashboard(db, user_id, filters)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = DashboardService.get_dashboard(db, user_id, filters)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), response
+
+
+def measure_payload(db, user_id: int, product_limit: int, repeat: int):
+    """Tempo de get_dashboard, bytes e tempo de serialização (mediana) da resposta."""
+    settings.DASHBOARD_PRODUCT_LIMIT = product_limit
+    query_seconds, response = measure(db, user_id, DashboardFilters(), True, repeat)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = response.model_dump_json()
+        timings.append(time.perf_counter() - start)
+    return {
+        "product_limit": product_limit,
+        "products_listed": len(response.product_aggregations),
+        "query_seconds": round(query_seconds, 4),
+        "payload_bytes": len(payload),
+        "serialize_seconds": round(statistics.median(timings), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=5_000, help="Produtos distintos nas linhas")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = []
+    payloads = []
+    top_n = settings.DASHBOARD_PRODUCT_LIMIT
+    db = SessionLocal()
+    try:
+        user = User(email="bench-dashboard@example.com", hashed_password="-", name="bench")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv")
+        db.add(dataset)
+        db.flush()
+        load_seconds = load_rows(db, dataset, args.rows, args.products, args.chunk_size)
+        print(f"{args.rows} linhas gravadas em {load_seconds:.1f}s", file=sys.stderr)
+
+        for use_rollup in (False, True):
+            settings.DASHBOARD_USE_ROLLUP = use_rollup
+            for scenario, filters in SCENARIOS.items():
+                three_seconds, three = measure(db, user.id, filters, False, args.repeat)
+                single_seconds, single = measure(db, user.id, filters, True, args.repeat)
+                results.append({
+                    "source": "rollup" if DashboardService.use_rollup(filters) else "dataset_rows",
+                    "use_rollup": use_rollup,
+                    "scenario": scenario,
+                    "three_queries_seconds": round(three_seconds, 4),
+                    "single_query_seconds": round(single_seconds, 4),
+                    "speedup": round(three_seconds / single_seconds, 2) if single_seconds else None,
+                    "identical": three == single,
+                })
+                print(
+                    f"{results[-1]['source']:<12} {scenario:<10} 3 consultas {three_seconds:.3f}s, "
+                    f"1 consulta {single_seconds:.3f}s",
+                    file=sys.stderr,
+                )
+
+        settings.DASHBOARD_USE_ROLLUP = True
+        for product_limit in (0, top_n):
+            payloads.append(measure_payload(db, user.id, product_limit, args.repeat))
+            print(
+                f"product_limit={product_limit:<5} {payloads[-1]['payload_bytes']} bytes, "
+                f"serialização {payloads[-1]['serialize_seconds']:.4f}s",
+                file=sys.stderr,
+            )
+    finally:
+        db.rollback()
+        db.close()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "products": args.products,
+        "repeat": args.repeat,
+        "load_seconds": round(load_seconds, 1),
+        "runs": results,
+        "payload": payloads,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Benchmark de ingestão ponta a ponta, por etapa, sobre CSVs sintéticos da Shopee.
+
+Uso (precisa de um PostgreSQL local em DATABASE_URL):
+
+    python -m benchmarks.bench_ingest --sizes 10k,100k,1M,5M --encodings utf-8,latin-1 \\
+        --workdir /tmp/dashads-bench --output resultados.json
+
+Para cada tamanho x codificação, gera (ou reaproveita, em --workdir) o CSV com
+benchmarks.synthetic_csv e percorre o mesmo caminho do upload_csv/IngestionService.ingest_csv,
+medindo separadamente cada etapa:
+
+    detect_encoding  CSVService.detect_encoding
+    read_csv         pd.read_csv em blocos de CSV_CHUNK_SIZE linhas
+    prepare_columns  aliases, fallback de data e formatos (primeiro bloco)
+    transform        CSVService._transform_frame (datas, números, raw_data)
+    insert           IngestionService.insert_chunk (COPY ou ORM, conforme CSV_USE_COPY)
+
+Cada etapa reporta segundos, linhas/segundo e o pico de RSS do processo observado durante
+ela. A gravação roda numa transação desfeita no final (nenhum dado fica no banco).
+O JSON impresso (e salvo em --output) pode ser comparado entre execuções.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import pandas as pd
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.services.csv_service import CSVService, RowKeyBuilder
+from app.services.frame_memory import current_rss_bytes
+from app.services.ingestion_service import IngestionService, MODE_APPEND, INGESTION_MODES
+from benchmarks.synthetic_csv import ENCODINGS, SIZES, generate_shopee_csv, parse_size
+
+STAGES = ["detect_encoding", "read_csv", "prepare_columns", "transform", "insert"]
+
+
+class StageMeter:
+    """Acumula tempo e pico de RSS por etapa; uma thread amostra o RSS a cada `interval` s."""
+
+    def __init__(self, interval: float = 0.005):
+        self.seconds: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self.peak_rss: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self._interval = interval
+        self._current = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _record(self, stage: str) -> None:
+        rss = current_rss_bytes()
+        if rss > self.peak_rss[stage]:
+            self.peak_rss[stage] = rss
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self._interval):
+            stage = self._current
+            if stage is not None:
+                self._record(stage)
+
+    @contextmanager
+    def stage(self, name: str):
+        self._current = name
+        self._record(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self._record(name)
+            self._current = None
+
+
+def _stage_report(seconds: float, rows: int, peak_rss: int) -> dict:
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds) if seconds else None,
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+    }
+
+
+def run_ingest(db, dataset: Dataset, path: str, mode: str) -> dict:
+    """Percorre o caminho do IngestionService.ingest_csv medindo cada etapa."""
+    rows = 0
+    key_columns = settings.MERGE_KEY_COLUMNS if mode != MODE_APPEND else None
+
+    with StageMeter() as meter, open(path, "rb") as handle:
+        with meter.stage("detect_encoding"):
+            encoding = CSVService.detect_encoding(handle)
+
+        with meter.stage("read_csv"):
+            columns = CSVService._peek_columns(handle, encoding)
+            reader = pd.read_csv(
+                handle, encoding=encoding, chunksize=settings.CSV_CHUNK_SIZE, dtype=CSVService.read_dtypes(columns),
+            )
+            typed_numbers = CSVService.typed_numbers(columns)
+
+        col_map = None
+        date_formats: Dict[str, str] = {}
+        key_builder = None
+        while True:
+            with meter.stage("read_csv"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+
+            if col_map is None:
+                with meter.stage("prepare_columns"):
+                    col_map, date_formats = CSVService._prepare_columns(chunk)
+                    if key_columns:
+                        key_builder, _ = RowKeyBuilder.for_frame(chunk, key_columns)
+
+            with meter.stage("transform"):
+                out = CSVService._transform_frame(chunk, col_map, [], date_formats, typed_numbers)
+                if key_columns:
+                    out["row_key"] = key_builder.build(chunk.loc[out.index]) if key_builder else None
+
+            with meter.stage("insert"):
+                IngestionService.insert_chunk(db, out, dataset, mode)
+            rows += len(out)
+
+    stages = {
+        stage: _stage_report(meter.seconds[stage], rows, meter.peak_rss[stage]) for stage in STAGES
+    }
+    total_seconds = sum(meter.seconds.values())
+    return {
+        "rows": rows,
+        "encoding_detected": encoding,
+        "stages": stages,
+        "total": _stage_report(total_seconds, rows, max(meter.peak_rss.values())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Tamanhos separados por vírgula (10k,100k,1M,5M)")
+    parser.add_argument("--encodings", default="utf-8,latin-1", help=f"Codificações ({', '.join(ENCODINGS)})")
+    parser.add_argument("--mode", default=MODE_APPEND, choices=sorted(INGESTION_MODES))
+    parser.add_argument("--workdir", default=os.path.join(settings.INGESTION_SPOOL_DIR, "bench"))
+    parser.add_argument("--regenerate", action="store_true", help="Gera os CSVs de novo mesmo se já existirem")
+    parser.add_argument("--output", help="Arquivo onde salvar o JSON do resultado")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    encodings = [encoding.strip() for encoding in args.encodings.split(",") if encoding.strip()]
+
+    runs: List[dict] = []
+    for size in sizes:
+        n_rows = parse_size(size)
+        for encoding in encodings:
+            path = os.path.join(args.workdir, f"shopee_{size}_{encoding}.csv")
+            if args.regenerate or not os.path.exists(path):
+                start = time.perf_counter()
+                generate_shopee_csv(path, n_rows, encoding=encoding)
+                print(f"Gerado {path} em {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            db = SessionLocal()
+            try:
+                user = User(email=f"bench-ingest-{size}-{encoding}@example.com", hashed_password="-", name="bench")
+                db.add(user)
+                db.flush()
+                dataset = Dataset(user_id=user.id, filename=os.path.basename(path))
+                db.add(dataset)
+                db.flush()
+
+                result = run_ingest(db, dataset, path, args.mode)
+            finally:
+                db.rollback()
+                db.close()
+
+            result.update({
+                "size": size,
+                "encoding": encoding,
+                "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+            })
+            runs.append(result)
+            print(
+                f"{size} {encoding}: {result['total']['rows_per_sec']} linhas/s "
+                f"(pico {result['total']['peak_rss_mb']} MB)",
+                file=sys.stderr,
+            )
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "chunk_size": settings.CSV_CHUNK_SIZE,
+        "use_copy": settings.CSV_USE_COPY,
+        "mode": args.mode,
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: filtros por valor em GET /dashboard. O min_value/max_value legado é um OR das
+quatro métricas; as faixas por métrica (revenue_min, profit_max...) são um intervalo numa
+coluna só, atendido pelo índice (user_id, métrica).
+
+Uso (precisa de um PostgreSQL local em DATABASE_URL):
+
+    python -m benchmarks.bench_metric_filters --rows 1000000 --repeat 5
+
+Grava --rows linhas sintéticas (benchmarks.bench_copy_loader) via COPY para um usuário novo
+e, para cada filtro, mostra como o PostgreSQL lê dataset_rows (nós do plano) e a mediana
+de get_dashboard com os índices por métrica e sem eles (removidos num savepoint). Tudo roda
+numa transação desfeita no final.
+"""
+import argparse
+import json
+import sys
+from typing import List
+
+from sqlalchemy import and_, func, select, text
+
+from app.db.session import SessionLocal
+from app.models.dataset import Dataset
+from app.models.dataset_row import DatasetRow
+from app.models.user import User
+from app.schemas.dashboard import DashboardFilters
+from app.services.dashboard_service import RANGE_METRICS, DashboardService
+from benchmarks.bench_dashboard import load_rows, measure
+
+# Receita sintética é uniforme entre 5 e 500, e a comissão, até 12% dela: cada filtro
+# seleciona ~1% das linhas
+SCENARIOS = {
+    "min_value (legado)": DashboardFilters(min_value=495),
+    "revenue_min": DashboardFilters(revenue_min=495),
+    "revenue_min + revenue_max": DashboardFilters(revenue_min=100, revenue_max=105),
+    "profit_max": DashboardFilters(profit_max=10),
+}
+
+
+def scan_nodes(db, user_id: int, filters: DashboardFilters) -> List[str]:
+    """Nós do plano que leem dataset_rows (tipo e índice) para as condições dos filtros."""
+    conditions = DashboardService.build_filters(db, user_id, filters, DatasetRow)
+    compiled = select(func.count(DatasetRow.id)).where(and_(*conditions)).compile(dialect=db.get_bind().dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+
+    nodes = []
+
+    def walk(node):
+        if "Index Name" in node:
+            nodes.append(f"{node['Node Type']} ({node['Index Name']})")
+        elif node.get("Relation Name") == "dataset_rows":
+            nodes.append(node["Node Type"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return nodes
+
+
+def run(db, user_id: int, repeat: int, indexes: bool) -> List[dict]:
+    results = []
+    for scenario, filters in SCENARIOS.items():
+        seconds, response = measure(db, user_id, filters, True, repeat)
+        results.append({
+            "scenario": scenario,
+            "indexes": indexes,
+            "plan": scan_nodes(db, user_id, filters),
+            "seconds": round(seconds, 4),
+            "rows": response.kpis.total_rows,
+        })
+        print(
+            f"{'com' if indexes else 'sem'} índices  {scenario:<26} {seconds:.3f}s  {', '.join(results[-1]['plan'])}",
+            file=sys.stderr,
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=5_000, help="Produtos distintos nas linhas")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = []
+    db = SessionLocal()
+    try:
+        user = User(email="bench-filters@example.com", hashed_password="-", name="bench")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv")
+        db.add(dataset)
+        db.flush()
+        load_seconds = load_rows(db, dataset, args.rows, args.products, args.chunk_size)
+        print(f"{args.rows} linhas gravadas em {load_seconds:.1f}s", file=sys.stderr)
+
+        results += run(db, user.id, args.repeat, indexes=True)
+
+        savepoint = db.begin_nested()
+        db.execute(text(f"DROP INDEX {', '.join(f'idx_user_{metric}' for metric in RANGE_METRICS)}"))
+        results += run(db, user.id, args.repeat, indexes=False)
+        savepoint.rollback()
+    finally:
+        db.rollback()
+        db.close()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "repeat": args.repeat,
+        "load_seconds": round(load_seconds, 1),
+        "runs": results,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
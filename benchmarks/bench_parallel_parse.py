@@ -0,0 +1,113 @@
+"""
+Benchmark: throughput do parse/normalização de um CSV grande com 1, 2, 4... processos.
+
+Uso (não precisa de banco):
+
+    python -m benchmarks.bench_parallel_parse --rows 1M --processes 1,2,4,8 --piece-mb 16
+
+Gera (ou reaproveita em --workdir) um CSV sintético da Shopee (benchmarks.synthetic_csv) e
+mede só o parse + normalização, sem gravação: com 1 processo, o CSVService.iter_csv_chunks
+sequencial; com N > 1, o ParallelParser com N processos. O tempo de subida do pool fica
+separado (startup_seconds). Todas as execuções são conferidas contra a sequencial
+(mesmas linhas, na mesma ordem).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.csv_service import CSVService
+from app.services.parallel_parser import ParallelParser, parse_process_pool
+from benchmarks.synthetic_csv import generate_shopee_csv, parse_size
+
+
+def _fingerprint(frames) -> str:
+    """Hash das linhas normalizadas, em ordem e independente dos blocos, para comparar os caminhos."""
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame.astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def run_sequential(path: str, encoding: str) -> dict:
+    rows = 0
+    frames = []
+    start = time.perf_counter()
+    with open(path, "rb") as handle:
+        for chunk, _ in CSVService.iter_csv_chunks(handle, path, encoding=encoding, chunk_size=settings.CSV_CHUNK_SIZE):
+            rows += len(chunk)
+            frames.append(chunk)
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "fingerprint": _fingerprint(frames)}
+
+
+def run_parallel(path: str, encoding: str, processes: int) -> dict:
+    settings.INGESTION_PARSE_PROCESSES = processes
+    parse_process_pool.shutdown()
+
+    start = time.perf_counter()
+    executor = parse_process_pool.get()
+    list(executor.map(abs, range(processes * 4)))  # sobe os processos antes de medir
+    startup = time.perf_counter() - start
+
+    rows = 0
+    frames = []
+    start = time.perf_counter()
+    with open(path, "rb") as handle:
+        for chunk, _ in ParallelParser.iter_csv_chunks(handle, path, encoding, settings.CSV_CHUNK_SIZE):
+            rows += len(chunk)
+            frames.append(chunk)
+    seconds = time.perf_counter() - start
+    parse_process_pool.shutdown()
+    return {"rows": rows, "seconds": seconds, "startup_seconds": startup, "fingerprint": _fingerprint(frames)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1M", help="Linhas do CSV sintético (10k, 100k, 1M, 5M ou um número)")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--processes", default="1,2,4,8", help="Quantidades de processos, separadas por vírgula")
+    parser.add_argument("--piece-mb", type=int, default=settings.INGESTION_PARSE_PIECE_MB)
+    parser.add_argument("--workdir", default=os.path.join(settings.INGESTION_SPOOL_DIR, "bench"))
+    args = parser.parse_args()
+
+    path = os.path.join(args.workdir, f"shopee_{args.rows}_{args.encoding}.csv")
+    if not os.path.exists(path):
+        generate_shopee_csv(path, parse_size(args.rows), encoding=args.encoding)
+
+    settings.INGESTION_PARSE_PIECE_MB = args.piece_mb
+    settings.INGESTION_PARSE_MIN_MB = 0
+    with open(path, "rb") as handle:
+        encoding = CSVService.detect_encoding(handle)
+
+    baseline = run_sequential(path, encoding)
+    results = []
+    for processes in [int(value) for value in args.processes.split(",") if value.strip()]:
+        result = baseline if processes <= 1 else run_parallel(path, encoding, processes)
+        results.append({
+            "processes": processes,
+            "seconds": round(result["seconds"], 3),
+            "startup_seconds": round(result.get("startup_seconds", 0.0), 3),
+            "rows_per_sec": round(result["rows"] / result["seconds"]),
+            "speedup": round(baseline["seconds"] / result["seconds"], 2),
+            "identical": result["rows"] == baseline["rows"] and result["fingerprint"] == baseline["fingerprint"],
+        })
+        print(f"{processes} processo(s): {results[-1]['rows_per_sec']} linhas/s", file=sys.stderr)
+
+    print(json.dumps({
+        "rows": baseline["rows"],
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+        "piece_mb": args.piece_mb,
+        "chunk_size": settings.CSV_CHUNK_SIZE,
+        "cpu_count": os.cpu_count(),
+        "runs": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: serialização de raw_data linha a linha x colunar.
+
+Uso (não precisa de banco):
+
+    python -m benchmarks.bench_raw_data --repeat 50
+
+Compara o caminho antigo (replace({nan: None}).to_dict("records") +
+normalize_raw_data + json.dumps por linha) com encode_raw_frame, sobre o
+example_data.csv repetido `--repeat` vezes, e confere que as duas saídas são
+idênticas byte a byte.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.serialization import encode_raw_frame, normalize_raw_data
+
+EXAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example_data.csv")
+
+
+def row_by_row(df: pd.DataFrame) -> list:
+    records = df.replace({np.nan: None}).to_dict("records")
+    return [json.dumps(normalize_raw_data(record)) for record in records]
+
+
+def columnar(df: pd.DataFrame) -> list:
+    return encode_raw_frame(df).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=EXAMPLE_CSV)
+    parser.add_argument("--repeat", type=int, default=50, help="Quantas vezes repetir as linhas do CSV")
+    args = parser.parse_args()
+
+    sample = pd.read_csv(args.csv)
+    df = pd.concat([sample] * args.repeat, ignore_index=True)
+
+    start = time.perf_counter()
+    expected = row_by_row(df)
+    row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = columnar(df)
+    columnar_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "rows": len(df),
+        "columns": len(df.columns),
+        "row_by_row": {"seconds": round(row_seconds, 3), "rows_per_sec": round(len(df) / row_seconds)},
+        "columnar": {"seconds": round(columnar_seconds, 3), "rows_per_sec": round(len(df) / columnar_seconds)},
+        "speedup": round(row_seconds / columnar_seconds, 2),
+        "identical": expected == result,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
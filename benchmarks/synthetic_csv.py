@@ -0,0 +1,226 @@
+"""
+Gerador de CSVs sintéticos no formato da exportação de afiliados da Shopee.
+
+Uso:
+
+    python -m benchmarks.synthetic_csv --rows 100000 --encoding latin-1 --out /tmp/shopee_100k.csv
+
+O cabeçalho é o mesmo do example_data.csv (47 colunas, nomes em português). Valores
+monetários saem como "R$ 1.234,56" e taxas como "3,00%", como nas planilhas reexportadas
+por ferramentas brasileiras. O arquivo é escrito em blocos, então gerar 5M de linhas não
+exige manter o frame inteiro em memória. As codificações suportadas são utf-8, utf-8-sig
+(com BOM) e latin-1/cp1252; o vocabulário só usa caracteres que existem em latin-1.
+"""
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Mesmo cabeçalho (e ordem) do example_data.csv
+SHOPEE_HEADER = [
+    "ID do pedido", "Status do Pedido", "ID do pagamento", "Horário do pedido", "Tempo de Conclusão",
+    "Tempo dos Cliques", "Nome da loja", "ID da loja", "Tipo da Loja", "ID do item", "Nome do Item",
+    "Modelo de ID", "Tipo de Produto", "ID da promoção", "Categoria Global L1", "Categoria Global L2",
+    "Categoria Global L3", "Preço(R$)", "Qtd", "Offer Type", "Parceiro de campanha", "Valor de Compra(R$)",
+    "Valor do Reembolso(R$)", "Taxa de comissão Shopee do item", "Comissão do Item da Shopee(R$)",
+    "Taxa de comissão do vendedor do item", "Comissão do Item da Marca(R$)", "Comissão total do item(R$)",
+    "Comissão Shopee(R$)", "Comissão do vendedor(R$)", "Comissão total do pedido(R$)", "RM vinculada",
+    "ID de contrato da RM", "Taxa do Fee de gestão da RM", "Fee de Gestão da RM(R$)",
+    "Taxa de contrato do afiliado", "Comissão líquida do afiliado(R$)", "Status do item do afiliado",
+    "Notas do item", "Tipo de atribuição", "Status do Comprador", "Sub_id1", "Sub_id2", "Sub_id3",
+    "Sub_id4", "Sub_id5", "Canal",
+]
+
+# Tamanhos padrão da suíte de benchmark
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "5M": 5_000_000}
+
+ENCODINGS = ["utf-8", "utf-8-sig", "latin-1", "cp1252"]
+
+STATUSES = ["Pendente", "Concluído", "Não pago", "Cancelado"]
+STATUS_NOTES = {
+    "Pendente": "O status do item está pendente, comissões só vão ser pagas quando for concluído",
+    "Concluído": "",
+    "Não pago": "O pedido ainda não foi pago. Aguardando pagamento do comprador.",
+    "Cancelado": "Pedido cancelado pelo comprador.",
+}
+STORES = ["B&B&B", "Lumiss", "Casa Fácil", "Loja São João", "Eletrônicos Açaí", "Moda Verão"]
+STORE_TYPES = ["C2C(Non-CB)", "Shopee Mall(Non-CB)", "Preferred(Non-CB)"]
+ITEMS = [
+    "Taça Copo Térmico De Aço Inoxidável 2 Em 1 Para Gin Vinho Cerveja Drink Bebidas 14oz | Envia Rápida",
+    "Sandália Feminina Lumiss Papete Chinelo Confortável Tachas Fivela",
+    "Pipoqueira Elétrica Sem Óleo 1200W Para Pipoca Rápida",
+    "Dispenser De Sabonete Líquido Automático Com Sensor",
+    "Fone De Ouvido Bluetooth Sem Fio Com Microfone",
+    "Ramos De Frutas Vermelhas De Natal-Plantas De Decoração",
+]
+CATEGORIES = [
+    ("Casa e Decoração", "Louça", "Copos e Taças"),
+    ("Sapatos Femininos", "Sandálias e Chinelos", "Sandália Plana e Rasteirinha"),
+    ("Eletroportáteis", "Cozinha", "Pipoqueiras"),
+    ("Celulares e Dispositivos", "Aparelhos Vestíveis", ""),
+    ("Saúde", "Cuidados Pessoais", "Sabonetes"),
+]
+OFFER_TYPES = ["Shopee Comm", "XTRA Comm"]
+ATTRIBUTIONS = ["Pedido em loja diferente", "Pedido na mesma loja"]
+BUYER_STATUSES = ["Existente", "Novo"]
+SUB_IDS = ["dispenser01", "pipoqueira01", "lojanatal02", "instagram03", "tiktok04"]
+CHANNELS = ["Instagram", "Websites", "Others"]
+
+BASE_TIME = int(datetime(2025, 1, 1).timestamp())
+ONE_YEAR = 365 * 24 * 3600
+
+
+def _brl(values: np.ndarray) -> pd.Series:
+    """Formata valores como "R$ 1.234,56"."""
+    text = pd.Series(values).map("{:,.2f}".format)
+    text = text.str.replace(",", "_", regex=False).str.replace(".", ",", regex=False).str.replace("_", ".", regex=False)
+    return "R$ " + text
+
+
+def _percent(values: np.ndarray) -> pd.Series:
+    """Formata taxas como "3,00%"."""
+    return pd.Series(values).map("{:.2f}%".format).str.replace(".", ",", regex=False)
+
+
+def _timestamps(seconds: np.ndarray) -> pd.Series:
+    return pd.Series(pd.to_datetime(seconds, unit="s")).dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _order_ids(index: np.ndarray, order_seconds: np.ndarray) -> pd.Series:
+    """IDs alfanuméricos como "251214B1204BTD": data do pedido (AAMMDD) + 8 caracteres base 36."""
+    alphabet = np.array(list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"), dtype=object)
+    # Multiplicador primo com 36: espalha os índices sem colisão dentro de 36^8
+    scrambled = (index.astype(np.int64) * 1_000_003) % (36 ** 8)
+    suffix = np.full(len(index), "", dtype=object)
+    for _ in range(8):
+        suffix = alphabet[scrambled % 36] + suffix
+        scrambled //= 36
+    days = pd.Series(pd.to_datetime(order_seconds, unit="s")).dt.strftime("%y%m%d")
+    return days + suffix
+
+
+def _pick(rng: np.random.Generator, choices: list, n_rows: int) -> np.ndarray:
+    return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), n_rows)]
+
+
+def synthetic_block(n_rows: int, offset: int = 0, seed: int = 42) -> pd.DataFrame:
+    """Um bloco de n_rows linhas; `offset` mantém os IDs únicos entre blocos."""
+    rng = np.random.default_rng(seed + offset)
+    index = np.arange(offset, offset + n_rows)
+
+    order_seconds = BASE_TIME + rng.integers(0, ONE_YEAR, n_rows)
+    click_seconds = order_seconds - rng.integers(60, 3 * 24 * 3600, n_rows)
+    statuses = _pick(rng, STATUSES, n_rows)
+    category_idx = rng.integers(0, len(CATEGORIES), n_rows)
+    quantity = rng.integers(1, 4, n_rows)
+    price = np.round(rng.uniform(5, 1500, n_rows), 2)
+    purchase = np.round(price * quantity, 2)
+    shopee_rate = rng.choice([0.0, 3.0, 7.0], n_rows)
+    seller_rate = rng.choice([0.0, 4.0], n_rows)
+    item_shopee = np.round(purchase * shopee_rate / 100, 4)
+    item_brand = np.round(purchase * seller_rate / 100, 4)
+    item_total = item_shopee + item_brand
+    completed = statuses == "Concluído"
+    refunded = rng.random(n_rows) < 0.1
+
+    block = pd.DataFrame({
+        "ID do pedido": _order_ids(index, order_seconds),
+        "Status do Pedido": statuses,
+        "ID do pagamento": 218_000_000_000_000 + index,
+        "Horário do pedido": _timestamps(order_seconds),
+        "Tempo de Conclusão": _timestamps(order_seconds + 7 * 24 * 3600).where(completed, "--"),
+        "Tempo dos Cliques": _timestamps(click_seconds),
+        "Nome da loja": _pick(rng, STORES, n_rows),
+        "ID da loja": rng.integers(100_000_000, 2_000_000_000, n_rows),
+        "Tipo da Loja": _pick(rng, STORE_TYPES, n_rows),
+        "ID do item": 20_000_000_000 + (index % 50_000),
+        "Nome do Item": _pick(rng, ITEMS, n_rows),
+        "Modelo de ID": 150_000_000_000 + index,
+        "Tipo de Produto": "Normal Product",
+        "ID da promoção": np.where(rng.random(n_rows) < 0.02, "0_371056728813863_1", ""),
+        "Categoria Global L1": [CATEGORIES[i][0] for i in category_idx],
+        "Categoria Global L2": [CATEGORIES[i][1] for i in category_idx],
+        "Categoria Global L3": [CATEGORIES[i][2] for i in category_idx],
+        "Preço(R$)": _brl(price),
+        "Qtd": quantity,
+        "Offer Type": _pick(rng, OFFER_TYPES, n_rows),
+        "Parceiro de campanha": "",
+        "Valor de Compra(R$)": _brl(purchase),
+        "Valor do Reembolso(R$)": _brl(purchase).where(refunded, ""),
+        "Taxa de comissão Shopee do item": _percent(shopee_rate),
+        "Comissão do Item da Shopee(R$)": _brl(item_shopee),
+        "Taxa de comissão do vendedor do item": _percent(seller_rate),
+        "Comissão do Item da Marca(R$)": _brl(item_brand),
+        "Comissão total do item(R$)": _brl(item_total),
+        "Comissão Shopee(R$)": _brl(item_shopee),
+        "Comissão do vendedor(R$)": _brl(item_brand),
+        "Comissão total do pedido(R$)": _brl(item_total),
+        "RM vinculada": "",
+        "ID de contrato da RM": 0,
+        "Taxa do Fee de gestão da RM": "0,00%",
+        "Fee de Gestão da RM(R$)": 0,
+        "Taxa de contrato do afiliado": "100,00%",
+        "Comissão líquida do afiliado(R$)": _brl(item_total),
+        "Status do item do afiliado": statuses,
+        "Notas do item": [STATUS_NOTES[s] for s in statuses],
+        "Tipo de atribuição": _pick(rng, ATTRIBUTIONS, n_rows),
+        "Status do Comprador": _pick(rng, BUYER_STATUSES, n_rows),
+        "Sub_id1": _pick(rng, SUB_IDS, n_rows),
+        "Sub_id2": "",
+        "Sub_id3": "",
+        "Sub_id4": "",
+        "Sub_id5": "",
+        "Canal": _pick(rng, CHANNELS, n_rows),
+    })
+    return block[SHOPEE_HEADER]
+
+
+def generate_shopee_csv(
+    path: str,
+    n_rows: int,
+    encoding: str = "utf-8",
+    seed: int = 42,
+    block_rows: int = 100_000,
+) -> str:
+    """Escreve um CSV sintético com n_rows linhas em `path` e devolve o caminho."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Codificação não suportada: {encoding} (use {', '.join(ENCODINGS)})")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding=encoding, newline="") as handle:
+        header = True
+        for offset in range(0, n_rows, block_rows):
+            block = synthetic_block(min(block_rows, n_rows - offset), offset=offset, seed=seed)
+            block.to_csv(handle, index=False, header=header)
+            header = False
+        if n_rows == 0:
+            pd.DataFrame(columns=SHOPEE_HEADER).to_csv(handle, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def parse_size(value: str) -> int:
+    """Aceita os rótulos de SIZES ("10k", "1M") ou um número de linhas."""
+    if value in SIZES:
+        return SIZES[value]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:].lower(), 1)
+    return int(float(value[:-1] if multiplier > 1 else value) * multiplier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10k", help="Linhas (10k, 100k, 1M, 5M ou um número)")
+    parser.add_argument("--encoding", default="utf-8", choices=ENCODINGS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    path = generate_shopee_csv(args.out, parse_size(args.rows), encoding=args.encoding, seed=args.seed)
+    print(f"{path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()